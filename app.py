@@ -1,8 +1,9 @@
 import warnings
 import os
-from flask import Flask
+import threading
+import click
+from flask import Flask, current_app
 from flask_cors import CORS
-from flask_migrate import Migrate
 from flask_login import LoginManager
 from dotenv import load_dotenv
 
@@ -14,17 +15,48 @@ from config import Config
 from src.models.db import db, User
 from src.routes.main import main_bp
 from src.routes.api import api_bp
-from src.routes.auth import auth_bp, oauth
+from src.routes.auth import auth_bp
+from src.utils.factor_catalog import init_factor_catalog, reload_factors_if_changed
+from src.utils import rollups  # noqa: F401  (keeps the rollups in step with ORM writes)
 
 load_dotenv()
 
-def create_app():
+class LazyMigrateGroup(click.Group):
+    """`flask db` command group that imports Flask-Migrate (and alembic) only when used."""
+
+    def _commands(self):
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as db_cli_group
+        app = current_app._get_current_object()
+        if 'migrate' not in app.extensions:
+            Migrate(app, db)
+        return db_cli_group
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        # Hand parsing and invocation over to the real Flask-Migrate group
+        return self._commands().make_context(info_name, args, parent=parent, **extra)
+
+def init_schema(app):
+    """Create any missing tables."""
+    with app.app_context():
+        db.create_all()
+
+def create_app(config_object=Config):
     app = Flask(__name__, template_folder="src/templates", static_folder="src/static")
-    app.config.from_object(Config)
+    app.config.from_object(config_object)
 
     CORS(app)
     db.init_app(app)
-    Migrate(app, db)
+
+    # Emission factors from an external catalog, if configured; each worker
+    # re-reads it when it changes
+    init_factor_catalog(app.config.get('FACTOR_CATALOG_PATH'))
+
+    @app.before_request
+    def check_factor_catalog():
+        reload_factors_if_changed()
+
+    app.cli.add_command(LazyMigrateGroup('db', help='Perform database migrations.'))
 
     # Auth
     login_manager = LoginManager()
@@ -35,24 +67,116 @@ def create_app():
     def load_user(user_id):
         return db.session.get(User, int(user_id))
 
-    # Initialize OAuth with app
-    oauth.init_app(app)
-
-    # Blueprints
+    # Blueprints (Google OAuth is registered on first use, see auth.get_google_client)
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp, url_prefix="/api")
     app.register_blueprint(auth_bp, url_prefix="/auth")
 
-    with app.app_context():
-        db.create_all()
+    # Schema creation stays off the import path: run `flask --app app init-db`,
+    # or let the first request create missing tables (AUTO_CREATE_SCHEMA)
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create database tables."""
+        init_schema(app)
+        print("Database tables created.")
+
+    @app.cli.command('train-classifier')
+    @click.option('--cache', 'cache_path', default=None, help='LLM cache database (default: LLM_CACHE_PATH).')
+    @click.option('--out', default=None, help='Model file (default: CLASSIFIER_MODEL_PATH).')
+    def train_classifier_command(cache_path, out):
+        """Train the activity classifier on parses stored in the LLM cache."""
+        from src.utils.classifier import CLASSIFIER_MODEL_PATH, examples_from_llm_cache, train
+        from src.utils.llm_cache import LLM_CACHE_PATH
+
+        cache_path = cache_path or LLM_CACHE_PATH
+        out = out or CLASSIFIER_MODEL_PATH
+        if not os.path.exists(cache_path):
+            raise click.ClickException(f"No LLM cache at {cache_path}")
+        examples = examples_from_llm_cache(cache_path)
+        try:
+            classifier = train(examples)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        classifier.save(out)
+        print(f"Trained on {classifier.meta['examples']} of {len(examples)} cached parses, "
+              f"{len(classifier.labels)} classes; model written to {out}")
+
+    @app.cli.command('check-factors')
+    @click.argument('path')
+    def check_factors_command(path):
+        """Validate a factor catalog file without loading it."""
+        from src.utils.factor_catalog import FactorCatalogError, load_catalog
+
+        try:
+            catalog = load_catalog(path)
+        except FactorCatalogError as e:
+            raise click.ClickException(str(e))
+        print(f"{path}: version {catalog['version']}, {len(catalog['factors'])} factors, "
+              f"{len(catalog['default_factors'])} category defaults")
+
+    @app.cli.command('recalc-factors')
+    @click.option('--workers', default=1, show_default=True, help='Processes, each taking a user_id range.')
+    @click.option('--chunk-size', default=None, type=int, help='Rows per chunk (default: RECALC_CHUNK_SIZE).')
+    @click.option('--users', 'user_range', default=None, help='Only this inclusive user_id range, as LO:HI.')
+    def recalc_factors_command(workers, chunk_size, user_range):
+        """Recompute stored savings computed with an older factor set (resumable)."""
+        from concurrent.futures import ProcessPoolExecutor
+        import multiprocessing
+
+        from src.utils.recalc import RECALC_CHUNK_SIZE, recalculate_factors, run_range, user_id_ranges
+
+        chunk_size = chunk_size or RECALC_CHUNK_SIZE
+        if user_range:
+            lo, _, hi = user_range.partition(':')
+            ranges = [(int(lo), int(hi))]
+        else:
+            ranges = user_id_ranges(workers)
+        if len(ranges) == 1:
+            results = [recalculate_factors(*ranges[0], chunk_size=chunk_size)]
+        else:
+            uri = app.config['SQLALCHEMY_DATABASE_URI']
+            with ProcessPoolExecutor(len(ranges), mp_context=multiprocessing.get_context('spawn')) as pool:
+                results = list(pool.map(run_range, *zip(*[(uri, lo, hi, chunk_size) for lo, hi in ranges])))
+        for r in results:
+            print(f"users {r['user_id_min']}-{r['user_id_max']}: {r['updated']} activities at factor set "
+                  f"{r['factor_version']}{'' if r['finished'] else ' (unfinished)'}")
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--check', is_flag=True, help='Only compare the rollups with raw activities.')
+    def rebuild_rollups_command(check):
+        """Regenerate the per-user daily rollups and stats from raw activities."""
+        from src.utils.rollups import check_rollups, rebuild_rollups
+
+        if not check:
+            print(f"Rebuilt {rebuild_rollups()} daily rollup rows.")
+        report = check_rollups()
+        for key, have, want in report['examples']:
+            print(f"{key}: stored {have}, activities {want}")
+        if report['mismatches']:
+            raise click.ClickException(f"{report['mismatches']} rollups do not match the activities")
+        print(f"{report['rows']} daily rollups match the activities.")
+
+    if app.config.get('AUTO_CREATE_SCHEMA', True):
+        schema_ready = threading.Event()
+        schema_lock = threading.Lock()
+
+        @app.before_request
+        def ensure_schema():
+            if schema_ready.is_set():
+                return
+            with schema_lock:
+                if not schema_ready.is_set():
+                    db.create_all()
+                    schema_ready.set()
 
     return app
 
 app = create_app()
 
 if __name__ == "__main__":
-    app.run(host='localhost', port=5000, debug=True)
-import os
-
-port = int(os.environ.get("PORT", 5000))  # Render sets PORT dynamically
-app.run(host="0.0.0.0", port=port)
\ No newline at end of file
+    init_schema(app)
+    if "PORT" in os.environ:
+        port = int(os.environ["PORT"])  # Render sets PORT dynamically
+        app.run(host="0.0.0.0", port=port)
+    else:
+        app.run(host='localhost', port=5000, debug=True)
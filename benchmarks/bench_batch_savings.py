@@ -0,0 +1,90 @@
+"""
+Benchmark compute_savings_batch against calling compute_savings per activity.
+
+Generates parsed activities over every activity the rule parsers can emit,
+with assorted units and quantities, checks that both paths agree exactly and
+times them. Encoding the parses into columns is timed separately: bulk paths
+that read columns straight from the database skip it.
+
+Run from the repository root:
+    python benchmarks/bench_batch_savings.py [--activities N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.calculator import ActivityColumns, compute_savings, compute_savings_batch
+from src.utils.factors import UNITS
+from src.utils.rules import known_activities
+
+EXTRA_ACTIVITIES = [('vegan_meal', 'food', 'pork'), ('solar_panel', 'energy', None), ('unknown', 'other', None)]
+
+
+def generate_parsed(n, seed=7):
+    """Parsed activity dictionaries shaped like the parsers' output."""
+    rng = random.Random(seed)
+    triples = sorted(known_activities(), key=str) + EXTRA_ACTIVITIES
+    units = sorted(UNITS) + ['', None, 'bananas']
+    parsed = []
+    for _ in range(n):
+        action, category, instead_of = rng.choice(triples)
+        quantity = rng.choice([rng.uniform(0, 100), rng.randint(0, 400) / 8, rng.randint(0, 9999) / 2000])
+        item = {'action': action, 'category': category, 'quantity': quantity,
+                'unit': rng.choice(units), 'instead_of': instead_of}
+        if rng.random() < 0.3:
+            item['subcategory'] = f"{category}_{action}"
+        parsed.append(item)
+    return parsed
+
+
+def mismatches(parsed, result):
+    """Indexes where the batch result differs from compute_savings."""
+    bad = []
+    for k, item in enumerate(parsed):
+        saved, meta = compute_savings(item)
+        batch = (result['co2_saved_kg'][k], result['quantity'][k], result['unit'][k],
+                 result['category'][k], result['co2_factor'][k])
+        if (saved, meta['quantity'], meta['unit'], meta['category'], meta['co2_factor']) != batch:
+            bad.append(k)
+    return bad
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--activities', type=int, default=200000)
+    args = ap.parse_args()
+
+    parsed = generate_parsed(args.activities)
+
+    start = time.perf_counter()
+    for item in parsed:
+        compute_savings(item)
+    scalar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns = ActivityColumns.from_parsed(parsed)
+    encode = time.perf_counter() - start
+    start = time.perf_counter()
+    result = compute_savings_batch(columns)
+    batch = time.perf_counter() - start
+
+    bad = mismatches(parsed, result)
+    if bad:
+        print(f"❌ Batch disagrees with compute_savings on {len(bad)} activities, e.g. {parsed[bad[0]]}")
+        sys.exit(1)
+
+    n = len(parsed)
+    print(f"{n:,} activities, results identical")
+    print(f"compute_savings per activity : {n / scalar:14,.0f} activities/sec")
+    print(f"compute_savings_batch        : {n / batch:14,.0f} activities/sec ({scalar / batch:.1f}x)")
+    print(f"  + encoding parsed dicts    : {n / (batch + encode):14,.0f} activities/sec "
+          f"({scalar / (batch + encode):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
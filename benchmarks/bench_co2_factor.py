@@ -0,0 +1,78 @@
+"""
+Benchmark get_co2_factor's lookup table against direct factor resolution.
+
+Checks that the table returns exactly what the probing logic returns for
+every activity the rule parsers can emit, plus combinations only an LLM would
+produce, then times both.
+
+Run from the repository root:
+    python benchmarks/bench_co2_factor.py [--rounds N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.utils.calculator  # noqa: F401  (precomputes the known activities)
+from src.utils.factors import FACTORS, _resolve_co2_factor, get_co2_factor
+from src.utils.rules import known_activities
+
+# Combinations the rules never emit but Gemini or the classifier might
+UNSEEN = [
+    ('vegan_meal', 'food', 'pork'),
+    ('plant_based', 'food', None),
+    ('solar_panel', 'energy', None),
+    ('shorter_shower', 'water', None),
+    ('taxi', 'transportation', 'car'),
+    ('electric_car', 'transportation', 'car'),
+    ('compost', 'waste', 'throw_away'),
+    ('reduce_screen_time', 'digital', 'normal_usage'),
+    ('unknown', 'other', None),
+]
+
+
+def activities():
+    return sorted(known_activities(), key=str) + UNSEEN
+
+
+def mismatches(triples):
+    """Triples for which the table and direct resolution disagree."""
+    return [t for t in triples if get_co2_factor(*t) != _resolve_co2_factor(*t)]
+
+
+def calls_per_second(fn, triples, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for action, category, instead_of in triples:
+            fn(action, category, instead_of)
+    elapsed = time.perf_counter() - start
+    return rounds * len(triples) / elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--rounds', type=int, default=2000)
+    args = ap.parse_args()
+
+    triples = activities()
+    bad = mismatches(triples)
+    # Changing a factor must invalidate the table
+    FACTORS['walk_kg_per_km'] = FACTORS['walk_kg_per_km']
+    bad += mismatches(triples)
+    if bad:
+        print(f"❌ Lookup table disagrees with direct resolution on: {bad}")
+        sys.exit(1)
+
+    before = calls_per_second(_resolve_co2_factor, triples, args.rounds)
+    after = calls_per_second(get_co2_factor, triples, args.rounds)
+    print(f"{len(triples)} activities ({len(UNSEEN)} not emitted by the rules)")
+    print(f"direct resolution : {before:12,.0f} calls/sec")
+    print(f"lookup table      : {after:12,.0f} calls/sec")
+    print(f"speedup           : {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
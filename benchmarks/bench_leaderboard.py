@@ -0,0 +1,147 @@
+"""
+Benchmark the in-memory leaderboard index against scanning raw activities.
+
+Builds a SQLite database with the given number of users and activities,
+fills the rollups with rebuild_rollups(), checks that the index returns the
+same top users as the old join/group/sort over Activity, then times both,
+plus the index's rank lookup and a write followed by a resync.
+
+Run from the repository root (the default size takes a few minutes and a
+few GB of disk):
+    python benchmarks/bench_leaderboard.py [--users N] [--activities N] [--rounds N]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+
+from config import Config
+from src.models.db import db, User, Activity
+from src.utils.leaderboard import LeaderboardIndex
+from src.utils.rollups import rebuild_rollups
+
+INSERT_CHUNK = 200000
+
+
+def scan_top_users(limit):
+    """The leaderboard query used before the index: join, group and sort every activity."""
+    rows = (db.session
+            .query(User.username, func.sum(Activity.co2_saved_kg).label('total'))
+            .join(Activity, Activity.user_id == User.id)
+            .group_by(User.id)
+            .order_by(func.sum(Activity.co2_saved_kg).desc())
+            .limit(limit)
+            .all())
+    return [{'username': r[0], 'total_saved_kg': round(float(r[1] or 0.0), 3)} for r in rows]
+
+
+def create_benchmark_app(path):
+    from app import create_app
+
+    config = type('BenchConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+                                             'AUTO_CREATE_SCHEMA': False})
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def fill_database(path, users, activities, seed=11):
+    """Insert users and activities straight through sqlite3, skewed so a few users log a lot."""
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.executemany('INSERT INTO user (id, username) VALUES (?, ?)',
+                     ((n, f'user{n}') for n in range(1, users + 1)))
+    remaining = activities
+    while remaining:
+        batch = []
+        for _ in range(min(INSERT_CHUNK, remaining)):
+            user_id = min(int(rng.paretovariate(1.2)), users) if rng.random() < 0.2 else rng.randint(1, users)
+            created = start + timedelta(seconds=rng.randrange(365 * 86400))
+            batch.append((user_id, 'x', round(rng.uniform(0, 5), 3),
+                          created.isoformat(' ', 'microseconds'), created.date().isoformat()))
+        conn.executemany('INSERT INTO activity (user_id, raw_entry, co2_saved_kg, created_at, day) '
+                         'VALUES (?, ?, ?, ?, ?)', batch)
+        remaining -= len(batch)
+    conn.commit()
+    conn.close()
+
+
+def mismatches(index, limit):
+    """Positions where the index's top users differ from the activity scan."""
+    expected = scan_top_users(limit)
+    got = index.top(limit)
+    # Equal totals may be ordered differently; compare the totals position by position
+    return [k for k, (a, b) in enumerate(zip(expected, got)) if a['total_saved_kg'] != b['total_saved_kg']] + (
+        [len(got)] if len(got) != len(expected) else [])
+
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--users', type=int, default=100000)
+    ap.add_argument('--activities', type=int, default=10000000)
+    ap.add_argument('--rounds', type=int, default=3)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'leaderboard.db')
+        app = create_benchmark_app(path)
+        t0 = time.perf_counter()
+        fill_database(path, args.users, args.activities)
+        print(f"{args.users:,} users, {args.activities:,} activities inserted in {time.perf_counter() - t0:.1f}s")
+
+        with app.app_context():
+            t0 = time.perf_counter()
+            rebuild_rollups()
+            print(f"rebuild-rollups           : {time.perf_counter() - t0:10.2f} s")
+
+            index = LeaderboardIndex()
+            t0 = time.perf_counter()
+            index.sync()
+            print(f"index load (worker start) : {time.perf_counter() - t0:10.2f} s")
+
+            bad = mismatches(index, 50)
+            if bad:
+                print(f"❌ Index and activity scan disagree at positions {bad}")
+                sys.exit(1)
+
+            scan = timed(lambda: scan_top_users(50), args.rounds)
+            top = timed(lambda: (index.sync(), index.top(50)), args.rounds * 1000)
+            user_ids = [random.randint(1, args.users) for _ in range(1000)]
+            rank = timed(lambda: [index.rank(u) for u in user_ids], args.rounds) / len(user_ids)
+
+            def write_and_sync():
+                db.session.add(Activity(user_id=random.randint(1, args.users), raw_entry='x', co2_saved_kg=1.0))
+                db.session.commit()
+                index.sync()
+            write = timed(write_and_sync, args.rounds * 20)
+
+            print(f"scan top 50               : {scan * 1000:10.2f} ms")
+            print(f"index sync + top 50       : {top * 1000:10.4f} ms")
+            print(f"index rank lookup         : {rank * 1e6:10.2f} us")
+            print(f"log activity + resync     : {write * 1000:10.2f} ms")
+            print(f"speedup (top 50)          : {scan / top:10.0f}x")
+            db.session.remove()
+
+
+if __name__ == "__main__":
+    main()
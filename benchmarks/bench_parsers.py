@@ -0,0 +1,225 @@
+"""
+Throughput, latency and accuracy of every activity parser on the labelled corpus.
+
+Runs parser._legacy_parse_entry, calculator._legacy_parse,
+SimpleActivityParser, AIActivityParser and the HybridRouter over the corpus
+from parser_corpus.py. The AI parser talks to a stub model that answers with the
+corpus label after an optional delay, so the run needs no API key and measures
+the parser's own overhead (prompt plumbing, JSON handling, validation). The
+router uses the same stub and also reports the share of entries it answered
+without calling it.
+
+Results go to a JSON file tagged with the git commit and corpus digest; pass a
+previous file with --compare to print the change per parser.
+
+Run from the repository root:
+    python benchmarks/bench_parsers.py [--corpus FILE | --size 4000] [--ai-latency-ms 0]
+                                       [--out FILE] [--compare FILE]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.parser_corpus import ACTION_ALIASES, build_corpus, corpus_digest, load_corpus
+from src.utils.ai_parser import AIActivityParser
+from src.utils.ai_parser_simple import SimpleActivityParser
+from src.utils.cache import normalize_entry
+from src.utils.classifier import train
+from src.utils.calculator import _legacy_parse
+from src.utils.llm_cache import template_hash
+from src.utils.parser import _legacy_parse_entry
+from src.utils.router import HybridRouter
+
+DEFAULT_OUT = os.path.join(ROOT, 'benchmarks', 'results', 'parsers-{commit}.json')
+
+
+class StubModelChain:
+    """
+    Stand-in for the Gemini LLMChain: answers with the labelled parse.
+
+    Unknown or negative entries get an empty object, which the parser treats
+    as an invalid response (as it would a confused model).
+    """
+
+    def __init__(self, corpus, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self.answers = {}
+        for item in corpus:
+            label = item['label']
+            response = dict(label, confidence=0.95) if label else {}
+            self.answers[normalize_entry(item['entry'])] = json.dumps(response)
+
+    def run(self, activity_text):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return f"```json\n{self.answers.get(activity_text, '{}')}\n```"
+
+
+def stub_ai_parser(corpus, latency=0.0):
+    """AIActivityParser wired to StubModelChain, with the response cache off."""
+    parser = AIActivityParser.__new__(AIActivityParser)
+    parser.model_name = 'stub-model'
+    parser.chain = StubModelChain(corpus, latency)
+    parser.batch_chain = None
+    parser.template_digest = template_hash('stub')
+    parser.cache = None
+    return parser
+
+
+def trained_classifier(corpus, seed):
+    """ActivityClassifier trained on a corpus drawn with a different seed (no shared sampling)."""
+    training = build_corpus(len(corpus), seed + 1)
+    return train((item['entry'], item['label']) for item in training if item['label'])
+
+
+def parsers(corpus, ai_latency, seed=2024):
+    ai_parse = stub_ai_parser(corpus, ai_latency).parse_activity
+    classifier = trained_classifier(corpus, seed)
+    return [
+        ('parser._legacy_parse_entry', _legacy_parse_entry),
+        ('calculator._legacy_parse', _legacy_parse),
+        ('SimpleActivityParser', SimpleActivityParser().parse_activity),
+        ('ActivityClassifier', classifier.predict),
+        ('AIActivityParser[stub]', ai_parse),
+        ('HybridRouter[stub]', HybridRouter(llm_parse=ai_parse, classify=None)),
+        ('HybridRouter+classifier[stub]', HybridRouter(llm_parse=ai_parse, classify=classifier.classify)),
+    ]
+
+
+def _quantity_matches(parsed, label):
+    try:
+        return abs(float(parsed.get('quantity')) - label['quantity']) < 1e-6
+    except (TypeError, ValueError):
+        return False
+
+
+def score(parsed, label):
+    """Return (action correct, action and quantity correct) for one entry."""
+    if label is None:
+        return parsed is None, parsed is None
+    if not parsed:
+        return False, False
+    action = parsed.get('action')
+    action_ok = ACTION_ALIASES.get(action, action) == label['action']
+    return action_ok, action_ok and _quantity_matches(parsed, label)
+
+
+def _percentile(sorted_values, pct):
+    idx = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+def run_parser(fn, corpus):
+    """Time every call and score it against the labels."""
+    latencies = []
+    action_hits = exact_hits = 0
+    clock = time.perf_counter
+    start = clock()
+    for item in corpus:
+        t0 = clock()
+        parsed = fn(item['entry'])
+        latencies.append(clock() - t0)
+        action_ok, exact_ok = score(parsed, item['label'])
+        action_hits += action_ok
+        exact_hits += exact_ok
+    total = clock() - start
+    latencies.sort()
+    n = len(corpus)
+    return {
+        'entries': n,
+        'entries_per_sec': round(n / total, 1),
+        'p50_us': round(_percentile(latencies, 50) * 1e6, 2),
+        'p99_us': round(_percentile(latencies, 99) * 1e6, 2),
+        'mean_us': round(statistics.fmean(latencies) * 1e6, 2),
+        'action_accuracy': round(action_hits / n, 4),
+        'accuracy': round(exact_hits / n, 4),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_benchmark(corpus, ai_latency=0.0, seed=2024):
+    """Benchmark every parser; returns the JSON-ready results document."""
+    results = {}
+    for name, fn in parsers(corpus, ai_latency, seed):
+        if isinstance(fn, HybridRouter):
+            results[name] = run_parser(fn.parse, corpus)
+            results[name]['without_llm'] = fn.stats()['without_llm']
+        else:
+            results[name] = run_parser(fn, corpus)
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'corpus': {'entries': len(corpus), 'digest': corpus_digest(corpus)},
+        'ai_latency_ms': ai_latency * 1000,
+        'parsers': results,
+    }
+
+
+def compare(previous, current):
+    """Print per-parser changes against an earlier results document."""
+    if previous['corpus']['digest'] != current['corpus']['digest']:
+        print("⚠️  Corpus differs from the compared run; accuracy changes may come from the corpus")
+    print(f"\nChange since {previous['commit']}:")
+    for name, now in current['parsers'].items():
+        before = previous['parsers'].get(name)
+        if not before:
+            continue
+        speed = now['entries_per_sec'] / before['entries_per_sec'] - 1
+        accuracy = now['accuracy'] - before['accuracy']
+        print(f"  {name:30} throughput {speed:+7.1%}  p99 {now['p99_us'] - before['p99_us']:+8.2f}us  "
+              f"accuracy {accuracy:+.4f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Throughput, latency and accuracy of every activity parser")
+    ap.add_argument('--corpus', help="JSON lines file from parser_corpus.py (default: generate)")
+    ap.add_argument('--size', type=int, default=4000)
+    ap.add_argument('--seed', type=int, default=2024)
+    ap.add_argument('--ai-latency-ms', type=float, default=0.0)
+    ap.add_argument('--out', default=DEFAULT_OUT, help="Results file; {commit} is substituted")
+    ap.add_argument('--compare', help="Earlier results file to compare against")
+    args = ap.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else build_corpus(args.size, args.seed)
+    doc = run_benchmark(corpus, args.ai_latency_ms / 1000.0, args.seed)
+
+    print(f"{len(corpus)} entries, corpus {doc['corpus']['digest']}, commit {doc['commit']}\n")
+    print(f"{'parser':30} {'entries/s':>11} {'p50':>9} {'p99':>9} {'action':>7} {'exact':>7}")
+    for name, r in doc['parsers'].items():
+        print(f"{name:30} {r['entries_per_sec']:11,.0f} {r['p50_us']:7.2f}us {r['p99_us']:7.2f}us "
+              f"{r['action_accuracy']:7.1%} {r['accuracy']:7.1%}"
+              + (f"  ({r['without_llm']:.1%} without LLM)" if 'without_llm' in r else ''))
+
+    out = args.out.format(commit=doc['commit'])
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(doc, f, indent=2)
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), doc)
+
+
+if __name__ == "__main__":
+    main()
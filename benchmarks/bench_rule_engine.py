@@ -0,0 +1,93 @@
+"""
+Per-entry cost of the shared rule engine behind the three rule-based parsers.
+
+Checks that parser._legacy_parse_entry, calculator._legacy_parse and
+SimpleActivityParser return exactly what their original hand-written versions
+did on a generated corpus, then reports microseconds per entry for each.
+
+Run from the repository root:
+    python benchmarks/bench_rule_engine.py [--entries 5000] [--rounds 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.ai_parser_simple import SimpleActivityParser
+from src.utils.calculator import _legacy_parse
+from src.utils.parser import _legacy_parse_entry
+from benchmarks.reference_parsers import (
+    reference_legacy_parse,
+    reference_legacy_parse_entry,
+    reference_simple_parse,
+)
+
+VERBS = ['walked', 'cycled', 'took the bus', 'rode a bike', 'had a veg lunch', 'ate vegetarian',
+         'skipped', 'refilled my bottle', 'recycled', 'reused', 'did not use my phone',
+         'digital detox', 'screen free', 'carpool', 'unplugged', 'took the train', 'went to']
+OBJECTS = ['', 'plastic bottles', 'beef', 'chicken', 'dinner', 'meatless meal', 'smartphone',
+           'devices', 'led bulb', 'cloth bag', 'farmers market', 'the park']
+AMOUNTS = ['', '2', '3.5', '0', '24', '12 km', '5 kilometers', '40 miles', '6 hours', '90 minutes',
+           '2 days', '3 times', '1 trip']
+TAILS = ['', 'instead of car', 'instead of driving', 'instead of bus', 'instead of beef', 'today']
+
+
+def generate_entries(n, seed=0):
+    """Random mixes of verbs, objects, amounts and alternatives, in mixed case."""
+    rng = random.Random(seed)
+    entries = []
+    for _ in range(n):
+        words = [rng.choice(VERBS), rng.choice(AMOUNTS), rng.choice(OBJECTS), rng.choice(TAILS)]
+        rng.shuffle(words)
+        text = '  '.join(w for w in words if w)
+        entries.append(text.upper() if rng.random() < 0.1 else text)
+    return entries + ['', '   ']
+
+
+PARSERS = [
+    ('parser._legacy_parse_entry', reference_legacy_parse_entry, _legacy_parse_entry),
+    ('calculator._legacy_parse', reference_legacy_parse, _legacy_parse),
+    ('SimpleActivityParser', reference_simple_parse, SimpleActivityParser().parse_activity),
+]
+
+
+def mismatches(reference, engine, entries):
+    return [e for e in entries if reference(e) != engine(e)]
+
+
+def us_per_entry(fn, entries, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for entry in entries:
+            fn(entry)
+    return (time.perf_counter() - start) * 1e6 / (rounds * len(entries))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-entry cost of the shared rule engine")
+    ap.add_argument('--entries', type=int, default=5000)
+    ap.add_argument('--rounds', type=int, default=5)
+    args = ap.parse_args()
+
+    entries = generate_entries(args.entries)
+    failed = False
+    print(f"{'entry point':28} {'before':>10} {'after':>10} {'speedup':>8}")
+    for name, reference, engine in PARSERS:
+        wrong = mismatches(reference, engine, entries)
+        if wrong:
+            failed = True
+            print(f"❌ {name} disagrees with its original on {len(wrong)} entries, e.g. {wrong[:3]}")
+            continue
+        before = us_per_entry(reference, entries, args.rounds)
+        after = us_per_entry(engine, entries, args.rounds)
+        print(f"{name:28} {before:8.2f}us {after:8.2f}us {before / after:7.2f}x")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
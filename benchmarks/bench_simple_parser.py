@@ -0,0 +1,70 @@
+"""
+Benchmark SimpleActivityParser against the original substring-probing parser.
+
+Run from the repository root:
+    python benchmarks/bench_simple_parser.py [--rounds N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.ai_parser_simple import SimpleActivityParser
+from benchmarks.reference_parsers import reference_simple_parse as reference_parse
+
+ENTRIES = [
+    "walked 2 km instead of driving",
+    "cycled 5 km instead of bus",
+    "took the bus 10 km instead of car",
+    "ate vegetarian instead of beef",
+    "had a veggie lunch instead of chicken",
+    "recycled 3 bottles",
+    "reused 2 jars",
+    "used a cloth bag at the store",
+    "unplugged 4 devices overnight",
+    "used LED bulbs for 5 hours",
+    "did not used smartphone for 24 hours",
+    "avoided using phone for 6 hours",
+    "digital detox 2 days",
+    "screen free for 90 minutes",
+    "carpool to work 3 times",
+    "bought local food at the farmers market",
+    "took the train 40 miles",
+    "reduced screen time by 2 hours",
+    "went to a concert",
+    "",
+]
+
+
+def entries_per_second(fn, entries, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for entry in entries:
+            fn(entry)
+    elapsed = time.perf_counter() - start
+    return rounds * len(entries) / elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--rounds', type=int, default=5000)
+    args = ap.parse_args()
+
+    parser = SimpleActivityParser()
+    mismatches = [e for e in ENTRIES if parser.parse_activity(e) != reference_parse(e)]
+    if mismatches:
+        print(f"❌ Compiled matcher disagrees with reference on: {mismatches}")
+        sys.exit(1)
+
+    before = entries_per_second(reference_parse, ENTRIES, args.rounds)
+    after = entries_per_second(parser.parse_activity, ENTRIES, args.rounds)
+    print(f"reference parser : {before:12,.0f} entries/sec")
+    print(f"rule engine      : {after:12,.0f} entries/sec")
+    print(f"speedup          : {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
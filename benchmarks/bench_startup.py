@@ -0,0 +1,105 @@
+"""
+Cold-start benchmark for the app factory.
+
+Imports ``app`` in fresh interpreters, reports the median wall time and the
+slowest modules from ``python -X importtime``, and exits non-zero when the
+median exceeds the budget or a deferred heavy dependency was imported.
+
+Run from the repository root:
+    python benchmarks/bench_startup.py [--budget-ms 1500] [--runs 5] [--top 15]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be imported while the app starts; they load on first use
+DEFERRED_MODULES = ('langchain', 'langchain_google_genai', 'google.generativeai', 'numpy', 'authlib')
+
+PROBE = """
+import sys, time
+t0 = time.perf_counter()
+import app
+elapsed = (time.perf_counter() - t0) * 1000
+loaded = [m for m in {deferred!r} if m in sys.modules]
+print(f"{{elapsed:.1f}}|{{','.join(loaded)}}")
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    # Keep the probe away from the real database and any .env side effects
+    env.setdefault('DATABASE_URL', 'sqlite://')
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+    return env
+
+
+def measure_once():
+    """Import app in a fresh interpreter; return (ms, deferred modules that got loaded)."""
+    out = subprocess.run(
+        [sys.executable, '-c', PROBE.format(deferred=DEFERRED_MODULES)],
+        cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+    ).stdout.strip().splitlines()[-1]
+    ms, loaded = out.split('|')
+    return float(ms), [m for m in loaded.split(',') if m]
+
+
+def importtime_report(top):
+    """Return the ``top`` slowest modules by cumulative import time (us)."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def check_startup(budget_ms, runs=5):
+    """Return (median ms, list of problems); an empty list means within budget."""
+    timings = []
+    loaded = set()
+    for _ in range(runs):
+        ms, mods = measure_once()
+        timings.append(ms)
+        loaded.update(mods)
+    median = statistics.median(timings)
+    problems = []
+    if median > budget_ms:
+        problems.append(f"median cold import {median:.1f} ms exceeds budget {budget_ms:.0f} ms")
+    if loaded:
+        problems.append(f"deferred modules imported at startup: {', '.join(sorted(loaded))}")
+    return median, problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Cold-start benchmark for the app factory")
+    ap.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', 1500)))
+    ap.add_argument('--runs', type=int, default=5)
+    ap.add_argument('--top', type=int, default=15)
+    args = ap.parse_args()
+
+    print("Slowest imports (cumulative):")
+    for cumulative_us, self_us, name in importtime_report(args.top):
+        print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {name}")
+
+    median, problems = check_startup(args.budget_ms, args.runs)
+    print(f"\nCold import of app: median {median:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
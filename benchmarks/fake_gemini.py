@@ -0,0 +1,360 @@
+"""
+Local stand-in for the Gemini REST API, for load and latency testing.
+
+Serves ``POST /v1beta/models/<model>:generateContent`` (and the v1 /
+streamGenerateContent / countTokens variants) the way the google-generativeai
+REST transport expects, so AIActivityParser and /chatbot/message can run
+against it without spending API quota:
+
+- activity parse prompts (single and batched) are answered with JSON derived
+  from the rule engine, or from canned responses keyed by entry text;
+- any other prompt (the chatbot) gets a short canned reply.
+
+Latency (fixed, uniform, normal or exponential), an error rate and a hang
+rate can be injected, and changed at runtime with ``POST /_fake/config``.
+``GET /_fake/stats`` reports request counts.
+
+Point the app at it with:
+    GOOGLE_API_KEY=fake GEMINI_API_ENDPOINT=http://127.0.0.1:8765 flask --app app run
+
+Run from the repository root:
+    python benchmarks/fake_gemini.py [--port 8765] [--latency-ms 300 --latency-dist normal --jitter-ms 100]
+                                     [--error-rate 0.05 --error-status 503] [--hang-rate 0.01 --hang-seconds 30]
+                                     [--canned responses.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.cache import normalize_entry
+from src.utils.rules import RULE_SETS
+
+ROUTE_RE = re.compile(r'^/(?P<version>v1\w*)/models/(?P<model>[^/:]+):(?P<method>\w+)$')
+SINGLE_RE = re.compile(r'Activity to analyze: "(?P<entry>.*)"\s*Return only', re.DOTALL)
+BATCH_MARKER = 'Activities to analyze (a JSON array of strings):'
+CHAT_RE = re.compile(r'User message: (?P<message>.*?)\n', re.DOTALL)
+
+ERROR_STATUS = {429: 'RESOURCE_EXHAUSTED', 500: 'INTERNAL', 503: 'UNAVAILABLE', 504: 'DEADLINE_EXCEEDED'}
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'exponential')
+
+UNKNOWN_ACTIVITY = {
+    'action': 'eco_product', 'category': 'other', 'quantity': 1.0, 'unit': 'items',
+    'instead_of': 'conventional_product', 'subcategory': 'other_eco_product', 'confidence': 0.3,
+}
+
+CHAT_REPLIES = [
+    "Great question! 🌱 Small daily swaps like walking short trips add up to real CO2 savings.",
+    "Every vegetarian meal instead of beef saves around 7 kg of CO2 🥗 Keep it up!",
+    "Try logging your activities in EcoTrack AI to see your savings grow 📈",
+]
+
+
+class FaultConfig:
+    """
+    Latency and failure injection settings, safe to change while serving.
+
+    Args:
+        latency_ms: Mean added latency
+        latency_dist: One of LATENCY_DISTRIBUTIONS
+        jitter_ms: Half-width (uniform) or standard deviation (normal)
+        error_rate: Fraction of requests answered with ``error_status``
+        error_status: HTTP status of injected errors (429, 500, 503 or 504)
+        hang_rate: Fraction of requests held for ``hang_seconds`` first, to
+                   trip client timeouts
+        hang_seconds: How long a hung request is held
+        seed: Seed for the fault random generator (None for nondeterministic)
+    """
+
+    FIELDS = ('latency_ms', 'latency_dist', 'jitter_ms', 'error_rate', 'error_status', 'hang_rate', 'hang_seconds')
+
+    def __init__(self, latency_ms=0.0, latency_dist='fixed', jitter_ms=0.0, error_rate=0.0,
+                 error_status=503, hang_rate=0.0, hang_seconds=30.0, seed=None):
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.latency_ms = 0.0
+        self.latency_dist = 'fixed'
+        self.jitter_ms = 0.0
+        self.error_rate = 0.0
+        self.error_status = 503
+        self.hang_rate = 0.0
+        self.hang_seconds = 30.0
+        self.update(latency_ms=latency_ms, latency_dist=latency_dist, jitter_ms=jitter_ms,
+                    error_rate=error_rate, error_status=error_status, hang_rate=hang_rate,
+                    hang_seconds=hang_seconds)
+
+    def update(self, **settings):
+        """Validate and apply new settings; raises ValueError on bad input."""
+        unknown = set(settings) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        if settings.get('latency_dist', self.latency_dist) not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_dist must be one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+        if int(settings.get('error_status', self.error_status)) not in ERROR_STATUS:
+            raise ValueError(f"error_status must be one of {sorted(ERROR_STATUS)}")
+        for rate in ('error_rate', 'hang_rate'):
+            if not 0.0 <= float(settings.get(rate, getattr(self, rate))) <= 1.0:
+                raise ValueError(f"{rate} must be between 0 and 1")
+        with self._lock:
+            for key, value in settings.items():
+                setattr(self, key, value if key == 'latency_dist' else
+                        int(value) if key == 'error_status' else float(value))
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def sample(self):
+        """
+        Draw the fate of one request.
+
+        Returns:
+            tuple: (seconds to wait, HTTP error status or None)
+        """
+        with self._lock:
+            rng = self._rng
+            mean = self.latency_ms / 1000.0
+            jitter = self.jitter_ms / 1000.0
+            if self.latency_dist == 'uniform':
+                delay = rng.uniform(mean - jitter, mean + jitter)
+            elif self.latency_dist == 'normal':
+                delay = rng.gauss(mean, jitter)
+            elif self.latency_dist == 'exponential':
+                delay = rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+            else:
+                delay = mean
+            if rng.random() < self.hang_rate:
+                delay += self.hang_seconds
+            status = self.error_status if rng.random() < self.error_rate else None
+        return max(0.0, delay), status
+
+
+def parse_entry_json(entry, canned):
+    """Rule-derived (or canned) parse in the shape the AI parser prompt asks for."""
+    key = normalize_entry(entry)
+    if key in canned:
+        return canned[key]
+    parsed = RULE_SETS['simple'].parse(key)
+    if parsed is None:
+        return dict(UNKNOWN_ACTIVITY)
+    parsed.setdefault('subcategory', f"{parsed['category']}_{parsed['action']}")
+    parsed['confidence'] = 0.9
+    return parsed
+
+
+def answer_prompt(prompt, canned=None):
+    """Text the fake model returns for a prompt."""
+    canned = canned or {}
+    if BATCH_MARKER in prompt:
+        start = prompt.index(BATCH_MARKER) + len(BATCH_MARKER)
+        try:
+            entries, _ = json.JSONDecoder().raw_decode(prompt[start:].lstrip())
+        except json.JSONDecodeError:
+            entries = []
+        return json.dumps([parse_entry_json(str(e), canned) for e in entries])
+    single = SINGLE_RE.search(prompt)
+    if single:
+        return json.dumps(parse_entry_json(single.group('entry'), canned))
+    chat = CHAT_RE.search(prompt)
+    message = chat.group('message').strip() if chat else prompt
+    return CHAT_REPLIES[sum(map(ord, message)) % len(CHAT_REPLIES)]
+
+
+def _prompt_text(body):
+    """Concatenate the text parts of a generateContent request body."""
+    parts = []
+    for content in body.get('contents') or []:
+        for part in content.get('parts') or []:
+            if 'text' in part:
+                parts.append(part['text'])
+    return '\n'.join(parts)
+
+
+def generate_content_response(text):
+    return {
+        'candidates': [{
+            'content': {'parts': [{'text': text}], 'role': 'model'},
+            'finishReason': 'STOP',
+            'index': 0,
+            'safetyRatings': [],
+        }],
+        'promptFeedback': {'safetyRatings': []},
+    }
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    server_version = 'FakeGemini/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b'{}'
+        return json.loads(raw or b'{}')
+
+    def _error(self, status, message):
+        self._send_json(status, {'error': {'code': status, 'message': message,
+                                           'status': ERROR_STATUS.get(status, 'INVALID_ARGUMENT')}})
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/_fake/stats':
+            return self._send_json(200, self.server.stats())
+        if path == '/_fake/config':
+            return self._send_json(200, self.server.faults.as_dict())
+        match = re.match(r'^/(v1\w*)/models/([^/:]+)$', path)
+        if match:
+            return self._send_json(200, {'name': f"models/{match.group(2)}", 'displayName': 'Fake Gemini'})
+        self._error(404, f"Unknown path {path}")
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0]
+        try:
+            body = self._read_json()
+        except (ValueError, UnicodeDecodeError):
+            return self._error(400, "Request body is not valid JSON")
+
+        if path == '/_fake/config':
+            try:
+                self.server.faults.update(**body)
+            except (TypeError, ValueError) as e:
+                return self._error(400, str(e))
+            return self._send_json(200, self.server.faults.as_dict())
+
+        match = ROUTE_RE.match(path)
+        if not match or match.group('method') not in ('generateContent', 'streamGenerateContent', 'countTokens'):
+            return self._error(404, f"Unknown path {path}")
+
+        prompt = _prompt_text(body)
+        if match.group('method') == 'countTokens':
+            return self._send_json(200, {'totalTokens': len(prompt.split())})
+
+        delay, status = self.server.faults.sample()
+        self.server.count('requests')
+        if delay:
+            time.sleep(delay)
+        if status is not None:
+            self.server.count('errors')
+            return self._error(status, "Injected failure")
+
+        response = generate_content_response(answer_prompt(prompt, self.server.canned))
+        self.server.count('responses')
+        if match.group('method') == 'streamGenerateContent':
+            return self._send_json(200, [response])
+        self._send_json(200, response)
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    """
+    Threaded fake Gemini server; use in-process or from the command line.
+
+    In tests::
+
+        with FakeGeminiServer(faults=FaultConfig(latency_ms=50)) as server:
+            monkeypatch.setenv('GEMINI_API_ENDPOINT', server.url)
+            ...
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free one)
+        faults: FaultConfig (defaults to no injected latency or errors)
+        canned: ``{entry text: parsed dict}`` answers that override the rules
+        verbose: Log every request to stderr
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, faults=None, canned=None, verbose=False):
+        super().__init__((host, port), FakeGeminiHandler)
+        self.faults = faults or FaultConfig()
+        self.canned = {normalize_entry(k): v for k, v in (canned or {}).items()}
+        self.verbose = verbose
+        self._counts = {'requests': 0, 'responses': 0, 'errors': 0}
+        self._counts_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name):
+        with self._counts_lock:
+            self._counts[name] += 1
+
+    def stats(self):
+        with self._counts_lock:
+            return dict(self._counts)
+
+    def start(self):
+        """Serve on a background daemon thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-gemini', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Local stand-in for the Gemini REST API")
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8765)
+    ap.add_argument('--latency-ms', type=float, default=0.0)
+    ap.add_argument('--latency-dist', choices=LATENCY_DISTRIBUTIONS, default='fixed')
+    ap.add_argument('--jitter-ms', type=float, default=0.0)
+    ap.add_argument('--error-rate', type=float, default=0.0)
+    ap.add_argument('--error-status', type=int, choices=sorted(ERROR_STATUS), default=503)
+    ap.add_argument('--hang-rate', type=float, default=0.0)
+    ap.add_argument('--hang-seconds', type=float, default=30.0)
+    ap.add_argument('--seed', type=int)
+    ap.add_argument('--canned', help="JSON file mapping entry text to the parsed object to return")
+    ap.add_argument('--verbose', action='store_true')
+    args = ap.parse_args()
+
+    canned = None
+    if args.canned:
+        with open(args.canned, encoding='utf-8') as f:
+            canned = json.load(f)
+    faults = FaultConfig(args.latency_ms, args.latency_dist, args.jitter_ms, args.error_rate,
+                         args.error_status, args.hang_rate, args.hang_seconds, args.seed)
+    server = FakeGeminiServer(args.host, args.port, faults, canned, args.verbose)
+    print(f"Fake Gemini listening on {server.url} ({faults.as_dict()})")
+    print(f"Point the app at it: GOOGLE_API_KEY=fake GEMINI_API_ENDPOINT={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
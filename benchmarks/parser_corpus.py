@@ -0,0 +1,159 @@
+"""
+Labelled corpus of activity entries for the parser benchmark.
+
+Entries are generated deterministically from phrasing templates, so the
+corpus is reproducible from a seed and its digest identifies it in stored
+results. Each label gives what a careful reader would extract (action in the
+AI parser's vocabulary, category, quantity, unit, instead_of); entries that
+describe no eco-friendly activity are labelled None.
+
+Write the corpus out as JSON lines:
+    python benchmarks/parser_corpus.py [--size 4000] [--seed 2024] [--out corpus.jsonl]
+"""
+
+import argparse
+import hashlib
+import json
+import random
+
+QUANTITIES = [1, 2, 3, 4, 5, 6, 8, 10, 12, 15, 20, 2.5, 7.5]
+
+# (action, category, unit, instead_of, template, default quantity)
+# ``{n}`` is replaced by a sampled quantity that becomes the label's quantity;
+# templates without it are labelled with the default quantity.
+TEMPLATES = [
+    ('walk', 'transportation', 'km', 'car', "walked {n} km instead of driving", 1),
+    ('walk', 'transportation', 'km', 'car', "Walked {n} km to the office instead of taking the car", 1),
+    ('walk', 'transportation', 'km', None, "walking {n} kilometers today", 1),
+    ('walk', 'transportation', 'km', None, "went on foot for {n} km", 1),
+    ('cycle', 'transportation', 'km', 'bus', "cycled {n} km instead of bus", 1),
+    ('cycle', 'transportation', 'km', None, "rode my bike {n} km to work", 1),
+    ('cycle', 'transportation', 'km', 'car', "cycling {n} km instead of car", 1),
+    ('cycle', 'transportation', 'km', None, "bicycle commute of {n} km", 1),
+    ('bus', 'transportation', 'km', 'car', "took the bus {n} km instead of car", 1),
+    ('bus', 'transportation', 'km', None, "rode the bus for {n} km", 1),
+    ('bus', 'transportation', 'km', 'car', "used public transport for {n} km instead of driving", 1),
+    ('train', 'transportation', 'km', 'car', "took the train {n} km instead of driving", 1),
+    ('train', 'transportation', 'km', None, "railway trip of {n} km", 1),
+    ('carpool', 'transportation', 'trips', 'car', "carpooled to work {n} times", 1),
+    ('carpool', 'transportation', 'trips', 'car', "shared ride with colleagues, {n} trips", 1),
+    ('led_bulb', 'energy', 'bulbs', 'incandescent', "installed {n} LED bulbs", 1),
+    ('led_bulb', 'energy', 'bulbs', 'incandescent', "switched to {n} energy efficient bulbs", 1),
+    ('unplug_devices', 'energy', 'devices', 'standby', "unplugged {n} devices overnight", 1),
+    ('unplug_devices', 'energy', 'devices', 'standby', "switched off {n} devices before bed", 1),
+    ('vegetarian_meal', 'food', 'meals', 'beef', "ate a vegetarian meal instead of beef", 1),
+    ('vegetarian_meal', 'food', 'meals', 'chicken', "had a veggie lunch instead of chicken", 1),
+    ('vegetarian_meal', 'food', 'meals', None, "had {n} vegan meals this week", 1),
+    ('vegetarian_meal', 'food', 'meals', None, "meatless dinner with the family", 1),
+    ('local_food', 'food', 'meals', 'imported', "bought local food at the farmers market", 1),
+    ('local_food', 'food', 'meals', 'imported', "cooked {n} meals with locally grown vegetables", 1),
+    ('recycle', 'waste', 'items', 'throw_away', "recycled {n} cans", 1),
+    ('recycle', 'waste', 'items', 'throw_away', "recycling {n} glass jars", 1),
+    ('reuse', 'waste', 'items', 'new_purchase', "reused {n} jars for storage", 1),
+    ('reuse', 'waste', 'items', 'new_purchase', "repurposed {n} old shirts as rags", 1),
+    ('avoid_plastic', 'waste', 'items', 'single_use', "skipped {n} plastic bottles", 1),
+    ('avoid_plastic', 'waste', 'items', 'single_use', "refilled my water bottle {n} times", 1),
+    ('avoid_plastic', 'waste', 'items', 'plastic_bag', "used a cloth bag at the store", 1),
+    ('avoid_plastic', 'waste', 'items', 'plastic_bag', "brought a reusable bag, no plastic", 1),
+    ('digital_detox', 'digital', 'hours', 'normal_usage', "did not use my phone for {n} hours", 24),
+    ('digital_detox', 'digital', 'hours', 'normal_usage', "avoided using smartphone for {n} hours", 24),
+    ('digital_detox', 'digital', 'hours', 'normal_usage', "digital detox for {n} hours", 24),
+    ('digital_detox', 'digital', 'hours', 'normal_usage', "screen free weekend evening", 24),
+    ('reduce_screen_time', 'digital', 'hours', 'normal_usage', "reduced screen time by {n} hours", 1),
+]
+
+NEGATIVES = [
+    "went to a concert",
+    "watched a movie with friends",
+    "had a long meeting",
+    "read a book on the sofa",
+    "called my mom",
+    "drove 20 km to the mall",
+    "ordered takeaway",
+    "slept in",
+]
+
+# Actions the legacy parsers report under other names
+ACTION_ALIASES = {
+    'meal_swap': 'vegetarian_meal',
+    'plastic_bottle': 'avoid_plastic',
+    'refill_bottle': 'avoid_plastic',
+    'cloth_bag': 'avoid_plastic',
+    'vegan_meal': 'vegetarian_meal',
+    'plant_based': 'vegetarian_meal',
+}
+
+
+def _vary(text, rng):
+    """Casing and whitespace noise that the parsers should ignore."""
+    roll = rng.random()
+    if roll < 0.1:
+        text = text.upper()
+    elif roll < 0.3:
+        text = text.capitalize()
+    if rng.random() < 0.1:
+        text = f"  {text.replace(' ', '  ', 1)} "
+    return text
+
+
+def build_corpus(size=4000, seed=2024, negative_share=0.1):
+    """
+    Generate labelled entries.
+
+    Args:
+        size: Number of entries
+        seed: Random seed; the same seed always yields the same corpus
+        negative_share: Fraction of entries that describe no activity
+
+    Returns:
+        list: ``{'entry': str, 'label': dict or None}`` items
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        if rng.random() < negative_share:
+            corpus.append({'entry': _vary(rng.choice(NEGATIVES), rng), 'label': None})
+            continue
+        action, category, unit, instead_of, template, default = rng.choice(TEMPLATES)
+        quantity = rng.choice(QUANTITIES) if '{n}' in template else default
+        n = int(quantity) if float(quantity).is_integer() else quantity
+        corpus.append({
+            'entry': _vary(template.format(n=n), rng),
+            'label': {
+                'action': action,
+                'category': category,
+                'quantity': float(quantity),
+                'unit': unit,
+                'instead_of': instead_of,
+            },
+        })
+    return corpus
+
+
+def corpus_digest(corpus):
+    """Short content hash, stored with results so runs on different corpora are not compared."""
+    blob = json.dumps(corpus, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+def load_corpus(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Write the labelled parser corpus as JSON lines")
+    ap.add_argument('--size', type=int, default=4000)
+    ap.add_argument('--seed', type=int, default=2024)
+    ap.add_argument('--out', default='parser_corpus.jsonl')
+    args = ap.parse_args()
+
+    corpus = build_corpus(args.size, args.seed)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        for item in corpus:
+            f.write(json.dumps(item) + '\n')
+    print(f"Wrote {len(corpus)} entries to {args.out} (digest {corpus_digest(corpus)})")
+
+
+if __name__ == "__main__":
+    main()
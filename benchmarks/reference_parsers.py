@@ -0,0 +1,242 @@
+"""
+The rule-based parsers as they were written before the shared rule engine.
+
+Kept verbatim (apart from names) so benchmarks and tests can check that the
+engine-backed entry points still return exactly the same results.
+"""
+
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.rules import ACTIVITY_PATTERNS
+
+DIST_RE = r'(?P<qty>\d+(?:\.\d+)?)\s*(?:km|kilometers?)'
+COUNT_RE = r'(?P<qty>\d+)'
+
+
+def reference_legacy_parse_entry(text):
+    """parser._legacy_parse_entry before the rule engine."""
+    if not text:
+        return None
+    t = text.lower().strip()
+
+    if 'walk' in t:
+        m = re.search(DIST_RE, t)
+        qty = float(m.group('qty')) if m else 1.0
+        instead = 'car' if ('instead of car' in t or 'instead of driving' in t or 'drive' in t) else None
+        return {'action': 'walk', 'quantity': qty, 'unit': 'km', 'instead_of': instead}
+
+    if 'cycle' in t or 'cycled' in t or 'bicycle' in t or 'bike' in t:
+        m = re.search(DIST_RE, t)
+        qty = float(m.group('qty')) if m else 1.0
+        instead = 'car' if 'instead of car' in t else ('bus' if 'instead of bus' in t else None)
+        return {'action': 'cycle', 'quantity': qty, 'unit': 'km', 'instead_of': instead}
+
+    if 'bus' in t and ('took' in t or 'ride' in t or 'rode' in t):
+        m = re.search(DIST_RE, t)
+        qty = float(m.group('qty')) if m else 1.0
+        instead = 'car' if 'instead of car' in t else None
+        return {'action': 'bus', 'quantity': qty, 'unit': 'km', 'instead_of': instead}
+
+    if ('vegetarian' in t or 'veg' in t) and 'beef' in t:
+        return {'action': 'meal_swap', 'from': 'beef', 'to': 'veg', 'quantity': 1, 'unit': 'meal'}
+    if ('vegetarian' in t or 'veg' in t) and 'chicken' in t:
+        return {'action': 'meal_swap', 'from': 'chicken', 'to': 'veg', 'quantity': 1, 'unit': 'meal'}
+    if ('meatless' in t or 'veg' in t or 'vegetarian' in t) and ('meal' in t or 'lunch' in t or 'dinner' in t):
+        return {'action': 'meal_swap', 'from': 'chicken', 'to': 'veg', 'quantity': 1, 'unit': 'meal'}
+
+    if 'bottle' in t or 'plastic bottle' in t:
+        m = re.search(COUNT_RE, t)
+        qty = int(m.group('qty')) if m else 1
+        if 'avoid' in t or 'skipped' in t or 'reused' in t or 'refill' in t or 'refilled' in t:
+            return {'action': 'plastic_bottle', 'quantity': qty, 'unit': 'count'}
+
+    return None
+
+
+def reference_legacy_parse(text):
+    """calculator._legacy_parse before the rule engine."""
+    if not text:
+        return None
+
+    t = text.lower().strip()
+    DIST_RE = r'(?P<qty>\d+(?:\.\d+)?)\s*(?:km|kilometers?)'
+    COUNT_RE = r'(?P<qty>\d+)'
+
+    if 'walk' in t:
+        m = re.search(DIST_RE, t)
+        qty = float(m.group('qty')) if m else 1.0
+        instead = 'car' if ('instead of car' in t or 'instead of driving' in t or 'drive' in t) else None
+        return {
+            'action': 'walk', 
+            'category': 'transportation',
+            'quantity': qty, 
+            'unit': 'km', 
+            'instead_of': instead
+        }
+
+    if 'cycle' in t or 'cycled' in t or 'bicycle' in t or 'bike' in t:
+        m = re.search(DIST_RE, t)
+        qty = float(m.group('qty')) if m else 1.0
+        instead = 'car' if 'instead of car' in t else ('bus' if 'instead of bus' in t else None)
+        return {
+            'action': 'cycle',
+            'category': 'transportation', 
+            'quantity': qty, 
+            'unit': 'km', 
+            'instead_of': instead
+        }
+
+    if 'bus' in t and ('took' in t or 'ride' in t or 'rode' in t):
+        m = re.search(DIST_RE, t)
+        qty = float(m.group('qty')) if m else 1.0
+        instead = 'car' if 'instead of car' in t else None
+        return {
+            'action': 'bus',
+            'category': 'transportation',
+            'quantity': qty, 
+            'unit': 'km', 
+            'instead_of': instead
+        }
+
+    if ('vegetarian' in t or 'veg' in t) and 'beef' in t:
+        return {
+            'action': 'meal_swap',
+            'category': 'food', 
+            'from': 'beef', 
+            'to': 'veg', 
+            'quantity': 1, 
+            'unit': 'meal'
+        }
+    if ('vegetarian' in t or 'veg' in t) and 'chicken' in t:
+        return {
+            'action': 'meal_swap',
+            'category': 'food',
+            'from': 'chicken', 
+            'to': 'veg', 
+            'quantity': 1, 
+            'unit': 'meal'
+        }
+    if ('meatless' in t or 'veg' in t or 'vegetarian' in t) and ('meal' in t or 'lunch' in t or 'dinner' in t):
+        return {
+            'action': 'meal_swap',
+            'category': 'food',
+            'from': 'chicken', 
+            'to': 'veg', 
+            'quantity': 1, 
+            'unit': 'meal'
+        }
+
+    if 'bottle' in t or 'plastic bottle' in t:
+        m = re.search(COUNT_RE, t)
+        qty = int(m.group('qty')) if m else 1
+        if 'avoid' in t or 'skipped' in t or 'reused' in t or 'refill' in t or 'refilled' in t:
+            return {
+                'action': 'plastic_bottle',
+                'category': 'waste', 
+                'quantity': qty, 
+                'unit': 'count'
+            }
+
+    # Digital activities
+    if ('did not use' in t or 'didnt use' in t or 'avoided using' in t) and ('phone' in t or 'smartphone' in t):
+        # Extract hours from text
+        hours = 24.0
+        hour_match = re.search(r'(\d+(?:\.\d+)?)\s*hours?', t)
+        if hour_match:
+            hours = float(hour_match.group(1))
+        
+        return {
+            'action': 'digital_detox',
+            'category': 'digital',
+            'quantity': hours,
+            'unit': 'hours',
+            'instead_of': 'normal_usage'
+        }
+    
+    if 'digital detox' in t or 'screen free' in t or 'phone free' in t:
+        hours = 24.0
+        hour_match = re.search(r'(\d+(?:\.\d+)?)\s*hours?', t)
+        if hour_match:
+            hours = float(hour_match.group(1))
+        
+        return {
+            'action': 'digital_detox', 
+            'category': 'digital',
+            'quantity': hours,
+            'unit': 'hours',
+            'instead_of': 'normal_usage'
+        }
+
+    return None
+
+
+def reference_simple_parse(text):
+    """SimpleActivityParser.parse_activity before the compiled matcher."""
+    if not text or not text.strip():
+        return None
+    text = text.lower().strip()
+
+    def extract_number(t):
+        numbers = re.findall(r'\d+(?:\.\d+)?', t)
+        return float(numbers[0]) if numbers else None
+
+    if ('did not use' in text or 'didnt use' in text or 'avoided using' in text) and ('smartphone' in text or 'phone' in text):
+        hours = 24.0
+        if '24 hours' in text or '24 hour' in text:
+            hours = 24.0
+        elif 'hour' in text:
+            hour_match = re.search(r'(\d+(?:\.\d+)?)\s*hours?', text)
+            if hour_match:
+                hours = float(hour_match.group(1))
+        return {'action': 'digital_detox', 'category': 'digital', 'quantity': hours, 'unit': 'hours',
+                'instead_of': 'normal_usage', 'subcategory': 'digital_detox', 'confidence': 0.9}
+
+    if any(pattern in text for pattern in ['digital detox', 'screen free', 'phone free']):
+        hours = extract_number(text) or 24.0
+        if 'minute' in text:
+            hours = hours / 60.0
+        elif 'day' in text:
+            hours = hours * 24.0
+        return {'action': 'digital_detox', 'category': 'digital', 'quantity': hours, 'unit': 'hours',
+                'instead_of': 'normal_usage', 'subcategory': 'digital_detox', 'confidence': 0.8}
+
+    quantity = extract_number(text)
+    if quantity is None:
+        quantity = 1.0
+
+    if 'recycle' in text or 'recycling' in text:
+        quantity = extract_number(text) or 1.0
+        return {'action': 'recycle', 'category': 'waste', 'quantity': quantity, 'unit': 'items',
+                'instead_of': 'throw_away', 'subcategory': 'waste_recycle', 'confidence': 0.8}
+
+    for category, actions in ACTIVITY_PATTERNS.items():
+        for action, config in actions.items():
+            if any(pattern in text for pattern in config['patterns']):
+                unit = config['default_unit']
+                if 'km' in text or 'kilometer' in text:
+                    unit = 'km'
+                elif 'mile' in text:
+                    unit = 'miles'
+                elif 'hour' in text:
+                    unit = 'hours'
+                elif 'trip' in text or 'time' in text:
+                    unit = 'trips'
+
+                if 'instead of car' in text or 'drive' in text or 'driving' in text:
+                    instead_of = 'car'
+                elif 'instead of bus' in text:
+                    instead_of = 'bus'
+                elif 'instead of beef' in text or 'beef' in text:
+                    instead_of = 'beef'
+                elif 'instead of chicken' in text or 'chicken' in text:
+                    instead_of = 'chicken'
+                else:
+                    instead_of = config['default_instead_of']
+
+                return {'action': action, 'category': category, 'quantity': quantity, 'unit': unit,
+                        'instead_of': instead_of, 'subcategory': f"{category}_{action}", 'confidence': 0.8}
+    return None
@@ -5,3 +5,11 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///ecotrack.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JSON_SORT_KEYS = False
+    # Create missing tables on the first request instead of at import time
+    AUTO_CREATE_SCHEMA = os.getenv("AUTO_CREATE_SCHEMA", "1").lower() not in ("0", "false", "no")
+    # Longest /api/log may wait for the AI parser before answering from rules
+    LOG_LATENCY_BUDGET_MS = float(os.getenv("LOG_LATENCY_BUDGET_MS", 2500))
+    # JSON factor catalog replacing the built-in factors; re-read when the file changes
+    FACTOR_CATALOG_PATH = os.getenv("FACTOR_CATALOG_PATH", "")
+    # SQLite file holding the top-N leaderboards shared by all workers
+    LEADERBOARD_CACHE_PATH = os.getenv("LEADERBOARD_CACHE_PATH", os.path.join("instance", "leaderboard_cache.sqlite3"))
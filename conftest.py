@@ -0,0 +1,44 @@
+"""
+Shared pytest fixtures: the Flask app on an in-memory SQLite database.
+"""
+
+import pytest
+
+from config import Config
+from src.models.db import db
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SECRET_KEY = 'test'
+
+
+@pytest.fixture
+def app(tmp_path):
+    from app import create_app
+
+    app = create_app(TestConfig)
+    # A file, as in production: ':memory:' would give every thread its own cache
+    app.config['LEADERBOARD_CACHE_PATH'] = str(tmp_path / 'leaderboard_cache.sqlite3')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    """In-process fake Gemini server; GEMINI_API_ENDPOINT points the app at it."""
+    from benchmarks.fake_gemini import FakeGeminiServer
+
+    with FakeGeminiServer() as server:
+        monkeypatch.setenv('GEMINI_API_ENDPOINT', server.url)
+        monkeypatch.setenv('GOOGLE_API_KEY', 'fake')
+        yield server
@@ -72,5 +72,105 @@ def migrate_database():
     finally:
         conn.close()
 
+def migrate_activity_factor_columns():
+    """Add the parsed-activity and factor version columns to the Activity table."""
+    db_path = 'instance/ecotrack.db'
+    
+    if not os.path.exists(db_path):
+        print("Database file not found!")
+        return
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("PRAGMA table_info(activity)")
+        columns = [row[1] for row in cursor.fetchall()]
+        
+        new_columns = [
+            ('action', 'VARCHAR(64)'),
+            ('action_category', 'VARCHAR(64)'),
+            ('instead_of', 'VARCHAR(64)'),
+            ('factor_version', 'VARCHAR(16)')
+        ]
+        
+        for col_name, col_type in new_columns:
+            if col_name not in columns:
+                cursor.execute(f"ALTER TABLE activity ADD COLUMN {col_name} {col_type}")
+                print(f"Added column: activity.{col_name}")
+        
+        conn.commit()
+        print("Activity factor columns are up to date.")
+        
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Migration error: {e}")
+    finally:
+        conn.close()
+
+def migrate_activity_day_column():
+    """Add and backfill Activity.day and create the per-user activity indexes."""
+    db_path = 'instance/ecotrack.db'
+    
+    if not os.path.exists(db_path):
+        print("Database file not found!")
+        return
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("PRAGMA table_info(activity)")
+        columns = [row[1] for row in cursor.fetchall()]
+        
+        if 'day' not in columns:
+            cursor.execute("ALTER TABLE activity ADD COLUMN day DATE")
+            print("Added column: activity.day")
+        
+        cursor.execute("UPDATE activity SET day = date(created_at) WHERE day IS NULL AND created_at IS NOT NULL")
+        print(f"Backfilled activity.day for {cursor.rowcount} rows")
+        
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_activity_user_created ON activity (user_id, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_activity_user_day ON activity (user_id, day, co2_saved_kg)")
+        cursor.execute("ANALYZE activity")
+        
+        conn.commit()
+        print("Activity day column and indexes are up to date.")
+        
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Migration error: {e}")
+    finally:
+        conn.close()
+
+def migrate_rollup_tables():
+    """Create the rollup tables and fill them from the existing activities."""
+    db_path = 'instance/ecotrack.db'
+    
+    if not os.path.exists(db_path):
+        print("Database file not found!")
+        return
+    
+    # The app's models define the tables; rebuild_rollups() fills them
+    from app import app
+    from src.models.db import db
+    from src.utils.rollups import check_rollups, rebuild_rollups
+    
+    with app.app_context():
+        try:
+            db.create_all()
+            print(f"Rebuilt {rebuild_rollups()} daily rollup rows.")
+            report = check_rollups()
+            if report['mismatches']:
+                print(f"Migration error: {report['mismatches']} rollups do not match the activities")
+            else:
+                print("Rollup tables are up to date.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Migration error: {e}")
+
 if __name__ == "__main__":
     migrate_database()
+    migrate_activity_factor_columns()
+    migrate_activity_day_column()
+    migrate_rollup_tables()
@@ -1,9 +1,10 @@
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash
-from app import app
+from app import app, init_schema
 from src.models.db import db, User, Activity
 from src.utils.parser import parse_entry
-from src.utils.calculator import compute_savings
+from src.utils.calculator import ActivityColumns, compute_savings_batch
+from src.utils.factors import factor_set_version
 
 demo_users = [
     ("alice", "password1"),
@@ -19,6 +20,9 @@ entries = [
     "took bus 10 km instead of car",
 ]
 
+init_schema(app)
+version = factor_set_version()
+
 with app.app_context():
     for u, p in demo_users:
         user = User.query.filter_by(username=u).first()
@@ -28,20 +32,30 @@ with app.app_context():
             db.session.commit()
 
         base = datetime.utcnow().date() - timedelta(days=6)
+        rows = []
         for i, e in enumerate(entries):
             when = base + timedelta(days=i % 7)
             parsed = parse_entry(e)
             if not parsed: 
                 continue
-            saved, meta = compute_savings(parsed)
+            rows.append((e, parsed, datetime(when.year, when.month, when.day)))
+        if not rows:
+            continue
+        # Savings for all of this user's entries in one vectorized pass
+        result = compute_savings_batch(ActivityColumns.from_parsed(parsed for _, parsed, _ in rows))
+        for k, (e, parsed, created_at) in enumerate(rows):
             act = Activity(
                 user_id=user.id,
                 raw_entry=e,
-                category=meta.get("category"),
-                quantity=meta.get("quantity"),
-                unit=meta.get("unit"),
-                co2_saved_kg=saved,
-                created_at=datetime(when.year, when.month, when.day)
+                category=result['category'][k],
+                quantity=float(result['quantity'][k]),
+                unit=result['unit'][k],
+                co2_saved_kg=float(result['co2_saved_kg'][k]),
+                created_at=created_at,
+                action=parsed.get('action'),
+                action_category=parsed.get('category'),
+                instead_of=parsed.get('instead_of'),
+                factor_version=version
             )
             db.session.add(act)
     db.session.commit()
@@ -14,6 +14,11 @@ class User(UserMixin, db.Model):
     oauth_id = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+def _activity_day(context):
+    """Default for Activity.day: the UTC date of created_at."""
+    created_at = context.get_current_parameters().get('created_at')
+    return (created_at or datetime.utcnow()).date()
+
 class Activity(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -23,5 +28,70 @@ class Activity(db.Model):
     unit = db.Column(db.String(32), nullable=True)
     co2_saved_kg = db.Column(db.Float, default=0.0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # UTC date of created_at, stored so per-day queries group on an indexed column
+    day = db.Column(db.Date, nullable=True, default=_activity_day)
+    # Parsed fields the savings were computed from, and the factor set used
+    action = db.Column(db.String(64), nullable=True)
+    action_category = db.Column(db.String(64), nullable=True)
+    instead_of = db.Column(db.String(64), nullable=True)
+    factor_version = db.Column(db.String(16), nullable=True)
 
     user = db.relationship('User', backref=db.backref('activities', lazy=True))
+
+    __table_args__ = (
+        db.Index('ix_activity_user_created', 'user_id', 'created_at'),
+        # Covers per-user daily sums, so they are answered from the index alone
+        db.Index('ix_activity_user_day', 'user_id', 'day', 'co2_saved_kg'),
+    )
+
+class DailyRollup(db.Model):
+    """Per-user, per-day rollup of Activity, kept in step by src/utils/rollups.py."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    co2_sum = db.Column(db.Float, nullable=False, default=0.0)
+    activity_count = db.Column(db.Integer, nullable=False, default=0)
+
+class UserStats(db.Model):
+    """Running totals and streaks of one user, kept in step by src/utils/rollups.py."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    total_kg = db.Column(db.Float, nullable=False, default=0.0)
+    activity_count = db.Column(db.Integer, nullable=False, default=0)
+    first_day = db.Column(db.Date, nullable=True)
+    last_day = db.Column(db.Date, nullable=True)
+    # Consecutive active days ending at last_day, and the longest run ever
+    current_streak = db.Column(db.Integer, nullable=False, default=0)
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    # Increases with every write, so leaderboard indexes can fetch only changed rows
+    revision = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_user_stats_total', 'total_kg'),
+        db.Index('ix_user_stats_revision', 'revision'),
+    )
+
+class RevisionCounter(db.Model):
+    """Last revision handed out for a table, reserved by src/utils/rollups.py."""
+    name = db.Column(db.String(32), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class PeriodTotal(db.Model):
+    """Per-user totals of one calendar week or month, kept in step by src/utils/rollups.py."""
+    period = db.Column(db.String(8), primary_key=True)  # 'week' or 'month'
+    period_start = db.Column(db.Date, primary_key=True)  # Monday, or the 1st of the month (UTC)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    total_kg = db.Column(db.Float, nullable=False, default=0.0)
+    activity_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.Index('ix_period_total_rank', 'period', 'period_start', 'total_kg'),)
+
+class FactorRecalcProgress(db.Model):
+    """Resume point of one user_id range of a factor recalculation."""
+    id = db.Column(db.Integer, primary_key=True)
+    factor_version = db.Column(db.String(16), nullable=False)
+    user_id_min = db.Column(db.Integer, nullable=False)
+    user_id_max = db.Column(db.Integer, nullable=False)
+    last_activity_id = db.Column(db.Integer, nullable=False, default=0)
+    updated = db.Column(db.Integer, nullable=False, default=0)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.UniqueConstraint('factor_version', 'user_id_min', 'user_id_max'),)
@@ -1,11 +1,20 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_login import current_user
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, insert
 from src.models.db import db, User, Activity
-from src.utils.parser import parse_entry
-from src.utils.calculator import compute_savings, compute_savings_with_ai
-from src.utils.leaderboard import top_users
+from src.utils.activity_stats import daily_series
+from src.utils.calculator import compute_savings_all_within, compute_savings_all_rule_based, parse_cache_stats
+from src.utils.circuit_breaker import breakers_status, get_breaker
+from src.utils.factor_catalog import factor_catalog_status
+from src.utils.factors import factor_set_version
+from src.utils.metrics import RequestMetrics, log_metrics
+from src.utils.rollups import apply_activity_rollups
+from src.utils.router import hybrid_router
+from src.utils.leaderboard import (
+    LEADERBOARD_MAX_AGE, WINDOWS, clamp_limit, get_leaderboard_cache, leaderboard_revision, seconds_left,
+    top_users, user_rank, window_start,
+)
 
 api_bp = Blueprint('api', __name__)
 
@@ -25,6 +34,69 @@ def ensure_guest():
         # Try to fetch existing guest user again
         return User.query.filter_by(username="guest").first()
 
+def _save_activities(user, entry, activities):
+    """
+    Insert one Activity row per parsed activity with a single bulk INSERT,
+    add them to the daily rollups and commit.
+
+    Every row keeps the user's whole entry as raw_entry; the clause each
+    activity was parsed from is only reported in the response.
+
+    Returns False (after rollback) on database errors.
+    """
+    version = factor_set_version()
+    now = datetime.utcnow()
+    try:
+        db.session.execute(insert(Activity), [
+            {
+                'user_id': user.id,
+                'raw_entry': entry,
+                'category': meta.get('category'),
+                'quantity': meta.get('quantity'),
+                'unit': meta.get('unit'),
+                'co2_saved_kg': saved,
+                'action': parsed.get('action'),
+                'action_category': parsed.get('category'),
+                'instead_of': parsed.get('instead_of'),
+                'factor_version': version,
+                'created_at': now,
+                'day': now.date(),
+            }
+            for saved, meta, parsed, _ in activities
+        ])
+        apply_activity_rollups(db.session, [(user.id, now.date(), saved, 1) for saved, _, _, _ in activities])
+        db.session.commit()
+        return True
+    except Exception as db_error:
+        db.session.rollback()
+        print(f"Database error when saving activities: {db_error}")
+        return False
+
+def _describe(activities):
+    """Response payload shared by the AI and fallback paths."""
+    items = []
+    for saved, meta, parsed, clause in activities:
+        item_meta = meta.copy()
+        item_meta.update({
+            'action': parsed.get('action'),
+            'instead_of': parsed.get('instead_of'),
+            'confidence': parsed.get('confidence')
+        })
+        items.append({'entry': clause, 'co2_saved_kg': saved, 'meta': item_meta})
+    return {
+        'ok': True,
+        'co2_saved_kg': round(sum(item['co2_saved_kg'] for item in items), 3),
+        'meta': items[0]['meta'],
+        'activities': items,
+    }
+
+def _timed(response, metrics):
+    """Record request metrics and attach them as a Server-Timing header."""
+    log_metrics.record(metrics)
+    resp, *status = response if isinstance(response, tuple) else (response,)
+    resp.headers['Server-Timing'] = metrics.server_timing()
+    return (resp, *status) if status else resp
+
 @api_bp.route('/log', methods=['POST'])
 def log():
     data = request.get_json(silent=True) or request.form
@@ -32,98 +104,79 @@ def log():
     if not entry:
         return jsonify({'ok': False, 'error': 'Missing "entry"'}), 400
 
+    metrics = RequestMetrics(current_app.config.get('LOG_LATENCY_BUDGET_MS', 2500) / 1000.0)
     user = current_user if current_user.is_authenticated else ensure_guest()
 
-    # Try enhanced AI parsing first
+    # AI parsing within the latency budget, rule-based answer otherwise.
+    # Compound entries yield several activities, stored together below.
     try:
-        saved, meta, parsed = compute_savings_with_ai(entry)
+        activities = compute_savings_all_within(entry, metrics.remaining(), metrics)
         
-        if parsed is None:
-            return jsonify({
+        if not activities:
+            return _timed((jsonify({
                 'ok': False, 
                 'parsed': None, 
                 'message': 'Could not understand entry. Try describing your eco-friendly activity differently.'
-            }), 200
+            }), 200), metrics)
         
-        # Create activity record with proper error handling
-        try:
-            act = Activity(
-                user_id=user.id,
-                raw_entry=entry,
-                category=meta.get('category'),
-                quantity=meta.get('quantity'),
-                unit=meta.get('unit'),
-                co2_saved_kg=saved
-            )
-            db.session.add(act)
-            db.session.commit()
-        except Exception as db_error:
-            db.session.rollback()
-            print(f"Database error when saving activity: {db_error}")
-            return jsonify({
+        with metrics.stage('db'):
+            stored = _save_activities(user, entry, activities)
+        if not stored:
+            return _timed((jsonify({
                 'ok': False, 
                 'error': 'Failed to save activity to database'
-            }), 500
+            }), 500), metrics)
 
-        # Include additional metadata in response
-        response_meta = meta.copy()
-        if parsed:
-            response_meta.update({
-                'action': parsed.get('action'),
-                'instead_of': parsed.get('instead_of'),
-                'confidence': parsed.get('confidence')
-            })
-
-        return jsonify({
-            'ok': True, 
-            'co2_saved_kg': saved, 
-            'meta': response_meta,
-            'message': f"Great! You saved {saved} kg of CO2 by {parsed.get('action', 'your eco-friendly action')}."
-        })
+        payload = _describe(activities)
+        actions = [a['meta']['action'] or 'your eco-friendly action' for a in payload['activities']]
+        did = actions[0] if len(actions) == 1 else f"{', '.join(actions[:-1])} and {actions[-1]}"
+        payload['message'] = f"Great! You saved {payload['co2_saved_kg']} kg of CO2 by {did}."
+        return _timed(jsonify(payload), metrics)
         
     except Exception as e:
-        # Fallback to original parsing if AI fails
+        # Fallback to the rule-based parsers only, so this path stays fast
         print(f"AI parsing failed, using fallback: {e}")
+        metrics.path = 'fallback'
         
         try:
-            parsed = parse_entry(entry)
-            if parsed is None:
-                return jsonify({
+            with metrics.stage('rules'):
+                activities = compute_savings_all_rule_based(entry)
+            if not activities:
+                return _timed((jsonify({
                     'ok': False, 
                     'parsed': None, 
                     'message': 'Could not understand entry. Please try describing your activity more clearly.'
-                }), 200
+                }), 200), metrics)
 
-            saved, meta = compute_savings(parsed)
-            
-            # Database operation with error handling
-            try:
-                act = Activity(
-                    user_id=user.id,
-                    raw_entry=entry,
-                    category=meta.get('category'),
-                    quantity=meta.get('quantity'),
-                    unit=meta.get('unit'),
-                    co2_saved_kg=saved
-                )
-                db.session.add(act)
-                db.session.commit()
-            except Exception as db_error:
-                db.session.rollback()
-                print(f"Database error when saving activity (fallback): {db_error}")
-                return jsonify({
+            with metrics.stage('db'):
+                stored = _save_activities(user, entry, activities)
+            if not stored:
+                return _timed((jsonify({
                     'ok': False, 
                     'error': 'Failed to save activity to database'
-                }), 500
+                }), 500), metrics)
 
-            return jsonify({'ok': True, 'co2_saved_kg': saved, 'meta': meta})
+            return _timed(jsonify(_describe(activities)), metrics)
             
         except Exception as fallback_error:
             print(f"Both AI and fallback parsing failed: {fallback_error}")
-            return jsonify({
+            return _timed((jsonify({
                 'ok': False,
                 'error': 'Failed to process activity entry'
-            }), 500
+            }), 500), metrics)
+
+@api_bp.route('/metrics', methods=['GET'])
+def metrics_snapshot():
+    """Per-path latency aggregates for /api/log, parse cache, routing and leaderboard cache counters (this worker)."""
+    return jsonify({'ok': True, 'log': log_metrics.snapshot(), 'parse_cache': parse_cache_stats(),
+                    'routing': hybrid_router.stats(), 'leaderboard_cache': get_leaderboard_cache().stats()})
+
+@api_bp.route('/status', methods=['GET'])
+def status():
+    """Circuit breaker states for the external services and the loaded factor set (this worker)."""
+    get_breaker('gemini')
+    return jsonify({'ok': True, 'breakers': breakers_status(),
+                    'factors': {'version': factor_set_version(), 'catalog': factor_catalog_status()}})
 
 @api_bp.route('/stats', methods=['GET'])
 def stats():
@@ -135,20 +188,34 @@ def stats():
     end = datetime.utcnow().date()
     start = end - timedelta(days=days-1)
 
-    rows = (db.session
-            .query(func.date(Activity.created_at), func.sum(Activity.co2_saved_kg))
-            .filter(Activity.user_id == user.id, Activity.created_at >= start)
-            .group_by(func.date(Activity.created_at))
-            .all())
-
-    series = {str(start + timedelta(days=i)): 0.0 for i in range(days)}
-    total = 0.0
-    for d, s in rows:
-        series[str(d)] = float(s or 0.0)
-        total += float(s or 0.0)
+    series = daily_series(user.id, start, days)
+    total = sum(series.values())
     return jsonify({'ok': True, 'series': series, 'total': round(total, 3)})
 
 @api_bp.route('/leaderboard', methods=['GET'])
 def leaderboard():
-    leaders = top_users(limit=int(request.args.get('limit', 10)))
-    return jsonify({'ok': True, 'leaders': leaders})
+    window = request.args.get('window', 'all')
+    if window not in WINDOWS:
+        return jsonify({'ok': False, 'error': f'"window" must be one of {", ".join(WINDOWS)}'}), 400
+    try:
+        limit = clamp_limit(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({'ok': False, 'error': '"limit" must be an integer'}), 400
+    start = window_start(window)
+    leaders = top_users(limit=limit, window=window)
+    payload = {'ok': True, 'window': window, 'period_start': start and str(start), 'leaders': leaders}
+    if current_user.is_authenticated:
+        payload['me'] = user_rank(current_user.id, window)
+
+    # Cacheable per window until the totals change or the period rolls over
+    resp = jsonify(payload)
+    etag = f"{window}-{start}-{leaderboard_revision()}"
+    if current_user.is_authenticated:
+        etag += f"-u{current_user.id}"
+        resp.cache_control.private = True
+    else:
+        resp.cache_control.public = True
+    left = seconds_left(window)
+    resp.cache_control.max_age = int(min(LEADERBOARD_MAX_AGE, left) if left is not None else LEADERBOARD_MAX_AGE)
+    resp.set_etag(etag)
+    return resp.make_conditional(request)
@@ -1,25 +1,44 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from authlib.integrations.flask_client import OAuth
 from src.models.db import db, User
 import os
+import threading
 
 auth_bp = Blueprint('auth', __name__)
 
-# Initialize OAuth
-oauth = OAuth()
+_oauth_lock = threading.Lock()
 
-# Configure Google OAuth
-google = oauth.register(
-    name='google',
-    client_id=os.getenv('GOOGLE_CLIENT_ID'),
-    client_secret=os.getenv('GOOGLE_CLIENT_SECRET'),
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={
-        'scope': 'openid email profile'
-    }
-)
+def get_google_client():
+    """
+    Return the Google OAuth client for the current app.
+    
+    authlib is imported and the client registered on the first Google login
+    rather than at startup, since password logins never need it.
+    """
+    app = current_app._get_current_object()
+    oauth = app.extensions.get('authlib.integrations.flask_client')
+    client = oauth.create_client('google') if oauth is not None else None
+    if client is not None:
+        return client
+
+    with _oauth_lock:
+        oauth = app.extensions.get('authlib.integrations.flask_client')
+        if oauth is None:
+            from authlib.integrations.flask_client import OAuth
+            oauth = OAuth(app)
+        if oauth.create_client('google') is None:
+            # Configure Google OAuth
+            oauth.register(
+                name='google',
+                client_id=os.getenv('GOOGLE_CLIENT_ID'),
+                client_secret=os.getenv('GOOGLE_CLIENT_SECRET'),
+                server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+                client_kwargs={
+                    'scope': 'openid email profile'
+                }
+            )
+        return oauth.create_client('google')
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -59,11 +78,11 @@ def signup():
 @auth_bp.route('/login/google')
 def google_login():
     redirect_uri = url_for('auth.google_callback', _external=True)
-    return google.authorize_redirect(redirect_uri)
+    return get_google_client().authorize_redirect(redirect_uri)
 
 @auth_bp.route('/callback/google')
 def google_callback():
-    token = google.authorize_access_token()
+    token = get_google_client().authorize_access_token()
     user_info = token.get('userinfo')
     
     if user_info:
@@ -1,10 +1,12 @@
 from flask import Blueprint, render_template, redirect, url_for, request, jsonify, session
 from flask_login import current_user
-from sqlalchemy import func
 from datetime import datetime, timedelta
 from src.models.db import db, User, Activity
+from src.utils.activity_stats import daily_series, total_saved as total_saved_kg
 from src.utils.badges import evaluate_badges
-from src.utils.leaderboard import top_users
+from src.utils.circuit_breaker import get_breaker
+from src.utils.gemini import gemini_client_kwargs
+from src.utils.leaderboard import WINDOWS, top_users
 from src.utils.quotes import pick_quote
 
 main_bp = Blueprint('main', __name__)
@@ -19,22 +21,10 @@ def index():
     uid = current_user.id
 
     # Totals for this user
-    total_saved = 0.0
-    series = {}
     today = datetime.utcnow().date()
     week_ago = today - timedelta(days=6)
-    series = {str(week_ago + timedelta(days=i)): 0.0 for i in range(7)}
-
-    total_saved = (db.session.query(func.sum(Activity.co2_saved_kg))
-                   .filter_by(user_id=uid).scalar() or 0.0)
-
-    rows = (db.session
-            .query(func.date(Activity.created_at), func.sum(Activity.co2_saved_kg))
-            .filter(Activity.user_id == uid, Activity.created_at >= week_ago)
-            .group_by(func.date(Activity.created_at))
-            .all())
-    for d, s in rows:
-        series[str(d)] = float(s or 0.0)
+    series = daily_series(uid, week_ago, 7)
+    total_saved = total_saved_kg(uid)
 
     badges = evaluate_badges(uid)
     leaders = top_users(limit=5)
@@ -50,8 +40,11 @@ def index():
 
 @main_bp.route('/leaderboard')
 def leaderboard_page():
-    leaders = top_users(limit=50)
-    return render_template('leaderboard.html', leaders=leaders)
+    window = request.args.get('window', 'all')
+    if window not in WINDOWS:
+        window = 'all'
+    leaders = top_users(limit=50, window=window)
+    return render_template('leaderboard.html', leaders=leaders, window=window, windows=WINDOWS)
 
 
 @main_bp.route('/chatbot')
@@ -88,11 +81,15 @@ def chatbot_message():
             import google.generativeai as genai
             
             api_key = os.getenv('GOOGLE_API_KEY')
+            gemini_breaker = get_breaker('gemini')
             if not api_key:
                 bot_response = "I'm sorry, but I need to be configured with an API key to chat with you. Please ask an administrator to set up the GOOGLE_API_KEY environment variable. 🤖"
+            elif gemini_breaker.is_open():
+                # Gemini is failing; answer locally until the breaker allows a trial call
+                bot_response = generate_fallback_response(user_message)
             else:
                 # Configure and create model
-                genai.configure(api_key=api_key)
+                genai.configure(api_key=api_key, **gemini_client_kwargs())
                 model = genai.GenerativeModel('gemini-2.0-flash-thinking-exp')
                 
                 # Create context from recent chat history
@@ -129,7 +126,7 @@ User message: {user_message}
 Respond as EcoBot:"""
                 
                 # Get response from AI
-                response = model.generate_content(prompt)
+                response = gemini_breaker.call(model.generate_content, prompt)
                 bot_response = response.text
                 
         except Exception as e:
@@ -188,7 +188,7 @@ document.addEventListener('DOMContentLoaded', () => {
             result.innerHTML = `
               <div class="flex items-center justify-center gap-2">
                 <span>🎉</span>
-                <span>Saved ${resp.co2_saved_kg} kg CO₂ (${resp.meta.category})</span>
+                <span>Saved ${resp.co2_saved_kg} kg CO₂ (${(resp.activities || [resp]).map(a => a.meta.category).join(', ')})</span>
               </div>
             `;
             result.classList.remove('hidden');
@@ -0,0 +1,68 @@
+"""
+Per-user activity aggregates shared by the dashboard, /api/stats and badges.
+
+The helpers read the DailyRollup and UserStats tables (see
+src/utils/rollups.py), so their cost depends on the number of days asked
+for, not on how many activities a user has logged: each read is a primary
+key search on a rollup table.
+"""
+
+from datetime import date, timedelta
+from typing import Dict
+
+from sqlalchemy import select
+
+from src.models.db import db, DailyRollup, UserStats
+
+
+def daily_series(user_id: int, start: date, days: int) -> Dict[str, float]:
+    """
+    CO2 saved per day over a window, with zero for days without activities.
+
+    Args:
+        user_id: User whose activities are summed
+        start: First day of the window
+        days: Window length in days
+
+    Returns:
+        dict: ISO date -> kg CO2 saved, in date order
+    """
+    series = {str(start + timedelta(days=i)): 0.0 for i in range(days)}
+    rows = db.session.execute(
+        select(DailyRollup.day, DailyRollup.co2_sum)
+        .where(DailyRollup.user_id == user_id, DailyRollup.day >= start, DailyRollup.activity_count > 0)
+    )
+    for day, saved in rows:
+        series[str(day)] = float(saved or 0.0)
+    return series
+
+
+def user_stats(user_id: int):
+    """
+    A user's UserStats row, read fresh from the database.
+
+    Returns:
+        Row or None: total_kg, activity_count, first_day, last_day,
+                     current_streak and longest_streak
+    """
+    return db.session.execute(select(*UserStats.__table__.c).where(UserStats.user_id == user_id)).first()
+
+
+def total_saved(user_id: int) -> float:
+    """All-time kg CO2 saved by a user."""
+    stats = user_stats(user_id)
+    return float(stats.total_kg) if stats else 0.0
+
+
+def current_streak(stats, today: date) -> int:
+    """Consecutive active days ending today (0 when nothing was logged today)."""
+    if stats is None or stats.last_day != today:
+        return 0
+    return stats.current_streak
+
+
+def active_days(user_id: int) -> set:
+    """Dates on which a user logged at least one activity."""
+    return set(db.session.execute(
+        select(DailyRollup.day).where(DailyRollup.user_id == user_id, DailyRollup.activity_count > 0)
+    ).scalars())
@@ -3,62 +3,54 @@ AI-powered parser using GEMINI LLM to understand and categorize environmental ac
 """
 
 import os
+import importlib.util
 import json
 import re
 import warnings
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 from dotenv import load_dotenv
 
+from .batch_parser import AI_BATCH_SIZE, BatchingParser
+from .cache import normalize_entry
+from .circuit_breaker import CircuitOpenError, get_breaker
+from .gemini import gemini_client_kwargs
+from .llm_cache import get_llm_cache, template_hash
+from .singleflight import SingleFlight
+
 # Suppress NumPy warnings
 warnings.filterwarnings("ignore", category=RuntimeWarning, module="numpy")
 
 # Load environment variables
 load_dotenv()
 
-# Try to import AI dependencies
-try:
+# Shared with the chatbot: one breaker for every Gemini call in this process
+gemini_breaker = get_breaker('gemini')
+
+# langchain and google.generativeai (which pull in NumPy) are heavy, so they are
+# only imported when the first AIActivityParser is created
+LANGCHAIN_MODULES = ('langchain', 'langchain_google_genai', 'google.generativeai')
+
+def langchain_available() -> bool:
+    """Check whether the AI dependencies are installed, without importing them."""
+    try:
+        return all(importlib.util.find_spec(name) is not None for name in LANGCHAIN_MODULES)
+    except (ImportError, ValueError):
+        return False
+
+LANGCHAIN_AVAILABLE = langchain_available()
+
+def _import_langchain():
+    """Import the langchain/GEMINI classes on first use."""
     from langchain_google_genai import ChatGoogleGenerativeAI
-    from langchain_core.prompts import PromptTemplate
-    from langchain.chains import LLMChain
-    import google.generativeai as genai
-    LANGCHAIN_AVAILABLE = True
-except ImportError:
     try:
-        from langchain_google_genai import ChatGoogleGenerativeAI
-        from langchain.prompts import PromptTemplate  
-        from langchain.chains import LLMChain
-        import google.generativeai as genai
-        LANGCHAIN_AVAILABLE = True
+        from langchain_core.prompts import PromptTemplate
     except ImportError:
-        # Set dummy classes to avoid NameError
-        ChatGoogleGenerativeAI = None
-        PromptTemplate = None
-        LLMChain = None
-        genai = None
-        LANGCHAIN_AVAILABLE = False
+        from langchain.prompts import PromptTemplate
+    from langchain.chains import LLMChain
+    import google.generativeai as genai
+    return ChatGoogleGenerativeAI, PromptTemplate, LLMChain, genai
 
-class AIActivityParser:
-    def __init__(self):
-        """Initialize the AI parser with GEMINI model."""
-        if not LANGCHAIN_AVAILABLE:
-            raise ImportError("langchain dependencies not available")
-            
-        self.api_key = os.getenv('GOOGLE_API_KEY')
-        if not self.api_key:
-            raise ValueError("GOOGLE_API_KEY environment variable is required")
-        
-        # Configure the GEMINI model
-        genai.configure(api_key=self.api_key)
-        self.model = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash-exp",
-            google_api_key=self.api_key,
-            temperature=0.1
-        )
-        
-        # Define the prompt template for activity parsing
-        self.prompt_template = PromptTemplate(
-            input_variables=["activity_text"],
-            template="""
+PARSE_INSTRUCTIONS = """
 You are an expert environmental activity parser. Your job is to analyze user input about eco-friendly activities and extract structured data.
 
 Please analyze this activity description and return a JSON object with the following structure:
@@ -110,13 +102,73 @@ Guidelines:
 - Set confidence based on clarity of the input
 - Use descriptive subcategories for specific variants
 
-Activity to analyze: "{activity_text}"
+"""
+
+SINGLE_PARSE_TEMPLATE = PARSE_INSTRUCTIONS + """Activity to analyze: "{activity_text}"
 
 Return only valid JSON, no explanation:
 """
+
+BATCH_PARSE_TEMPLATE = PARSE_INSTRUCTIONS + """Activities to analyze (a JSON array of strings):
+{activity_list}
+
+Return only a valid JSON array containing exactly one object per activity, in the same order, no explanation:
+"""
+
+REQUIRED_FIELDS = ('action', 'category', 'quantity', 'unit')
+
+class AIActivityParser:
+    # Answer entries the LLM failed on from the rule parser and regex patterns
+    fallback = True
+    model_name = "gemini-2.0-flash-exp"
+    # Cache key part of answers from BATCH_PARSE_TEMPLATE (see parse_batch)
+    batch_template_digest = template_hash(BATCH_PARSE_TEMPLATE)
+
+    def __init__(self, fallback: bool = True):
+        """
+        Initialize the AI parser with GEMINI model.
+
+        Args:
+            fallback: Guess from the rule parser and regex patterns when the
+                      LLM fails; with False those entries parse to None
+        """
+        self.fallback = fallback
+        if not LANGCHAIN_AVAILABLE:
+            raise ImportError("langchain dependencies not available")
+        try:
+            ChatGoogleGenerativeAI, PromptTemplate, LLMChain, genai = _import_langchain()
+        except ImportError as e:
+            raise ImportError(f"langchain dependencies not available: {e}")
+            
+        self.api_key = os.getenv('GOOGLE_API_KEY')
+        if not self.api_key:
+            raise ValueError("GOOGLE_API_KEY environment variable is required")
+        
+        # Configure the GEMINI model
+        genai.configure(api_key=self.api_key, **gemini_client_kwargs())
+        self.model = ChatGoogleGenerativeAI(
+            model=self.model_name,
+            google_api_key=self.api_key,
+            temperature=0.1,
+            **gemini_client_kwargs()
+        )
+        
+        # Define the prompt templates for single and batched activity parsing
+        self.prompt_template = PromptTemplate(
+            input_variables=["activity_text"],
+            template=SINGLE_PARSE_TEMPLATE
+        )
+        self.batch_prompt_template = PromptTemplate(
+            input_variables=["activity_list"],
+            template=BATCH_PARSE_TEMPLATE
         )
         
         self.chain = LLMChain(llm=self.model, prompt=self.prompt_template)
+        self.batch_chain = LLMChain(llm=self.model, prompt=self.batch_prompt_template)
+        
+        # Responses are cached on disk per template/model/normalized text
+        self.template_digest = template_hash(self.prompt_template.template)
+        self.cache = get_llm_cache()
     
     def parse_activity(self, text: str) -> Optional[Dict[str, Any]]:
         """
@@ -131,40 +183,125 @@ Return only valid JSON, no explanation:
         if not text or not text.strip():
             return None
         
+        entry = normalize_entry(text)
+        cached = self._cached(entry)
+        if cached is not None:
+            return cached
+        
         try:
             # Get response from GEMINI
-            response = self.chain.run(activity_text=text.strip())
-            
-            # Clean up the response (remove any markdown formatting)
-            response = response.strip()
-            if response.startswith('```json'):
-                response = response[7:]
-            if response.endswith('```'):
-                response = response[:-3]
+            response = gemini_breaker.call(self.chain.run, activity_text=entry)
+            parsed_data = self._validate(json.loads(self._clean_response(response)))
+            if parsed_data is None:
+                return self._no_llm_answer(text)
             
-            # Parse JSON response
-            parsed_data = json.loads(response.strip())
-            
-            # Validate required fields
-            required_fields = ['action', 'category', 'quantity', 'unit']
-            if not all(field in parsed_data for field in required_fields):
-                return self._fallback_parse(text)
-            
-            # Ensure numeric quantity
-            try:
-                parsed_data['quantity'] = float(parsed_data['quantity'])
-            except (ValueError, TypeError):
-                parsed_data['quantity'] = 1.0
-            
-            # Set default confidence if not provided
-            if 'confidence' not in parsed_data:
-                parsed_data['confidence'] = 0.8
+            if self.cache is not None:
+                self.cache.set(self.template_digest, self.model_name, entry, parsed_data)
             
             return parsed_data
             
+        except CircuitOpenError:
+            # Gemini is failing; answer from the rule parser without calling it
+            return self._no_llm_answer(text, circuit_open=True)
         except (json.JSONDecodeError, Exception) as e:
             print(f"AI parsing failed: {e}")
-            return self._fallback_parse(text)
+            return self._no_llm_answer(text)
+    
+    def parse_batch(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Parse several activity descriptions with a single GEMINI call.
+        
+        Cached entries and duplicates are answered without the LLM; the rest
+        are sent together as one JSON array prompt.
+        
+        Args:
+            texts: Natural language descriptions, in request order
+            
+        Returns:
+            List of parsed activity dictionaries (or None), aligned with texts
+        """
+        entries = [normalize_entry(t) for t in texts]
+        results: Dict[str, Optional[Dict[str, Any]]] = {'': None}
+        pending = []
+        for entry in entries:
+            if entry in results or entry in pending:
+                continue
+            cached = self._cached(entry)
+            if cached is not None:
+                results[entry] = cached
+            else:
+                pending.append(entry)
+        
+        if len(pending) == 1:
+            results[pending[0]] = self.parse_activity(pending[0])
+        elif pending:
+            circuit_open = False
+            try:
+                response = gemini_breaker.call(self.batch_chain.run, activity_list=json.dumps(pending))
+                items = json.loads(self._clean_response(response))
+                if not isinstance(items, list) or len(items) != len(pending):
+                    raise ValueError(f"expected {len(pending)} results, got {len(items) if isinstance(items, list) else type(items).__name__}")
+            except CircuitOpenError:
+                circuit_open = True
+                items = [None] * len(pending)
+            except Exception as e:
+                print(f"AI batch parsing failed: {e}")
+                items = [None] * len(pending)
+            
+            for entry, item in zip(pending, items):
+                parsed_data = self._validate(item) if isinstance(item, dict) else None
+                if parsed_data is None:
+                    parsed_data = self._no_llm_answer(entry, circuit_open)
+                elif self.cache is not None:
+                    self.cache.set(self.batch_template_digest, self.model_name, entry, parsed_data)
+                results[entry] = parsed_data
+        
+        # Duplicates get their own copy so callers can't affect one another
+        return [dict(results[e]) if results[e] is not None else None for e in entries]
+    
+    def _cached(self, entry: str) -> Optional[Dict[str, Any]]:
+        """Cached answer from either prompt; each stores under its own template's hash."""
+        if self.cache is None:
+            return None
+        return self.cache.get_any((self.template_digest, self.batch_template_digest), self.model_name, entry)
+    
+    @staticmethod
+    def _clean_response(response: str) -> str:
+        """Strip markdown code fences from an LLM response."""
+        response = response.strip()
+        if response.startswith('```json'):
+            response = response[7:]
+        if response.endswith('```'):
+            response = response[:-3]
+        return response.strip()
+    
+    @staticmethod
+    def _validate(parsed_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Check required fields and normalize quantity/confidence; None if invalid."""
+        if not all(field in parsed_data for field in REQUIRED_FIELDS):
+            return None
+        
+        # Ensure numeric quantity
+        try:
+            parsed_data['quantity'] = float(parsed_data['quantity'])
+        except (ValueError, TypeError):
+            parsed_data['quantity'] = 1.0
+        
+        # Set default confidence if not provided
+        if 'confidence' not in parsed_data:
+            parsed_data['confidence'] = 0.8
+        return parsed_data
+    
+    def _no_llm_answer(self, text: str, circuit_open: bool = False) -> Optional[Dict[str, Any]]:
+        """Answer for an entry the LLM did not parse: a fallback guess, or None without fallback."""
+        if not self.fallback:
+            return None
+        return self._rule_parse(text) if circuit_open else self._fallback_parse(text)
+    
+    def _rule_parse(self, text: str) -> Optional[Dict[str, Any]]:
+        """Parse with SimpleActivityParser, then the built-in fallback patterns."""
+        from .ai_parser_simple import SimpleActivityParser
+        return SimpleActivityParser().parse_activity(text) or self._fallback_parse(text)
     
     def _fallback_parse(self, text: str) -> Optional[Dict[str, Any]]:
         """
@@ -231,34 +368,50 @@ Return only valid JSON, no explanation:
                 pass
         return None
 
-# Global instance
-_ai_parser = None
+# Global instances, keyed on whether they fall back to the rule patterns
+_ai_parsers: Dict[bool, Any] = {}
+_inflight_parses = SingleFlight()
 
-def get_ai_parser() -> Optional[AIActivityParser]:
-    """Get or create the global AI parser instance."""
-    global _ai_parser
-    if _ai_parser is None:
+def get_ai_parser(fallback: bool = True):
+    """
+    Get or create the global AI parser instance.
+    
+    With AI_BATCH_SIZE above 1 the parser is wrapped in a BatchingParser so
+    concurrent requests share Gemini calls.
+    
+    Args:
+        fallback: See AIActivityParser; the hybrid router uses False so it
+                  can keep its own rule answer when the LLM fails
+    """
+    parser = _ai_parsers.get(fallback)
+    if parser is None:
         try:
             if not LANGCHAIN_AVAILABLE:
                 print("LangChain not available, AI parsing disabled")
                 return None
-            _ai_parser = AIActivityParser()
+            parser = AIActivityParser(fallback=fallback)
+            if AI_BATCH_SIZE > 1:
+                parser = BatchingParser(parser)
+            parser = _ai_parsers.setdefault(fallback, parser)
         except Exception as e:
             print(f"Failed to initialize AI parser: {e}")
             return None
-    return _ai_parser
+    return parser
 
-def parse_with_ai(text: str) -> Optional[Dict[str, Any]]:
+def parse_with_ai(text: str, fallback: bool = True) -> Optional[Dict[str, Any]]:
     """
     Parse activity text using AI.
     
     Args:
         text: Natural language description of environmental activity
+        fallback: Guess from the rule patterns when the LLM fails
         
     Returns:
         Parsed activity dictionary or None
     """
-    parser = get_ai_parser()
+    parser = get_ai_parser(fallback)
     if parser is None:
         return None
-    return parser.parse_activity(text)
+    # Concurrent identical entries wait for one shared LLM call
+    parsed = _inflight_parses.do((fallback, normalize_entry(text)), parser.parse_activity, text)
+    return dict(parsed) if parsed is not None else None
@@ -1,23 +1,18 @@
-from sqlalchemy import func
-from datetime import datetime, timedelta
-from src.models.db import db, Activity, User
+from datetime import datetime
+from src.utils.activity_stats import current_streak, user_stats
 
 def evaluate_badges(user_id: int):
     if not user_id:
         return []
-    total = db.session.query(func.sum(Activity.co2_saved_kg)).filter_by(user_id=user_id).scalar() or 0.0
-    count = Activity.query.filter_by(user_id=user_id).count()
+    # One primary-key lookup, however long the user's history
+    stats = user_stats(user_id)
+    count = stats.activity_count if stats else 0
+    total = stats.total_kg if stats else 0.0
 
     badges = []
     if count >= 1:
         badges.append({'name': 'Getting Started 🟢', 'desc': 'Logged your first eco action'})
-    today = datetime.utcnow().date()
-    days = set(d.date() for d, in db.session.query(Activity.created_at).filter_by(user_id=user_id).all())
-    streak = 0
-    cur = today
-    while cur in days:
-        streak += 1
-        cur = cur - timedelta(days=1)
+    streak = current_streak(stats, datetime.utcnow().date())
     if streak >= 7:
         badges.append({'name': 'One Week Streak 🔥', 'desc': '7 days of eco actions'})
     if total >= 1:
@@ -0,0 +1,170 @@
+"""
+Micro-batching front end for AIActivityParser.
+
+Concurrent /api/log requests each hand their entry to a BatchingParser, which
+waits a few milliseconds for other entries to arrive and then parses the whole
+group with one Gemini call via ``AIActivityParser.parse_batch``. Up to
+AI_BATCH_CONCURRENCY batches are in flight at once, so collection goes on
+while earlier calls wait on Gemini.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional
+
+AI_BATCH_SIZE = int(os.getenv('AI_BATCH_SIZE', 8))
+AI_BATCH_WAIT_MS = float(os.getenv('AI_BATCH_WAIT_MS', 20))
+AI_BATCH_CONCURRENCY = int(os.getenv('AI_BATCH_CONCURRENCY', 4))
+
+
+class BatchingParser:
+    """
+    Collect entries arriving within ``max_wait`` seconds and parse them together.
+
+    Wraps any parser exposing ``parse_activity(text)`` and
+    ``parse_batch(texts)``. A background thread drains the queue: it takes the
+    first waiting entry, keeps collecting until ``max_batch_size`` entries or
+    ``max_wait`` has passed, then hands the batch to a pool of
+    ``max_in_flight`` threads that resolves every caller's future from one
+    ``parse_batch`` call. While all of them are busy, entries keep queueing
+    and go out in the next, fuller batch. If the batch call fails, each entry
+    is retried on its own, concurrently, so callers always get an answer.
+
+    Args:
+        parser: The wrapped parser
+        max_batch_size: Most entries sent in one LLM call
+        max_wait: Seconds to hold the first entry while the batch fills
+        max_in_flight: Most batches parsed at the same time
+    """
+
+    def __init__(self, parser, max_batch_size: int = AI_BATCH_SIZE, max_wait: float = AI_BATCH_WAIT_MS / 1000.0,
+                 max_in_flight: int = AI_BATCH_CONCURRENCY):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.parser = parser
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(0.0, max_wait)
+        self.max_in_flight = max_in_flight
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = None
+        self._worker = None
+        self._worker_pid = None
+        self.batches = 0
+        self.entries = 0
+        self.largest_batch = 0
+
+    def submit(self, text: str) -> Future:
+        """Queue an entry and return a Future resolving to its parsed dict."""
+        future: Future = Future()
+        if not text or not text.strip():
+            future.set_result(None)
+            return future
+        self._ensure_worker()
+        self._queue.put((text, future))
+        return future
+
+    def parse_activity(self, text: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Parse one entry, sharing an LLM call with concurrent callers.
+
+        Raises:
+            concurrent.futures.TimeoutError: After timeout seconds; an entry
+                not yet sent to the LLM is then dropped from its batch
+        """
+        future = self.submit(text)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    def parse_batch(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Parse an explicit list of entries directly with the wrapped parser."""
+        return self.parser.parse_batch(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'batches': self.batches,
+            'entries': self.entries,
+            'largest_batch': self.largest_batch,
+            'avg_batch': round(self.entries / self.batches, 2) if self.batches else 0.0,
+            'queued': self._queue.qsize(),
+        }
+
+    def _ensure_worker(self):
+        # A forked worker process inherits the object but not the thread
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or self._worker_pid != os.getpid() or not self._worker.is_alive():
+                if self._worker_pid != os.getpid():
+                    self._queue = queue.Queue()
+                    self._slots = threading.BoundedSemaphore(self.max_in_flight)
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                                        thread_name_prefix='ai-batch-call')
+                self._worker = threading.Thread(target=self._run, name='ai-batch-parser', daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            # Wait for a free call slot first, so entries pile up meanwhile
+            self._slots.acquire()
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # Skip entries whose caller timed out and cancelled them
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                self._slots.release()
+                continue
+            self.batches += 1
+            self.entries += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        try:
+            texts = [text for text, _ in batch]
+            try:
+                if len(batch) == 1:
+                    results = [self.parser.parse_activity(texts[0])]
+                else:
+                    results = self.parser.parse_batch(texts)
+            except Exception as e:
+                print(f"Batched parsing failed, parsing entries one by one: {e}")
+                # Separate tasks, so the retries run side by side and this slot is freed
+                for text, future in batch:
+                    self._executor.submit(self._parse_one, text, future)
+                return
+            for i, (_, future) in enumerate(batch):
+                try:
+                    result = results[i]
+                except Exception as e:
+                    future.set_exception(e)
+                    continue
+                future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def _parse_one(self, text: str, future: Future):
+        try:
+            result = self.parser.parse_activity(text)
+        except Exception as e:
+            future.set_exception(e)
+            return
+        future.set_result(result)
@@ -2,7 +2,54 @@
 Enhanced CO2 savings calculator with AI-powered activity recognition.
 """
 
-from .factors import FACTORS, get_co2_factor, DEFAULT_FACTORS
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import partial
+
+from .cache import TTLCache, normalize_entry
+from .factors import (FACTORS, get_co2_factor, DEFAULT_FACTORS, factors_version, normalize_quantity,
+                      precompute_co2_factors)
+from .metrics import RequestMetrics
+from .router import route_hybrid
+from .rules import RULE_SETS, known_activities, split_activities
+from .singleflight import SingleFlight
+
+# Parsed entries keyed on normalized text; dropped whenever the factors change
+PARSE_CACHE_SIZE = int(os.getenv('PARSE_CACHE_SIZE', 4096))
+PARSE_CACHE_TTL = float(os.getenv('PARSE_CACHE_TTL', 3600))
+_parse_cache = TTLCache(maxsize=PARSE_CACHE_SIZE, ttl=PARSE_CACHE_TTL)
+_parse_cache_version = factors_version()
+
+# Resolve the factor of every activity the rule parsers can emit up front
+precompute_co2_factors(known_activities())
+
+# Threads that run (possibly slow) AI parses on behalf of deadline-bound requests
+AI_PARSE_WORKERS = int(os.getenv('AI_PARSE_WORKERS', 16))
+_ai_executor = None
+_ai_executor_lock = threading.Lock()
+
+# In-flight parses keyed on normalized text, shared by concurrent requests
+_inflight_parses = SingleFlight()
+
+def parse_cache_stats():
+    """Return hit/miss/eviction counters of the parse cache and in-flight coalescing."""
+    stats = _parse_cache.stats()
+    stats['single_flight'] = _inflight_parses.stats()
+    return stats
+
+def clear_parse_cache():
+    """Drop every cached parse result."""
+    _parse_cache.clear()
+
+def _sync_parse_cache():
+    """Invalidate the parse cache if FACTORS changed since it was filled."""
+    global _parse_cache_version
+    version = factors_version()
+    if version != _parse_cache_version:
+        _parse_cache.clear()
+        _parse_cache_version = version
 
 def parse_with_ai_safe(raw_entry: str):
     """Safe AI parsing with fallback."""
@@ -37,6 +84,9 @@ def compute_savings(parsed: dict):
     instead_of = parsed.get('instead_of')
     subcategory = parsed.get('subcategory', '')
     
+    # Express the quantity in the unit the category's factors are quoted in
+    quantity, unit = normalize_quantity(quantity, unit, category)
+    
     # Get CO2 factor using the enhanced factor system
     co2_factor = get_co2_factor(action, category, instead_of)
     
@@ -59,6 +109,132 @@ def compute_savings(parsed: dict):
     
     return round(float(savings), 3), meta
 
+class ActivityColumns:
+    """
+    Parsed activities stored column-wise for compute_savings_batch.
+
+    Quantities are one float array; every text field is an integer code array
+    indexing a list of its distinct values, so per-value work (unit
+    conversion, factor lookup) runs once per distinct value, not per row.
+
+    Args:
+        quantities: Amounts, one per activity
+        codes: Field name -> integer array of codes, aligned with quantities
+        values: Field name -> list of the values the codes index
+    """
+
+    # Text fields and the value compute_savings uses when a parse lacks them
+    FIELDS = {'action': '', 'category': '', 'unit': '', 'instead_of': None, 'subcategory': ''}
+
+    def __init__(self, quantities, codes, values):
+        import numpy as np
+
+        self.quantities = np.asarray(quantities, dtype=np.float64)
+        self.codes = {field: np.asarray(codes[field], dtype=np.intp) for field in self.FIELDS}
+        self.values = {field: list(values[field]) for field in self.FIELDS}
+
+    def __len__(self):
+        return len(self.quantities)
+
+    @classmethod
+    def from_parsed(cls, parsed_list):
+        """Encode parsed activity dictionaries (as returned by the parsers)."""
+        import numpy as np
+
+        parsed_list = list(parsed_list)
+        quantities = [float(parsed.get('quantity', 1)) for parsed in parsed_list]
+        codes, values = {}, {}
+        for field, missing in cls.FIELDS.items():
+            index = {}
+            codes[field] = np.fromiter(
+                (index.setdefault(parsed.get(field, missing), len(index)) for parsed in parsed_list),
+                dtype=np.intp, count=len(parsed_list),
+            )
+            values[field] = list(index)
+        return cls(quantities, codes, values)
+
+
+def _combine_codes(columns, fields):
+    """Code each distinct combination of fields; returns (inverse codes, combinations)."""
+    import numpy as np
+
+    combined = np.zeros(len(columns), dtype=np.int64)
+    for field in fields:
+        combined = combined * len(columns.values[field]) + columns.codes[field]
+    unique, inverse = np.unique(combined, return_inverse=True)
+    combos = []
+    for code in unique.tolist():
+        combo = []
+        for field in reversed(fields):
+            code, idx = divmod(code, len(columns.values[field]))
+            combo.append(columns.values[field][idx])
+        combos.append(tuple(reversed(combo)))
+    return inverse.reshape(-1), combos
+
+
+def compute_savings_batch(columns: ActivityColumns):
+    """
+    Compute CO2 savings for many parsed activities in one vectorized pass.
+
+    Gives exactly what compute_savings gives for each activity.
+    
+    Args:
+        columns: ActivityColumns with the parsed activities
+        
+    Returns:
+        dict: ``co2_saved_kg``, ``quantity`` and ``co2_factor`` float arrays
+              and ``unit`` and ``category`` object arrays, aligned with the input
+    """
+    import numpy as np
+
+    n = len(columns)
+    if n == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return {'co2_saved_kg': empty, 'quantity': empty, 'co2_factor': empty,
+                'unit': np.empty(0, dtype=object), 'category': np.empty(0, dtype=object)}
+
+    # Unit normalization per distinct (category, unit)
+    inverse, combos = _combine_codes(columns, ('category', 'unit'))
+    multipliers = np.ones(len(combos), dtype=np.float64)
+    units = np.empty(len(combos), dtype=object)
+    for i, (category, unit) in enumerate(combos):
+        multipliers[i], units[i] = normalize_quantity(1.0, unit, category)
+    quantities = columns.quantities * multipliers[inverse]
+
+    # Factor per distinct (action, category, instead_of)
+    inverse_f, combos_f = _combine_codes(columns, ('action', 'category', 'instead_of'))
+    factors = np.array([get_co2_factor(*combo) for combo in combos_f], dtype=np.float64)[inverse_f]
+
+    # Metadata category label per distinct (subcategory, category, action)
+    inverse_c, combos_c = _combine_codes(columns, ('subcategory', 'category', 'action'))
+    labels = np.empty(len(combos_c), dtype=object)
+    labels[:] = [sub or f"{category}_{action}" for sub, category, action in combos_c]
+
+    return {
+        'co2_saved_kg': _round3(quantities * factors),
+        'quantity': quantities,
+        'co2_factor': factors,
+        'unit': units[inverse],
+        'category': labels[inverse_c],
+    }
+
+
+def _round3(values):
+    """
+    Round to 3 decimals exactly like the built-in round().
+
+    NumPy rounds the scaled value, which can differ from round() only when it
+    lies within floating point error of a half; those few are redone in Python.
+    """
+    import numpy as np
+
+    rounded = np.round(values, 3)
+    scaled = values * 1000.0
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in ties.tolist():
+        rounded[i] = round(float(values[i]), 3)
+    return rounded
+
 def compute_savings_with_ai(raw_entry: str):
     """
     Parse activity using AI and compute CO2 savings.
@@ -69,138 +245,212 @@ def compute_savings_with_ai(raw_entry: str):
     Returns:
         tuple: (co2_saved_kg, metadata, parsed_data)
     """
-    # Try AI parsing first
-    parsed = parse_with_ai_safe(raw_entry)
+    key = normalize_entry(raw_entry)
+    _sync_parse_cache()
+    result = _parse_cache.get(key)
+    if result is None:
+        # Identical entries arriving together share one parse (and LLM call)
+        result = _inflight_parses.do(key, _compute_and_cache, key)
+    return _copy_result(result)
+
+def compute_savings_within(raw_entry: str, timeout, metrics: RequestMetrics = None):
+    """
+    Like compute_savings_with_ai, but never waits longer than ``timeout``.
     
-    if parsed is None:
-        # Fallback to original parsing logic
-        parsed = _legacy_parse(raw_entry)
+    The AI parse runs on a worker thread. If it has not finished when the
+    timeout expires (or it raises), the rule-based parsers answer instead.
+    A late AI result still lands in the parse cache for the next request.
+    Python threads cannot be killed, so the abandoned call keeps its worker
+    thread until Gemini returns; AI_PARSE_WORKERS bounds how many can pile up.
+    The path recorded in ``metrics`` is the router's outcome ('rules',
+    'classifier', 'llm', ...), 'cache', 'budget_fallback' or 'rules_error'.
     
+    Args:
+        raw_entry: Natural language description of environmental activity
+        timeout: Seconds to wait for the AI parse (None waits indefinitely)
+        metrics: Optional RequestMetrics receiving stage timings and the path
+        
+    Returns:
+        tuple: (co2_saved_kg, metadata, parsed_data)
+    """
+    metrics = metrics or RequestMetrics()
+    key = normalize_entry(raw_entry)
+    with metrics.stage('cache'):
+        _sync_parse_cache()
+        result = _parse_cache.get(key)
+    if result is not None:
+        metrics.path = 'cache'
+        return _copy_result(result)
+
+    future = _submit_parse(key)
+    try:
+        with metrics.stage('ai'):
+            result, metrics.path = future.result(timeout=timeout)
+    except FutureTimeout:
+        metrics.path = 'budget_fallback'
+        with metrics.stage('rules'):
+            result = compute_savings_rule_based(key)
+    except Exception as e:
+        print(f"AI parsing failed, using rule-based parser: {e}")
+        metrics.path = 'rules_error'
+        with metrics.stage('rules'):
+            result = compute_savings_rule_based(key)
+    return _copy_result(result)
+
+# Most severe first: the path reported for a multi-activity entry
+_PATH_SEVERITY = ('rules_error', 'budget_fallback', 'llm', 'rules_no_llm', 'unresolved',
+                  'classifier', 'rules', 'cache')
+
+def compute_savings_all_within(raw_entry: str, timeout, metrics: RequestMetrics = None):
+    """
+    Like compute_savings_within, for entries describing several activities.
+    
+    The entry is split into one clause per activity (see
+    rules.split_activities). Clauses missing from the parse cache are all
+    submitted before any is awaited, so they parse concurrently. Those the
+    rules are unsure of reach the LLM together through the router's batching
+    AI parser and share a single LLM call. Clauses still unparsed at the
+    deadline fall back to the rule-based parsers. Clauses that nothing
+    understood are left out.
+    
+    Args:
+        raw_entry: Natural language description of one or more activities
+        timeout: Seconds to wait for the AI parses (None waits indefinitely)
+        metrics: Optional RequestMetrics receiving stage timings and the path
+        
+    Returns:
+        list: (co2_saved_kg, metadata, parsed_data, clause) per activity, in entry order
+    """
+    metrics = metrics or RequestMetrics()
+    clauses = split_activities(raw_entry)
+    if len(clauses) <= 1:
+        saved, meta, parsed = compute_savings_within(raw_entry, timeout, metrics)
+        return [(saved, meta, parsed, raw_entry)] if parsed is not None else []
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    keys = [normalize_entry(clause) for clause in clauses]
+    with metrics.stage('cache'):
+        _sync_parse_cache()
+        results = {key: _parse_cache.get(key) for key in keys}
+    futures = {key: _submit_parse(key) for key, result in results.items() if result is None}
+
+    paths = {'cache'}
+    if futures:
+        with metrics.stage('ai'):
+            for key, future in futures.items():
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    results[key], path = future.result(timeout=remaining)
+                    paths.add(path)
+                except FutureTimeout:
+                    paths.add('budget_fallback')
+                except Exception as e:
+                    print(f"AI parsing failed, using rule-based parser: {e}")
+                    paths.add('rules_error')
+        missing = [key for key, result in results.items() if result is None]
+        if missing:
+            with metrics.stage('rules'):
+                for key in missing:
+                    results[key] = compute_savings_rule_based(key)
+    metrics.path = next(path for path in _PATH_SEVERITY if path in paths)
+
+    activities = []
+    for clause, key in zip(clauses, keys):
+        saved, meta, parsed = _copy_result(results[key])
+        if parsed is not None:
+            activities.append((saved, meta, parsed, clause))
+    return activities
+
+def compute_savings_all(raw_entry: str):
+    """
+    Parse every activity in an entry and compute CO2 savings for each.
+    
+    Returns:
+        list: (co2_saved_kg, metadata, parsed_data, clause) per activity, in entry order
+    """
+    return compute_savings_all_within(raw_entry, None)
+
+def compute_savings_all_rule_based(raw_entry: str):
+    """
+    Rule-based counterpart of compute_savings_all (never calls the LLM).
+    
+    Returns:
+        list: (co2_saved_kg, metadata, parsed_data, clause) per activity, in entry order
+    """
+    activities = []
+    for clause in split_activities(raw_entry):
+        saved, meta, parsed = compute_savings_rule_based(clause)
+        if parsed is not None:
+            activities.append((saved, meta, parsed, clause))
+    return activities
+
+def compute_savings_rule_based(raw_entry: str):
+    """
+    Parse with the rule-based parsers only (never calls the LLM).
+    
+    Returns:
+        tuple: (co2_saved_kg, metadata, parsed_data)
+    """
+    from .ai_parser_simple import SimpleActivityParser
+    text = normalize_entry(raw_entry)
+    parsed = SimpleActivityParser().parse_activity(text) or _legacy_parse(text)
     if parsed is None:
         return 0.0, {'error': 'Could not parse activity'}, None
-    
     savings, meta = compute_savings(parsed)
     return savings, meta, parsed
 
-def _legacy_parse(text: str):
+def _copy_result(result):
+    """Hand out copies so callers cannot modify the cached dicts."""
+    saved, meta, parsed = result
+    return saved, dict(meta), (dict(parsed) if parsed is not None else None)
+
+def _get_ai_executor():
+    global _ai_executor
+    if _ai_executor is None:
+        with _ai_executor_lock:
+            if _ai_executor is None:
+                _ai_executor = ThreadPoolExecutor(max_workers=AI_PARSE_WORKERS, thread_name_prefix='ai-parse')
+    return _ai_executor
+
+def _submit_parse(key):
+    """Start (or join) the AI parse of a normalized entry on the worker pool."""
+    future, created = _inflight_parses.submit(key, _get_ai_executor(), _compute_savings_uncached, key)
+    if created:
+        future.add_done_callback(partial(_store_parse_result, key))
+    return future
+
+def _compute_and_cache(key):
+    result, _ = _compute_savings_uncached(key)
+    _parse_cache.set(key, result)
+    return result
+
+def _store_parse_result(key, future):
+    """Cache a finished AI parse, including ones the request stopped waiting for."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    _parse_cache.set(key, future.result()[0])
+
+def _compute_savings_uncached(raw_entry: str):
     """
-    Legacy parsing logic for backward compatibility.
+    Parse a (normalized) entry and compute its savings without caching.
+
+    Returns:
+        tuple: ((co2_saved_kg, metadata, parsed_data), router outcome)
     """
-    if not text:
-        return None
-        
-    import re
+    # Rules first; the LLM only for low-confidence or unmatched entries
+    parsed, route = route_hybrid(raw_entry)
     
-    t = text.lower().strip()
-    DIST_RE = r'(?P<qty>\d+(?:\.\d+)?)\s*(?:km|kilometers?)'
-    COUNT_RE = r'(?P<qty>\d+)'
-
-    if 'walk' in t:
-        m = re.search(DIST_RE, t)
-        qty = float(m.group('qty')) if m else 1.0
-        instead = 'car' if ('instead of car' in t or 'instead of driving' in t or 'drive' in t) else None
-        return {
-            'action': 'walk', 
-            'category': 'transportation',
-            'quantity': qty, 
-            'unit': 'km', 
-            'instead_of': instead
-        }
-
-    if 'cycle' in t or 'cycled' in t or 'bicycle' in t or 'bike' in t:
-        m = re.search(DIST_RE, t)
-        qty = float(m.group('qty')) if m else 1.0
-        instead = 'car' if 'instead of car' in t else ('bus' if 'instead of bus' in t else None)
-        return {
-            'action': 'cycle',
-            'category': 'transportation', 
-            'quantity': qty, 
-            'unit': 'km', 
-            'instead_of': instead
-        }
-
-    if 'bus' in t and ('took' in t or 'ride' in t or 'rode' in t):
-        m = re.search(DIST_RE, t)
-        qty = float(m.group('qty')) if m else 1.0
-        instead = 'car' if 'instead of car' in t else None
-        return {
-            'action': 'bus',
-            'category': 'transportation',
-            'quantity': qty, 
-            'unit': 'km', 
-            'instead_of': instead
-        }
-
-    if ('vegetarian' in t or 'veg' in t) and 'beef' in t:
-        return {
-            'action': 'meal_swap',
-            'category': 'food', 
-            'from': 'beef', 
-            'to': 'veg', 
-            'quantity': 1, 
-            'unit': 'meal'
-        }
-    if ('vegetarian' in t or 'veg' in t) and 'chicken' in t:
-        return {
-            'action': 'meal_swap',
-            'category': 'food',
-            'from': 'chicken', 
-            'to': 'veg', 
-            'quantity': 1, 
-            'unit': 'meal'
-        }
-    if ('meatless' in t or 'veg' in t or 'vegetarian' in t) and ('meal' in t or 'lunch' in t or 'dinner' in t):
-        return {
-            'action': 'meal_swap',
-            'category': 'food',
-            'from': 'chicken', 
-            'to': 'veg', 
-            'quantity': 1, 
-            'unit': 'meal'
-        }
-
-    if 'bottle' in t or 'plastic bottle' in t:
-        m = re.search(COUNT_RE, t)
-        qty = int(m.group('qty')) if m else 1
-        if 'avoid' in t or 'skipped' in t or 'reused' in t or 'refill' in t or 'refilled' in t:
-            return {
-                'action': 'plastic_bottle',
-                'category': 'waste', 
-                'quantity': qty, 
-                'unit': 'count'
-            }
-
-    # Digital activities
-    if ('did not use' in t or 'didnt use' in t or 'avoided using' in t) and ('phone' in t or 'smartphone' in t):
-        # Extract hours from text
-        hours = 24.0
-        hour_match = re.search(r'(\d+(?:\.\d+)?)\s*hours?', t)
-        if hour_match:
-            hours = float(hour_match.group(1))
-        
-        return {
-            'action': 'digital_detox',
-            'category': 'digital',
-            'quantity': hours,
-            'unit': 'hours',
-            'instead_of': 'normal_usage'
-        }
+    if parsed is None:
+        return (0.0, {'error': 'Could not parse activity'}, None), route
     
-    if 'digital detox' in t or 'screen free' in t or 'phone free' in t:
-        hours = 24.0
-        hour_match = re.search(r'(\d+(?:\.\d+)?)\s*hours?', t)
-        if hour_match:
-            hours = float(hour_match.group(1))
-        
-        return {
-            'action': 'digital_detox', 
-            'category': 'digital',
-            'quantity': hours,
-            'unit': 'hours',
-            'instead_of': 'normal_usage'
-        }
+    savings, meta = compute_savings(parsed)
+    return (savings, meta, parsed), route
 
-    return None
+def _legacy_parse(text: str):
+    """
+    Legacy parsing logic for backward compatibility.
+    """
+    return RULE_SETS['legacy'].parse(text)
 
 # Legacy function to maintain backward compatibility
 def compute_savings_legacy(parsed: dict):
@@ -0,0 +1,200 @@
+"""
+Circuit breaker for calls to external services (Gemini).
+
+While the breaker is open, callers skip the service entirely and use their
+local fallback (rule parser, canned chatbot replies) instead of waiting for
+another timeout.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised by CircuitBreaker.call when the breaker refuses the call."""
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker driven by the failure rate of recent calls.
+
+    Closed: calls pass; the outcome of the last ``window_size`` calls is kept.
+    Once at least ``min_calls`` are recorded and the share of failures reaches
+    ``failure_rate_threshold`` the breaker opens.
+    Open: calls are refused until ``cooldown`` seconds have passed.
+    Half-open: up to ``half_open_max_calls`` trial calls go through; if they
+    all succeed the breaker closes, any failure re-opens it.
+
+    Calls slower than ``slow_call_seconds`` count as failures, so a service
+    that answers but too late trips the breaker as well.
+
+    Args:
+        name: Label shown in the status endpoint
+        failure_rate_threshold: Failure share (0-1) that opens the breaker
+        min_calls: Calls needed in the window before the rate is evaluated
+        window_size: Number of recent outcomes considered
+        cooldown: Seconds to stay open before allowing trial calls
+        half_open_max_calls: Concurrent trial calls allowed when half-open
+        slow_call_seconds: Duration above which a successful call is a failure
+    """
+
+    def __init__(self, name: str, failure_rate_threshold: float = 0.5, min_calls: int = 5,
+                 window_size: int = 20, cooldown: float = 30.0, half_open_max_calls: int = 1,
+                 slow_call_seconds: float = None, clock=time.monotonic):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.half_open_max_calls = half_open_max_calls
+        self.slow_call_seconds = slow_call_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = None
+        self._trials = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._trials = 0
+        return self._state
+
+    def is_open(self) -> bool:
+        """True while calls would be refused (does not use up a trial call)."""
+        with self._lock:
+            state = self._current_state()
+            return state == OPEN or (state == HALF_OPEN and self._trials >= self.half_open_max_calls)
+
+    def allow_request(self) -> bool:
+        """Return True if a call may proceed; reserves a trial slot when half-open."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._trials < self.half_open_max_calls:
+                self._trials += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, duration: float = None) -> None:
+        if self.slow_call_seconds is not None and duration is not None and duration > self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                self._trials -= 1
+                if self._trials <= 0:
+                    self._close()
+                return
+            if state == OPEN:
+                return
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                self._open()
+                return
+            if state == OPEN:
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate_threshold):
+                self._open()
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn through the breaker, recording its outcome and duration."""
+        if not self.allow_request():
+            raise CircuitOpenError(f"circuit '{self.name}' is open")
+        t0 = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(time.perf_counter() - t0)
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._close()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self.times_opened += 1
+
+    def _close(self):
+        self._state = CLOSED
+        self._opened_at = None
+        self._trials = 0
+        self._outcomes.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            failures = self._outcomes.count(False)
+            retry_in = None
+            if state == OPEN:
+                retry_in = round(max(0.0, self.cooldown - (self._clock() - self._opened_at)), 3)
+            return {
+                'state': state,
+                'recent_calls': len(self._outcomes),
+                'recent_failures': failures,
+                'failure_rate': round(failures / len(self._outcomes), 4) if self._outcomes else 0.0,
+                'failure_rate_threshold': self.failure_rate_threshold,
+                'cooldown_s': self.cooldown,
+                'retry_in_s': retry_in,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Get or create a named breaker configured from ``<NAME>_BREAKER_*`` env vars."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                prefix = f"{name.upper()}_BREAKER_"
+                slow = os.getenv(prefix + 'SLOW_CALL_SECONDS', '10')
+                breaker = CircuitBreaker(
+                    name,
+                    failure_rate_threshold=float(os.getenv(prefix + 'FAILURE_RATE', 0.5)),
+                    min_calls=int(os.getenv(prefix + 'MIN_CALLS', 5)),
+                    window_size=int(os.getenv(prefix + 'WINDOW', 20)),
+                    cooldown=float(os.getenv(prefix + 'COOLDOWN', 30)),
+                    slow_call_seconds=float(slow) if slow else None,
+                )
+                _breakers[name] = breaker
+    return breaker
+
+
+def breakers_status() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of every breaker created in this process."""
+    return {name: breaker.snapshot() for name, breaker in list(_breakers.items())}
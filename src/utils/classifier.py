@@ -0,0 +1,263 @@
+"""
+Nearest-centroid activity classifier trained on cached LLM parses.
+
+Entries are turned into hashed character n-gram TF-IDF vectors; each
+(action, category, instead_of) class is the normalized mean of its training
+vectors, and an entry is assigned to the class with the highest cosine
+similarity. The model is a single float32 matrix (row 0 holds the IDF
+weights, the other rows the class centroids) saved as ``.npy`` next to a small
+JSON file with the class labels, so workers memory-map one shared copy.
+
+Train it offline from the LLM cache:
+    flask --app app train-classifier [--out instance/activity_classifier.npy]
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .cache import normalize_entry
+from .rules import NUMBER_RE
+
+CLASSIFIER_MODEL_PATH = os.getenv('CLASSIFIER_MODEL_PATH', os.path.join('instance', 'activity_classifier.npy'))
+# Predictions below this cosine similarity are left to the LLM
+CLASSIFIER_MIN_CONFIDENCE = float(os.getenv('CLASSIFIER_MIN_CONFIDENCE', 0.6))
+
+# Hashed feature space (a power of two) and character n-gram lengths
+FEATURE_BITS = 14
+NGRAM_SIZES = (3, 4, 5)
+# Classes need this many training entries to get a centroid
+MIN_CLASS_EXAMPLES = 3
+
+_number_re = re.compile(NUMBER_RE)
+_digit_re = re.compile(r'[0-9]')
+
+
+# n-gram -> feature index per feature space size; cleared when it grows too large
+_GRAM_CACHE_LIMIT = 200000
+_gram_index: Dict[int, Dict[str, int]] = {}
+
+
+def ngram_features(text: str, bits: int = FEATURE_BITS, sizes=NGRAM_SIZES) -> Counter:
+    """
+    Hashed character n-gram counts of an entry.
+
+    Digits are folded to '0' so quantities do not split a class, and the
+    normalized entry is padded with spaces so n-grams at its edges are distinct.
+
+    Returns:
+        Counter mapping feature index to count
+    """
+    text = f" {_digit_re.sub('0', normalize_entry(text))} "
+    grams = [text[i:i + n] for n in sizes for i in range(len(text) - n + 1)]
+    index = _gram_index.get(bits)
+    if index is None or len(index) > _GRAM_CACHE_LIMIT:
+        index = _gram_index[bits] = {}
+    try:
+        return Counter(map(index.__getitem__, grams))
+    except KeyError:
+        mask = (1 << bits) - 1
+        for gram in grams:
+            if gram not in index:
+                index[gram] = zlib.crc32(gram.encode('utf-8')) & mask
+        return Counter(map(index.__getitem__, grams))
+
+
+def _class_key(parsed: Dict[str, Any]) -> Tuple[str, str, Optional[str]]:
+    return parsed['action'], parsed.get('category') or 'other', parsed.get('instead_of')
+
+
+def train(examples: Iterable[Tuple[str, Dict[str, Any]]], bits: int = FEATURE_BITS,
+          min_examples: int = MIN_CLASS_EXAMPLES) -> 'ActivityClassifier':
+    """
+    Fit a classifier on (entry, parsed activity) pairs.
+
+    Args:
+        examples: Entry text with the parse the LLM returned for it
+        bits: Feature space size as a power of two
+        min_examples: Classes with fewer examples are dropped
+
+    Returns:
+        ActivityClassifier holding the model in memory
+    """
+    import numpy as np
+
+    by_class = defaultdict(list)
+    for entry, parsed in examples:
+        if entry and parsed and parsed.get('action'):
+            by_class[_class_key(parsed)].append((ngram_features(entry, bits), parsed, entry))
+    by_class = {key: rows for key, rows in by_class.items() if len(rows) >= min_examples}
+    if not by_class:
+        raise ValueError("No class has enough training examples")
+
+    dim = 1 << bits
+    doc_freq = np.zeros(dim, dtype=np.float64)
+    total = 0
+    for rows in by_class.values():
+        for features, _, _ in rows:
+            doc_freq[list(features)] += 1
+            total += 1
+    idf = np.log((1 + total) / (1 + doc_freq)) + 1.0
+
+    model = np.zeros((len(by_class) + 1, dim), dtype=np.float32)
+    model[0] = idf
+    labels = []
+    for row, (key, rows) in enumerate(sorted(by_class.items(), key=lambda kv: str(kv[0])), start=1):
+        centroid = np.zeros(dim, dtype=np.float64)
+        for features, _, _ in rows:
+            idx = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+            weights = np.fromiter(features.values(), dtype=np.float64, count=len(features)) * idf[idx]
+            centroid[idx] += weights / np.linalg.norm(weights)
+        model[row] = centroid / np.linalg.norm(centroid)
+        labels.append(_class_label(key, rows))
+    return ActivityClassifier(model, {'bits': bits, 'ngram_sizes': list(NGRAM_SIZES), 'labels': labels,
+                                      'examples': total})
+
+
+def _class_label(key, rows) -> Dict[str, Any]:
+    """Class fields plus the most common unit and the quantity used when the entry gives none."""
+    action, category, instead_of = key
+    units = Counter(parsed.get('unit') for _, parsed, _ in rows if parsed.get('unit'))
+    defaults = Counter(
+        float(parsed.get('quantity') or 1) for _, parsed, entry in rows if not _number_re.search(entry)
+    )
+    return {
+        'action': action,
+        'category': category,
+        'instead_of': instead_of,
+        'unit': units.most_common(1)[0][0] if units else 'units',
+        'default_quantity': defaults.most_common(1)[0][0] if defaults else 1.0,
+    }
+
+
+def examples_from_llm_cache(path: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """Read (entry, parsed) pairs from an LLM cache database, one per distinct entry."""
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute('SELECT entry, response FROM llm_cache ORDER BY last_used').fetchall()
+    finally:
+        conn.close()
+    latest = {}
+    for entry, response in rows:
+        try:
+            parsed = json.loads(response)
+        except ValueError:
+            continue
+        if isinstance(parsed, dict) and parsed.get('action'):
+            latest[entry] = parsed
+    return list(latest.items())
+
+
+class ActivityClassifier:
+    """
+    Predicts action, category and instead_of for an entry.
+
+    Args:
+        model: Matrix whose row 0 is the IDF vector and other rows the unit-length
+               class centroids (may be a read-only memory map)
+        meta: ``bits``, ``ngram_sizes`` and one ``labels`` entry per centroid
+    """
+
+    def __init__(self, model, meta: Dict[str, Any]):
+        self.model = model
+        self.idf = model[0]
+        self.centroids = model[1:]
+        self.meta = meta
+        self.labels = meta['labels']
+        self.bits = meta['bits']
+        self.sizes = tuple(meta['ngram_sizes'])
+
+    def predict(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Classify an entry.
+
+        Args:
+            text: Natural language description of environmental activity
+
+        Returns:
+            Parsed activity dictionary whose ``confidence`` is the cosine
+            similarity to the nearest class, or None for an empty entry
+        """
+        import numpy as np
+
+        features = ngram_features(text, self.bits, self.sizes)
+        if not features:
+            return None
+        idx = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+        weights = np.fromiter(features.values(), dtype=np.float32, count=len(features)) * self.idf[idx]
+        scores = self.centroids[:, idx] @ weights
+        best = int(scores.argmax())
+        label = self.labels[best]
+        number = _number_re.search(text)
+        return {
+            'action': label['action'],
+            'category': label['category'],
+            'quantity': float(number.group('qty')) if number else label['default_quantity'],
+            'unit': label['unit'],
+            'instead_of': label['instead_of'],
+            'confidence': round(float(scores[best] / np.linalg.norm(weights)), 4),
+        }
+
+    def classify(self, text: str, min_confidence: float = CLASSIFIER_MIN_CONFIDENCE) -> Optional[Dict[str, Any]]:
+        """Predict, returning None when the nearest class is below min_confidence."""
+        parsed = self.predict(text)
+        if parsed is None or parsed['confidence'] < min_confidence:
+            return None
+        return parsed
+
+    def save(self, path: str) -> None:
+        """Write the model matrix to ``path`` (.npy) and its labels next to it (.json)."""
+        import numpy as np
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.save(path, np.asarray(self.model, dtype=np.float32))
+        with open(_meta_path(path), 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+
+    @classmethod
+    def load(cls, path: str) -> 'ActivityClassifier':
+        """Memory-map a saved model; the pages are shared by every process that loads it."""
+        import numpy as np
+
+        with open(_meta_path(path), encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(np.load(path, mmap_mode='r'), meta)
+
+
+def _meta_path(path: str) -> str:
+    return os.path.splitext(path)[0] + '.json'
+
+
+_classifier = None
+_classifier_loaded = False
+_classifier_lock = threading.Lock()
+
+
+def get_classifier() -> Optional[ActivityClassifier]:
+    """Get the process-wide classifier, or None if no model has been trained."""
+    global _classifier, _classifier_loaded
+    if not _classifier_loaded:
+        with _classifier_lock:
+            if not _classifier_loaded:
+                if CLASSIFIER_MODEL_PATH and os.path.exists(CLASSIFIER_MODEL_PATH):
+                    try:
+                        _classifier = ActivityClassifier.load(CLASSIFIER_MODEL_PATH)
+                    except (OSError, ValueError, KeyError) as e:
+                        print(f"Activity classifier unavailable: {e}")
+                _classifier_loaded = True
+    return _classifier
+
+
+def classify(text: str) -> Optional[Dict[str, Any]]:
+    """Predict with the process-wide classifier if one is trained and it is confident."""
+    classifier = get_classifier()
+    if classifier is None:
+        return None
+    return classifier.classify(text)
@@ -0,0 +1,197 @@
+"""
+External emission factor catalog, reloaded without restarting workers.
+
+The catalog is a JSON file named by the FACTOR_CATALOG_PATH setting:
+
+    {
+      "version": "2026-10",
+      "factors": {"car_kg_per_km": 0.12, ...},
+      "default_factors": {"transportation": 2.0, ...}
+    }
+
+It replaces the built-in FACTORS and DEFAULT_FACTORS. Each worker checks the
+file's mtime/size at most every FACTOR_CATALOG_CHECK_SECONDS; a changed file
+is parsed and validated once, then swapped in with replace_factors(), which
+also invalidates the derived caches. A file that fails validation is
+reported and ignored, and the current factors stay in place.
+
+Check a file before deploying it:
+    flask --app app check-factors path/to/factors.json
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .factors import DEFAULT_FACTORS, FACTORS, replace_factors
+
+FACTOR_CATALOG_CHECK_SECONDS = float(os.getenv('FACTOR_CATALOG_CHECK_SECONDS', 2))
+
+# Factors the calculators read by name, so every catalog must define them
+REQUIRED_FACTORS = (
+    'car_kg_per_km', 'bus_kg_per_km', 'meal_beef_to_veg_kg', 'meal_chicken_to_veg_kg',
+    'plastic_bottle_kg', 'digital_detox_per_hour',
+)
+
+
+class FactorCatalogError(ValueError):
+    """Raised for a catalog file that cannot be read or fails validation."""
+
+
+def _validate_table(name: str, table: Any, required=()) -> Dict[str, float]:
+    if not isinstance(table, dict) or not table:
+        raise FactorCatalogError(f"'{name}' must be a non-empty object")
+    values = {}
+    for key, value in table.items():
+        if not key:
+            raise FactorCatalogError(f"'{name}' has an empty key")
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise FactorCatalogError(f"{name}.{key} must be a number, got {value!r}")
+        if not math.isfinite(value) or value < 0:
+            raise FactorCatalogError(f"{name}.{key} must be a finite non-negative number, got {value!r}")
+        values[key] = float(value)
+    missing = [key for key in required if key not in values]
+    if missing:
+        raise FactorCatalogError(f"'{name}' is missing {', '.join(missing)}")
+    return values
+
+
+def parse_catalog(text: str) -> Dict[str, Any]:
+    """
+    Parse and validate catalog JSON.
+
+    Args:
+        text: File contents
+
+    Returns:
+        dict: ``version`` (str or None), ``factors`` and ``default_factors``
+
+    Raises:
+        FactorCatalogError: If the JSON is malformed or a table is invalid
+    """
+    try:
+        doc = json.loads(text)
+    except ValueError as e:
+        raise FactorCatalogError(f"invalid JSON: {e}")
+    if not isinstance(doc, dict):
+        raise FactorCatalogError("catalog must be a JSON object")
+    version = doc.get('version')
+    if version is not None and not isinstance(version, (str, int)):
+        raise FactorCatalogError("'version' must be a string or number")
+    return {
+        'version': None if version is None else str(version),
+        'factors': _validate_table('factors', doc.get('factors'), REQUIRED_FACTORS),
+        'default_factors': _validate_table('default_factors', doc.get('default_factors'), ('other',)),
+    }
+
+
+def load_catalog(path: str) -> Dict[str, Any]:
+    """Read and validate a catalog file (see parse_catalog)."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return parse_catalog(f.read())
+    except OSError as e:
+        raise FactorCatalogError(f"cannot read {path}: {e}")
+
+
+class FactorCatalogWatcher:
+    """
+    Applies a catalog file and re-applies it when it changes.
+
+    Args:
+        path: Catalog file
+        check_seconds: Shortest interval between two stat() calls
+    """
+
+    def __init__(self, path: str, check_seconds: float = FACTOR_CATALOG_CHECK_SECONDS):
+        self.path = path
+        self.check_seconds = check_seconds
+        self.version = None
+        self.loaded_at = None
+        self.error = None
+        self._signature = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _stat_signature(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def check(self, force: bool = False, strict: bool = False) -> bool:
+        """
+        Reload the catalog if the file changed since it was last read.
+
+        Args:
+            force: Ignore the check interval
+            strict: Raise FactorCatalogError instead of keeping the current
+                    factors when the file is missing or invalid
+
+        Returns:
+            bool: True if a new factor set was applied
+        """
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return False
+        with self._lock:
+            if not force and now < self._next_check:
+                return False
+            self._next_check = now + self.check_seconds
+            try:
+                signature = self._stat_signature()
+                if signature == self._signature:
+                    return False
+                # Remember bad files too, so they are not parsed on every check
+                self._signature = signature
+                catalog = load_catalog(self.path)
+            except (OSError, FactorCatalogError) as e:
+                self.error = str(e)
+                if strict:
+                    raise FactorCatalogError(self.error)
+                print(f"Factor catalog {self.path} rejected, keeping current factors: {e}")
+                return False
+            self.error = None
+            self.version = catalog['version']
+            if catalog['factors'] == dict(FACTORS) and catalog['default_factors'] == dict(DEFAULT_FACTORS):
+                return False
+            replace_factors(catalog['factors'], catalog['default_factors'])
+            self.loaded_at = time.time()
+            print(f"Loaded factor catalog {self.path} (version {self.version})")
+            return True
+
+    def status(self) -> Dict[str, Any]:
+        return {'path': self.path, 'version': self.version, 'loaded_at': self.loaded_at, 'error': self.error}
+
+
+_watcher: Optional[FactorCatalogWatcher] = None
+
+
+def init_factor_catalog(path: str) -> Optional[FactorCatalogWatcher]:
+    """
+    Load the catalog at startup; a missing or invalid file is an error here.
+
+    Args:
+        path: Catalog file; empty keeps the built-in factors
+
+    Returns:
+        The process-wide watcher, or None when no catalog is configured
+    """
+    global _watcher
+    if not path:
+        _watcher = None
+        return None
+    if _watcher is None or _watcher.path != path:
+        _watcher = FactorCatalogWatcher(path)
+    _watcher.check(force=True, strict=True)
+    return _watcher
+
+
+def reload_factors_if_changed() -> bool:
+    """Cheap per-request hook: re-read the catalog if it is due for a check and changed."""
+    return _watcher.check() if _watcher is not None else False
+
+
+def factor_catalog_status() -> Optional[Dict[str, Any]]:
+    return _watcher.status() if _watcher is not None else None
@@ -3,7 +3,99 @@ Comprehensive CO2 emission factors for various environmental activities.
 All factors are in kg CO2 saved per unit.
 """
 
-FACTORS = {
+import hashlib
+import json
+import threading
+
+
+class FactorTable(dict):
+    """
+    Factor dictionary that counts its mutations.
+
+    Caches derived from the factors (parsed savings, factor lookups) compare
+    ``factors_version()`` against the value they were built with and drop
+    their contents when it has moved.
+    """
+
+    changes = 0
+
+    @classmethod
+    def _touch(cls):
+        cls.changes += 1
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._touch()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._touch()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._touch()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._touch()
+        return super().setdefault(key, default)
+
+    def pop(self, *args):
+        result = super().pop(*args)
+        self._touch()
+        return result
+
+    def popitem(self):
+        result = super().popitem()
+        self._touch()
+        return result
+
+    def clear(self):
+        super().clear()
+        self._touch()
+
+    def replace(self, mapping):
+        """
+        Take the contents of mapping without counting a change.
+
+        The new values go in with one dict.update, which other threads see
+        all at once; keys missing from mapping are dropped afterwards.
+        Callers bump the version themselves (see replace_factors).
+        """
+        dict.update(self, mapping)
+        for key in [key for key in self if key not in mapping]:
+            dict.__delitem__(self, key)
+
+
+# Held while the factor tables are swapped and while derived tables are built
+_factors_lock = threading.RLock()
+
+
+def replace_factors(factors, default_factors) -> None:
+    """
+    Swap in a whole new factor set as one change.
+
+    Derived caches compare factors_version() with the value they were built
+    with; it moves once, after both tables hold the new values, and the
+    get_co2_factor table is rebuilt before the lock is released.
+
+    Args:
+        factors: New FACTORS contents
+        default_factors: New DEFAULT_FACTORS contents
+    """
+    with _factors_lock:
+        FACTORS.replace(factors)
+        DEFAULT_FACTORS.replace(default_factors)
+        FactorTable._touch()
+        _rebuild_factor_table()
+
+
+def factors_version() -> int:
+    """Return a counter that changes whenever FACTORS or DEFAULT_FACTORS is modified."""
+    return FactorTable.changes
+
+
+FACTORS = FactorTable({
     # Transportation factors (kg CO2 per km)
     'car_kg_per_km': 0.12,
     'taxi_kg_per_km': 0.15,
@@ -73,10 +165,10 @@ FACTORS = {
     'wifi_router_per_hour': 0.006,        # router energy usage
     'data_center_per_gb': 0.0036,         # cloud service energy
     'email_per_message': 0.0000041,       # email carbon footprint
-}
+})
 
 # Category-based default factors for unknown activities
-DEFAULT_FACTORS = {
+DEFAULT_FACTORS = FactorTable({
     'transportation': 2.0,  # default trip savings
     'energy': 1.0,         # default energy savings
     'food': 2.0,           # default meal savings
@@ -84,8 +176,173 @@ DEFAULT_FACTORS = {
     'water': 0.2,          # default water savings
     'digital': 0.2,        # default digital activity savings
     'other': 1.0,          # default other activity
+})
+
+# Bump when get_co2_factor's resolution logic changes in a way that changes results
+FACTOR_LOGIC_REVISION = 1
+_factor_set_version = (None, None)
+
+
+def factor_set_version() -> str:
+    """
+    Return a short content hash identifying the current factor set.
+
+    Unlike factors_version(), it is the same in every process and across
+    restarts, so it is stored with each Activity to find rows computed with
+    older factors.
+    """
+    global _factor_set_version
+    changes, digest = _factor_set_version
+    if changes != FactorTable.changes:
+        changes = FactorTable.changes
+        blob = json.dumps([FACTOR_LOGIC_REVISION, FACTORS, DEFAULT_FACTORS], sort_keys=True)
+        digest = hashlib.sha256(blob.encode('utf-8')).hexdigest()[:12]
+        _factor_set_version = (changes, digest)
+    return digest
+
+
+# Units the parsers may report: (aliases, unit name, dimension, size in the
+# dimension's base unit). Count-like units (trips, meals, items, ...) have no
+# dimension and are never converted.
+UNIT_SPECS = [
+    # Distance, base km
+    (('km', 'kms', 'kilometer', 'kilometers', 'kilometre', 'kilometres'), 'km', 'distance', 1.0),
+    (('mile', 'miles', 'mi'), 'miles', 'distance', 1.609344),
+    (('m', 'meter', 'meters', 'metre', 'metres'), 'meters', 'distance', 0.001),
+    # Time, base hour
+    (('hour', 'hours', 'hr', 'hrs', 'h'), 'hours', 'time', 1.0),
+    (('minute', 'minutes', 'min', 'mins'), 'minutes', 'time', 1.0 / 60.0),
+    (('day', 'days'), 'days', 'time', 24.0),
+    (('week', 'weeks'), 'weeks', 'time', 168.0),
+    # Mass, base kg
+    (('kg', 'kgs', 'kilogram', 'kilograms'), 'kg', 'mass', 1.0),
+    (('g', 'gram', 'grams'), 'grams', 'mass', 0.001),
+    (('lb', 'lbs', 'pound', 'pounds'), 'pounds', 'mass', 0.45359237),
+    # Volume, base liter
+    (('l', 'liter', 'liters', 'litre', 'litres'), 'liters', 'volume', 1.0),
+    (('ml', 'milliliter', 'milliliters'), 'milliliters', 'volume', 0.001),
+    (('gallon', 'gallons'), 'gallons', 'volume', 3.785411784),
+    # Energy, base kWh
+    (('kwh',), 'kwh', 'energy', 1.0),
+    (('wh',), 'wh', 'energy', 0.001),
+]
+
+# alias -> (unit name, dimension, size in base unit)
+UNITS = {
+    alias: (unit, dimension, size)
+    for aliases, unit, dimension, size in UNIT_SPECS
+    for alias in aliases
+}
+
+# Canonical unit of each factor family: the unit FACTORS are quoted in for a
+# category, per dimension (per-km transport, per-hour energy and digital, ...)
+FAMILY_UNITS = {
+    'transportation': {'distance': 'km'},
+    'energy': {'time': 'hours', 'energy': 'kwh'},
+    'food': {'mass': 'kg'},
+    'waste': {'mass': 'kg'},
+    'water': {'volume': 'liters', 'time': 'minutes'},
+    'digital': {'time': 'hours'},
+    'other': {'time': 'days'},
 }
 
+
+def _build_unit_conversions():
+    """Precompute (category, unit alias) -> (multiplier, canonical unit)."""
+    sizes = {unit: size for unit, _, size in UNITS.values()}
+    conversions = {}
+    for category, targets in FAMILY_UNITS.items():
+        for alias, (unit, dimension, size) in UNITS.items():
+            target = targets.get(dimension)
+            if target is not None:
+                conversions[(category, alias)] = (size / sizes[target], target)
+    return conversions
+
+
+UNIT_CONVERSIONS = _build_unit_conversions()
+
+
+def normalize_quantity(quantity: float, unit: str, category: str):
+    """
+    Convert a quantity into the unit its category's factors are quoted in.
+    
+    Args:
+        quantity: Amount as parsed
+        unit: Unit as parsed (any alias in UNITS, case-insensitive)
+        category: Activity category selecting the factor family
+        
+    Returns:
+        tuple: (quantity, unit); unknown units and units of a dimension the
+               family has no factors for are returned unchanged
+    """
+    conversion = UNIT_CONVERSIONS.get((category, (unit or '').strip().lower()))
+    if conversion is None:
+        return quantity, unit
+    multiplier, canonical = conversion
+    return quantity * multiplier, canonical
+
+
+def normalize_quantities(quantities, units, categories):
+    """
+    Vectorized normalize_quantity for recalculating many activities at once.
+    
+    Args:
+        quantities: Sequence or array of amounts
+        units: Sequence of units, aligned with quantities
+        categories: Sequence of categories, aligned with quantities
+        
+    Returns:
+        tuple: (float64 array of quantities, object array of units)
+    """
+    import numpy as np
+
+    quantities = np.asarray(quantities, dtype=np.float64)
+    pairs = {}
+    codes = np.fromiter(
+        (pairs.setdefault((category, unit), len(pairs)) for category, unit in zip(categories, units)),
+        dtype=np.intp, count=len(quantities),
+    )
+    multipliers = np.ones(len(pairs), dtype=np.float64)
+    canonical = np.empty(len(pairs), dtype=object)
+    for (category, unit), code in pairs.items():
+        conversion = UNIT_CONVERSIONS.get((category, (unit or '').strip().lower()))
+        if conversion is None:
+            canonical[code] = unit
+        else:
+            multipliers[code], canonical[code] = conversion
+    return quantities * multipliers[codes], canonical[codes]
+
+# (action, category, instead_of) -> factor; rebuilt whenever the factors change
+FACTOR_TABLE_MAX_ENTRIES = 4096
+_factor_table = {}
+_factor_table_version = None
+_known_activities = set()
+
+
+def precompute_co2_factors(activities) -> None:
+    """
+    Resolve the factor of every known activity up front.
+
+    The triples are remembered, so they are resolved again when the factors
+    change; other combinations are resolved on first use and memoized.
+
+    Args:
+        activities: Iterable of (action, category, instead_of) triples
+    """
+    _known_activities.update(activities)
+    _rebuild_factor_table()
+
+
+def _rebuild_factor_table() -> dict:
+    global _factor_table, _factor_table_version
+    with _factors_lock:
+        version = FactorTable.changes
+        table = {key: _resolve_co2_factor(*key) for key in _known_activities}
+        _factor_table = table
+        _factor_table_version = version
+    return table
+
+
 def get_co2_factor(action: str, category: str, instead_of: str = None) -> float:
     """
     Get CO2 emission factor for an activity.
@@ -98,6 +355,24 @@ def get_co2_factor(action: str, category: str, instead_of: str = None) -> float:
     Returns:
         CO2 factor in kg per unit
     """
+    table = _factor_table
+    if _factor_table_version != FactorTable.changes:
+        table = _rebuild_factor_table()
+    key = (action, category, instead_of)
+    try:
+        factor = table.get(key)
+    except TypeError:
+        # Unhashable values from a malformed parse; resolve without memoizing
+        return _resolve_co2_factor(action, category, instead_of)
+    if factor is None:
+        factor = _resolve_co2_factor(action, category, instead_of)
+        if len(table) < FACTOR_TABLE_MAX_ENTRIES:
+            table[key] = factor
+    return factor
+
+
+def _resolve_co2_factor(action: str, category: str, instead_of: str = None) -> float:
+    """Resolve a factor by probing FACTORS (the uncached path of get_co2_factor)."""
     # Try direct action lookup first
     direct_key = f"{action}_kg_per_unit"
     if direct_key in FACTORS:
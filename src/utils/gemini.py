@@ -0,0 +1,28 @@
+"""
+Connection settings shared by every Gemini client in the app.
+"""
+
+import os
+
+
+def gemini_client_kwargs():
+    """
+    Extra keyword arguments for ``genai.configure`` and ChatGoogleGenerativeAI.
+
+    Setting GEMINI_API_ENDPOINT (for example ``http://127.0.0.1:8765``, where
+    ``benchmarks/fake_gemini.py`` listens) sends every Gemini request to that
+    host over REST instead of Google's default gRPC endpoint. Read on each call
+    so tests and load runs can switch it without restarting.
+
+    Both pinned clients take these arguments (google-generativeai 0.3.2
+    ``configure``, langchain-google-genai 0.0.6 ChatGoogleGenerativeAI
+    fields). The chat model must get them too: it calls ``genai.configure``
+    again with its own values, which would otherwise reset the endpoint.
+
+    Returns:
+        dict: Empty when the default endpoint is used
+    """
+    endpoint = os.getenv('GEMINI_API_ENDPOINT', '').strip()
+    if not endpoint:
+        return {}
+    return {'transport': 'rest', 'client_options': {'api_endpoint': endpoint}}
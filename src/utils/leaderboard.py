@@ -1,12 +1,298 @@
-from sqlalchemy import func
-from src.models.db import db, User, Activity
-
-def top_users(limit=10):
-    rows = (db.session
-            .query(User.username, func.sum(Activity.co2_saved_kg).label('total'))
-            .join(Activity, Activity.user_id == User.id)
-            .group_by(User.id)
-            .order_by(func.sum(Activity.co2_saved_kg).desc())
-            .limit(limit)
-            .all())
-    return [{'username': r[0], 'total_saved_kg': round(float(r[1] or 0.0), 3)} for r in rows]
+"""
+Leaderboards: all-time from an in-memory sorted index, this week and this
+month from pre-aggregated period buckets.
+
+UserStats (maintained on write, see src/utils/rollups.py) is the totals
+table: one row per user, indexed on total_kg and on a revision number that
+increases with every write. Each worker's app keeps a LeaderboardIndex, a
+list of (-total_kg, user_id) kept sorted with bisect, loaded from UserStats
+on first use. Before answering, it applies the rows whose revision is newer
+than the last one it saw, so activities logged through any worker show up
+without a rescan:
+
+- top k: a slice of the sorted list, O(k);
+- a user's rank: one binary search, O(log n);
+- an update: a binary search plus a list insert/remove.
+
+The week and month windows read PeriodTotal, bucketed per calendar period
+on write: a new period starts empty, so windows roll over without any
+recomputation, and top k walks the (period, period_start, total_kg) index.
+
+Both are read through a LeaderboardCache (src/utils/leaderboard_cache.py)
+shared by every worker: the top LEADERBOARD_CACHE_SIZE users of each window
+are stored once, smaller limits are slices of it, and committed writes patch
+it with the touched users' new totals.
+
+Raw Activity rows are never read.
+"""
+
+import bisect
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, event, func, select
+from sqlalchemy.orm import Session
+
+from src.models.db import db, PeriodTotal, User, UserStats
+from .leaderboard_cache import LEADERBOARD_CACHE_PATH, LEADERBOARD_CACHE_SIZE, Entry, LeaderboardCache
+from .rollups import CHANGED_USERS_KEY, period_start
+
+# Leaderboard windows: the current calendar week, the current month, all time
+WINDOWS = ('week', 'month', 'all')
+
+# Longest time clients and proxies may reuse a leaderboard response
+LEADERBOARD_MAX_AGE = int(os.getenv('LEADERBOARD_MAX_AGE', 30))
+
+# session.info key of the window totals to patch into the cache after commit
+LEADERBOARD_CHANGES_KEY = 'leaderboard_changes'
+
+
+class LeaderboardIndex:
+    """Users ordered by total kg CO2 saved (ties by user id)."""
+
+    def __init__(self):
+        self._order: List[tuple] = []
+        self._totals: Dict[int, float] = {}
+        self._names: Dict[int, str] = {}
+        self._revisions: Dict[int, int] = {}
+        self.revision = 0
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _set(self, user_id: int, username: str, total: float, active: bool) -> None:
+        old = self._totals.pop(user_id, None)
+        if old is not None:
+            del self._order[bisect.bisect_left(self._order, (-old, user_id))]
+        if active:
+            self._totals[user_id] = total
+            self._names[user_id] = username
+            bisect.insort(self._order, (-total, user_id))
+
+    def _apply(self, rows) -> None:
+        for row in rows:
+            self._set(row.user_id, row.username, row.total_kg, row.activity_count > 0)
+            self._revisions[row.user_id] = row.revision
+            self.revision = max(self.revision, row.revision)
+
+    def _changes(self, since: Optional[int]):
+        query = (select(UserStats.user_id, User.username, UserStats.total_kg, UserStats.activity_count,
+                        UserStats.revision)
+                 .join(User, User.id == UserStats.user_id))
+        if since is not None:
+            query = query.where(UserStats.revision > since)
+        return db.session.execute(query).all()
+
+    def sync(self) -> int:
+        """
+        Load the index, or apply the UserStats rows written since the last sync.
+
+        Returns:
+            int: Number of rows read
+        """
+        # Held across the query, so an older batch of rows can never be applied
+        # after a newer one
+        with self._lock:
+            rows = self._changes(self.revision if self.loaded else None)
+            self.loaded = True
+            self._apply(rows)
+        return len(rows)
+
+    def reset(self) -> None:
+        """Forget everything; the next sync() reloads from UserStats."""
+        with self._lock:
+            self._order, self._totals, self._names, self._revisions = [], {}, {}, {}
+            self.revision = 0
+            self.loaded = False
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        """The first `limit` users as {'username', 'total_saved_kg'}."""
+        return [{'username': username, 'total_saved_kg': round(total, 3)}
+                for _, username, total, _ in self.top_entries(limit)]
+
+    def top_entries(self, limit: int) -> List[Entry]:
+        """The first `limit` users as (user_id, username, total_kg, revision)."""
+        with self._lock:
+            return [(user_id, self._names[user_id], -neg_total, self._revisions[user_id])
+                    for neg_total, user_id in self._order[:max(limit, 0)]]
+
+    def rank(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """
+        A user's position (1 = most saved; equal totals share a rank).
+
+        Returns:
+            dict or None: rank, total_saved_kg and the number of ranked users;
+                          None for users with no activities
+        """
+        with self._lock:
+            total = self._totals.get(user_id)
+            if total is None:
+                return None
+            # Users with a strictly larger total sort before (-total,)
+            position = bisect.bisect_left(self._order, (-total,)) + 1
+            return {'rank': position, 'total_saved_kg': round(total, 3), 'users': len(self._order)}
+
+
+def window_start(window: str, today: Optional[date] = None) -> Optional[date]:
+    """First day of the current week or month window; None for 'all'."""
+    if window not in WINDOWS:
+        raise ValueError(f"Unknown leaderboard window {window!r}")
+    if window == 'all':
+        return None
+    return period_start(window, today or datetime.utcnow().date())
+
+
+def seconds_left(window: str, now: Optional[datetime] = None) -> Optional[float]:
+    """Seconds until the current week or month window rolls over; None for 'all'."""
+    now = now or datetime.utcnow()
+    start = window_start(window, now.date())
+    if start is None:
+        return None
+    if window == 'week':
+        end = start + timedelta(days=7)
+    else:
+        end = (start + timedelta(days=32)).replace(day=1)
+    return (datetime(end.year, end.month, end.day) - now).total_seconds()
+
+
+def _period_top(window: str, start: date, limit: int) -> List[Entry]:
+    # Walks the (period, period_start, total_kg) index backwards: O(limit)
+    rows = db.session.execute(
+        select(PeriodTotal.user_id, User.username, PeriodTotal.total_kg, UserStats.revision)
+        .join(User, User.id == PeriodTotal.user_id)
+        .join(UserStats, UserStats.user_id == PeriodTotal.user_id)
+        .where(PeriodTotal.period == window, PeriodTotal.period_start == start, PeriodTotal.activity_count > 0)
+        .order_by(PeriodTotal.total_kg.desc(), PeriodTotal.user_id)
+        .limit(max(limit, 0))
+    ).all()
+    return [tuple(row) for row in rows]
+
+
+def _period_rank(window: str, start: date, user_id: int) -> Optional[Dict[str, Any]]:
+    in_window = and_(PeriodTotal.period == window, PeriodTotal.period_start == start, PeriodTotal.activity_count > 0)
+    total = db.session.execute(
+        select(PeriodTotal.total_kg).where(in_window, PeriodTotal.user_id == user_id)
+    ).scalar()
+    if total is None:
+        return None
+    ahead, users = db.session.execute(
+        select(func.count().filter(PeriodTotal.total_kg > total), func.count()).where(in_window)
+    ).one()
+    return {'rank': ahead + 1, 'total_saved_kg': round(total, 3), 'users': users}
+
+
+def leaderboard_revision() -> int:
+    """Changes whenever any user's totals change (for cache validation)."""
+    return db.session.execute(select(func.coalesce(func.max(UserStats.revision), 0))).scalar()
+
+
+def get_leaderboard_index() -> LeaderboardIndex:
+    """The current app's index, brought up to date with UserStats."""
+    index = current_app.extensions.get('leaderboard_index')
+    if index is None:
+        index = current_app.extensions.setdefault('leaderboard_index', LeaderboardIndex())
+    index.sync()
+    return index
+
+
+def get_leaderboard_cache() -> LeaderboardCache:
+    """The current app's handle on the shared top-N cache."""
+    cache = current_app.extensions.get('leaderboard_cache')
+    if cache is None:
+        path = current_app.config.get('LEADERBOARD_CACHE_PATH') or LEADERBOARD_CACHE_PATH
+        cache = current_app.extensions.setdefault('leaderboard_cache', LeaderboardCache(path))
+    return cache
+
+
+def clamp_limit(limit: int) -> int:
+    """Limit a requested leaderboard length to what the cache stores."""
+    return max(1, min(int(limit), LEADERBOARD_CACHE_SIZE))
+
+
+def compute_top(window: str, limit: int) -> List[Entry]:
+    """Top users of a window straight from the index or PeriodTotal, bypassing the cache."""
+    start = window_start(window)
+    if start is None:
+        return get_leaderboard_index().top_entries(limit)
+    return _period_top(window, start, limit)
+
+
+def top_users(limit=10, window='all'):
+    """
+    The first `limit` users of a leaderboard window, served from the shared cache.
+
+    Args:
+        limit: Users wanted, clamped to 1..LEADERBOARD_CACHE_SIZE
+        window: 'week', 'month' or 'all'
+
+    Returns:
+        list: {'username', 'total_saved_kg'} dicts, best first
+    """
+    limit = clamp_limit(limit)
+    cache = get_leaderboard_cache()
+    start = str(window_start(window) or '')
+    entries, generation = cache.get(window, start)
+    if entries is None:
+        entries = compute_top(window, cache.size)
+        cache.fill(window, start, entries, generation)
+    return [{'username': username, 'total_saved_kg': round(total, 3)}
+            for _, username, total, _ in entries[:limit]]
+
+
+def user_rank(user_id: int, window: str = 'all') -> Optional[Dict[str, Any]]:
+    """Rank of one user on a leaderboard window (see LeaderboardIndex.rank)."""
+    start = window_start(window)
+    if start is None:
+        return get_leaderboard_index().rank(user_id)
+    return _period_rank(window, start, user_id)
+
+
+def _window_changes(session, user_ids) -> Dict[str, tuple]:
+    """New totals of some users in every current window: {window: (period_start, changes)}."""
+    users = {row.user_id: row for row in session.execute(
+        select(UserStats.user_id, User.username, UserStats.total_kg, UserStats.activity_count, UserStats.revision)
+        .join(User, User.id == UserStats.user_id)
+        .where(UserStats.user_id.in_(list(user_ids)))
+    )}
+    changes = {'all': ('', [(u.user_id, u.username, u.total_kg, u.activity_count > 0, u.revision)
+                            for u in users.values()])}
+    for window in WINDOWS:
+        start = window_start(window)
+        if start is None:
+            continue
+        totals = dict(session.execute(
+            select(PeriodTotal.user_id, PeriodTotal.total_kg)
+            .where(PeriodTotal.period == window, PeriodTotal.period_start == start,
+                   PeriodTotal.activity_count > 0, PeriodTotal.user_id.in_(list(users)))
+        ).all())
+        changes[window] = (str(start), [(u.user_id, u.username, totals.get(u.user_id, 0.0),
+                                         u.user_id in totals, u.revision) for u in users.values()])
+    return changes
+
+
+@event.listens_for(Session, 'before_commit')
+def _collect_leaderboard_changes(session):
+    # Flush first, so activities added since the last flush are counted too
+    session.flush()
+    user_ids = session.info.get(CHANGED_USERS_KEY)
+    if user_ids and has_app_context():
+        session.info[LEADERBOARD_CHANGES_KEY] = _window_changes(session, user_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _patch_leaderboard_cache(session):
+    changes = session.info.pop(LEADERBOARD_CHANGES_KEY, None)
+    if changes and has_app_context():
+        cache = get_leaderboard_cache()
+        for window, (start, window_changes) in changes.items():
+            cache.patch(window, start, window_changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_leaderboard_changes(session, previous_transaction):
+    session.info.pop(LEADERBOARD_CHANGES_KEY, None)
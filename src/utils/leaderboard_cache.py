@@ -0,0 +1,204 @@
+"""
+Leaderboard top-N cache in SQLite, shared by all worker processes.
+
+One row per leaderboard window holds the top LEADERBOARD_CACHE_SIZE users as
+(user_id, username, total_kg, revision) entries. Any smaller limit is a
+slice of it. Writes keep it current instead of expiring it:
+
+- a user whose total rises is moved up, or enters if they now beat the last
+  entry; users below the cut-off cannot affect the top N and change nothing;
+- a listed user whose total falls may let someone unlisted in, so the
+  window is dropped and recomputed on the next read.
+
+Every patch bumps the row's generation, and a fill computed by a reader only
+lands if the generation is unchanged since the reader looked, so a slow
+reader never overwrites a newer patch with older totals. Entries also expire
+after LEADERBOARD_CACHE_TTL seconds as a backstop.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+LEADERBOARD_CACHE_PATH = os.getenv('LEADERBOARD_CACHE_PATH', os.path.join('instance', 'leaderboard_cache.sqlite3'))
+# Users stored per window; also the largest `limit` served
+LEADERBOARD_CACHE_SIZE = int(os.getenv('LEADERBOARD_CACHE_SIZE', 100))
+LEADERBOARD_CACHE_TTL = float(os.getenv('LEADERBOARD_CACHE_TTL', 600))
+
+# (user_id, username, total_kg, revision)
+Entry = Tuple[int, str, float, int]
+# (user_id, username, total_kg, active in the window, revision)
+Change = Tuple[int, str, float, bool, int]
+
+
+def _sort_key(entry) -> tuple:
+    return -entry[2], entry[0]
+
+
+def patch_entries(entries: List[Entry], changes: Iterable[Change], size: int) -> Optional[List[Entry]]:
+    """
+    Apply new user totals to a cached top list.
+
+    Args:
+        entries: Cached entries, best first
+        changes: New totals of the users a write touched
+        size: Entries kept
+
+    Returns:
+        list or None: Patched entries, or None when the list can no longer be
+                      patched exactly and must be recomputed
+    """
+    # A list shorter than size holds every ranked user, so it can always be patched
+    complete = len(entries) < size
+    listed = {entry[0]: entry for entry in entries}
+    for user_id, username, total, active, revision in changes:
+        current = listed.get(user_id)
+        if current is not None:
+            if revision <= current[3]:
+                continue
+            if not complete and (not active or total < current[2]):
+                return None
+            del listed[user_id]
+        elif not active:
+            continue
+        elif not complete and len(listed) >= size and _sort_key((user_id, username, total)) > max(
+                (_sort_key(entry) for entry in listed.values()), default=()):
+            continue
+        if active:
+            listed[user_id] = (user_id, username, total, revision)
+    return sorted(listed.values(), key=_sort_key)[:size]
+
+
+class LeaderboardCache:
+    """
+    Top-N leaderboard entries per window, stored in SQLite (WAL mode) so
+    every gunicorn worker reads and patches the same copy.
+
+    Args:
+        path: SQLite file path (``':memory:'`` gives each thread a private cache)
+        size: Entries stored per window
+        ttl: Seconds before a stored list is recomputed anyway
+    """
+
+    def __init__(self, path: str = LEADERBOARD_CACHE_PATH, size: int = LEADERBOARD_CACHE_SIZE,
+                 ttl: float = LEADERBOARD_CACHE_TTL):
+        self.path = path
+        self.size = size
+        self.ttl = ttl
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.patches = 0
+        self.invalidations = 0
+        directory = os.path.dirname(path)
+        if directory and path != ':memory:':
+            os.makedirs(directory, exist_ok=True)
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS leaderboard_cache (
+                board TEXT PRIMARY KEY,
+                period_start TEXT,
+                entries TEXT,
+                filled_at REAL,
+                generation INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, window: str, period_start: str) -> Tuple[Optional[List[Entry]], int]:
+        """
+        Cached entries of a window.
+
+        Returns:
+            tuple: (entries or None on a miss, generation to pass to fill())
+        """
+        try:
+            conn = self._connect()
+            conn.execute('INSERT OR IGNORE INTO leaderboard_cache (board) VALUES (?)', (window,))
+            row = conn.execute('SELECT period_start, entries, filled_at, generation FROM leaderboard_cache '
+                               'WHERE board = ?', (window,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Leaderboard cache read failed: {e}")
+            return None, -1
+        stored_start, entries, filled_at, generation = row
+        if entries is None or stored_start != period_start or time.time() - filled_at > self.ttl:
+            self.misses += 1
+            return None, generation
+        self.hits += 1
+        return [tuple(entry) for entry in json.loads(entries)], generation
+
+    def fill(self, window: str, period_start: str, entries: List[Entry], generation: int) -> bool:
+        """Store freshly computed entries unless the window was patched since get()."""
+        try:
+            cur = self._connect().execute(
+                'UPDATE leaderboard_cache SET period_start = ?, entries = ?, filled_at = ? '
+                'WHERE board = ? AND generation = ?',
+                (period_start, json.dumps(entries[:self.size]), time.time(), window, generation),
+            )
+        except sqlite3.Error as e:
+            print(f"Leaderboard cache write failed: {e}")
+            return False
+        return cur.rowcount == 1
+
+    def patch(self, window: str, period_start: str, changes: List[Change]) -> None:
+        """Apply new user totals to a window's entries (see patch_entries)."""
+        try:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT period_start, entries FROM leaderboard_cache WHERE board = ?',
+                                   (window,)).fetchone()
+                entries = None
+                if row is not None and row[1] is not None and row[0] == period_start:
+                    entries = patch_entries([tuple(e) for e in json.loads(row[1])], changes, self.size)
+                    if entries is None:
+                        self.invalidations += 1
+                    else:
+                        self.patches += 1
+                # Bump the generation even without entries, so no fill started earlier lands
+                conn.execute(
+                    'INSERT INTO leaderboard_cache (board, period_start, entries, generation) VALUES (?, ?, ?, 1) '
+                    'ON CONFLICT (board) DO UPDATE SET period_start = excluded.period_start, '
+                    'entries = excluded.entries, generation = generation + 1',
+                    (window, period_start, None if entries is None else json.dumps(entries)),
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            print(f"Leaderboard cache patch failed: {e}")
+
+    def clear(self) -> None:
+        """Drop every window; the next reads recompute them."""
+        try:
+            self._connect().execute('UPDATE leaderboard_cache SET entries = NULL, generation = generation + 1')
+        except sqlite3.Error as e:
+            print(f"Leaderboard cache clear failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/patch counters of this process."""
+        lookups = self.hits + self.misses
+        return {
+            'size': self.size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'patches': self.patches,
+            'invalidations': self.invalidations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
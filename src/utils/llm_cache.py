@@ -0,0 +1,166 @@
+"""
+Persistent SQLite cache of LLM parse results, shared by all worker processes.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from .cache import normalize_entry
+
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', os.path.join('instance', 'llm_cache.sqlite3'))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 50000))
+# A hit refreshes the row's last_used only when it is older than this (seconds)
+LLM_CACHE_TOUCH_SECONDS = float(os.getenv('LLM_CACHE_TOUCH_SECONDS', 300))
+
+# Evict at most once every this many writes, so inserts stay cheap
+EVICT_EVERY = 100
+
+
+def template_hash(template: str) -> str:
+    """Return a short stable hash of a prompt template."""
+    return hashlib.sha256(template.encode('utf-8')).hexdigest()[:16]
+
+
+class LLMResponseCache:
+    """
+    Parsed LLM responses stored in SQLite, keyed on prompt template hash,
+    model name and normalized entry text.
+
+    The database runs in WAL mode, so any number of gunicorn workers can read
+    while one writes, and entries survive restarts. When the table grows past
+    ``max_entries`` the least recently used rows are deleted. Hits only write
+    when the row's last_used is ``touch_interval`` seconds old, so reading a
+    hot entry is not a cross-process write every time.
+
+    Args:
+        path: SQLite file path (``':memory:'`` for a private cache)
+        max_entries: Row count kept after eviction
+        touch_interval: Seconds a hit leaves last_used as it is
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 touch_interval: float = LLM_CACHE_TOUCH_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory and path != ':memory:':
+            os.makedirs(directory, exist_ok=True)
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                template_hash TEXT NOT NULL,
+                entry TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_llm_cache_last_used ON llm_cache (last_used)')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def make_key(template_digest: str, model: str, text: str) -> str:
+        raw = f"{template_digest}\x1f{model}\x1f{normalize_entry(text)}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, template_digest: str, model: str, text: str) -> Optional[Dict[str, Any]]:
+        """Return the cached parse for this prompt/model/text, or None."""
+        return self.get_any((template_digest,), model, text)
+
+    def get_any(self, template_digests: Sequence[str], model: str, text: str) -> Optional[Dict[str, Any]]:
+        """Return the most recently used parse of this model/text from any of the prompts, or None."""
+        keys = [self.make_key(digest, model, text) for digest in template_digests]
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                f"SELECT key, response, last_used FROM llm_cache WHERE key IN ({', '.join('?' * len(keys))}) "
+                f"ORDER BY last_used DESC LIMIT 1", keys,
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            if now - row[2] >= self.touch_interval:
+                conn.execute('UPDATE llm_cache SET last_used = ? WHERE key = ?', (now, row[0]))
+        except sqlite3.Error as e:
+            print(f"LLM cache read failed: {e}")
+            return None
+        self.hits += 1
+        return json.loads(row[1])
+
+    def set(self, template_digest: str, model: str, text: str, parsed: Dict[str, Any]) -> None:
+        """Store a parse result, evicting old rows every few writes."""
+        key = self.make_key(template_digest, model, text)
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO llm_cache '
+                '(key, model, template_hash, entry, response, created_at, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, model, template_digest, normalize_entry(text), json.dumps(parsed), now, now),
+            )
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self.evict()
+        except sqlite3.Error as e:
+            print(f"LLM cache write failed: {e}")
+
+    def evict(self) -> int:
+        """Delete least recently used rows beyond max_entries; return rows removed."""
+        conn = self._connect()
+        cur = conn.execute(
+            'DELETE FROM llm_cache WHERE key IN ('
+            ' SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,),
+        )
+        return cur.rowcount
+
+    def __len__(self) -> int:
+        return self._connect().execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return this process' hit/miss counters and the shared row count."""
+        return {'path': self.path, 'entries': len(self), 'max_entries': self.max_entries,
+                'hits': self.hits, 'misses': self.misses}
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Get or create the process-wide LLM cache (disabled if LLM_CACHE_PATH is empty)."""
+    global _llm_cache
+    if _llm_cache is None and LLM_CACHE_PATH:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                try:
+                    _llm_cache = LLMResponseCache()
+                except sqlite3.Error as e:
+                    print(f"LLM cache unavailable: {e}")
+                    return None
+    return _llm_cache
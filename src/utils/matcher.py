@@ -0,0 +1,117 @@
+"""
+Single-pass keyword matcher used by the rule-based parsers.
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable, Set
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """Build a regex alternation shaped like a trie of the keywords."""
+    root: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = root
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def emit(node):
+        terminal = '' in node
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not terminal:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        # Greedy optional: prefer the longer keyword, fall back to this one
+        return group + '?' if terminal else group
+
+    return emit(root)
+
+
+def word_regex(keywords: Iterable[str]) -> "re.Pattern[str]":
+    """
+    Compile a regex finding any of the keywords as a whole word.
+
+    A plural, past tense or -ing ending is allowed ("bus" finds "buses",
+    "walk" finds "walking"), but a keyword inside another word is not a
+    match ("bus" in "business", "rail" in "trail"). The ``keyword`` group
+    holds the keyword itself, without the ending.
+    """
+    return re.compile(r'\b(?P<keyword>' + _trie_pattern(k for k in keywords if k) + r')(?:e?s|e?d|ing)?\b')
+
+
+class KeywordMatcher:
+    """
+    Report which of a fixed set of keywords occur anywhere in a text.
+
+    The keywords are compiled once into a trie-shaped regex, so one
+    ``finditer`` pass finds the longest keyword at each match position.
+    Every keyword also carries the set of keywords it contains, which covers
+    matches nested inside a longer one. Keywords that start inside a match
+    and run past its end (``'no phone'`` followed by ``'phone free'``) are
+    picked up by re-probing only the offsets where such an overlap is
+    possible. The result is identical to ``{k for k in keywords if k in text}``.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: FrozenSet[str] = frozenset(k for k in keywords if k)
+        if not self.keywords:
+            raise ValueError("KeywordMatcher needs at least one keyword")
+
+        self._regex = re.compile(_trie_pattern(self.keywords))
+        self._contains = {
+            keyword: frozenset(k for k in self.keywords if k in keyword)
+            for keyword in self.keywords
+        }
+        # Offsets inside a keyword where another keyword could start and
+        # extend beyond its end, with the characters that must follow the
+        # match for that to happen (so most re-probes are skipped outright)
+        self._overlaps = {}
+        for keyword in self.keywords:
+            probes = {}
+            for off in range(1, len(keyword)):
+                tail = keyword[off:]
+                for k in self.keywords:
+                    if k.startswith(tail) and len(k) > len(tail):
+                        probes.setdefault(off, set()).add(k[len(tail)])
+            if probes:
+                self._overlaps[keyword] = (
+                    frozenset().union(*probes.values()),
+                    tuple((off, frozenset(chars)) for off, chars in sorted(probes.items())),
+                )
+
+    def contains(self, keyword: str) -> FrozenSet[str]:
+        """Return every keyword contained in ``keyword`` (itself included)."""
+        return self._contains[keyword]
+
+    def scan(self, text: str) -> Set[str]:
+        """
+        Scan text once and return the keywords it contains.
+
+        Args:
+            text: Text to scan, already normalized (e.g. lowercased)
+
+        Returns:
+            Set of matched keywords
+        """
+        found: Set[str] = set()
+        contains = self._contains
+        overlaps = self._overlaps
+        regex = self._regex
+        for m in regex.finditer(text):
+            keyword = m.group()
+            found |= contains[keyword]
+            probes = overlaps.get(keyword)
+            if probes:
+                end = m.end()
+                following = text[end:end + 1]
+                if not following or following not in probes[0]:
+                    continue
+                start = m.start()
+                for off, chars in probes[1]:
+                    if following in chars:
+                        inner = regex.match(text, start + off)
+                        if inner is not None and inner.end() > end:
+                            found |= contains[inner.group()]
+        return found
@@ -0,0 +1,103 @@
+"""
+Per-request latency metrics for /api/log and their process-wide aggregates.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+
+class RequestMetrics:
+    """
+    Stage timings and the answering path of a single request.
+
+    Args:
+        budget: Latency budget in seconds (None for unlimited)
+    """
+
+    def __init__(self, budget: Optional[float] = None):
+        self.budget = budget
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.path: Optional[str] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block and add its duration (ms) to the named stage."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - t0) * 1000.0
+
+    def elapsed(self) -> float:
+        """Seconds since the request started."""
+        return time.perf_counter() - self.started
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left in the budget (never negative), or None if unlimited."""
+        if self.budget is None:
+            return None
+        return max(0.0, self.budget - self.elapsed())
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'total_ms': round(self.elapsed() * 1000.0, 3),
+            'budget_ms': round(self.budget * 1000.0, 3) if self.budget is not None else None,
+            'stages': {k: round(v, 3) for k, v in self.stages.items()},
+        }
+
+    def server_timing(self) -> str:
+        """Format the stages as a ``Server-Timing`` header value."""
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.stages.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000.0:.1f}")
+        if self.path:
+            parts.append(f'path;desc="{self.path}"')
+        return ', '.join(parts)
+
+
+class MetricsRegistry:
+    """Thread-safe per-path counters and stage totals across requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._paths: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, metrics: RequestMetrics) -> None:
+        total_ms = metrics.elapsed() * 1000.0
+        with self._lock:
+            entry = self._paths.setdefault(metrics.path or 'unknown', {
+                'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'over_budget': 0, 'stages_ms': {},
+            })
+            entry['count'] += 1
+            entry['total_ms'] += total_ms
+            entry['max_ms'] = max(entry['max_ms'], total_ms)
+            if metrics.budget is not None and total_ms > metrics.budget * 1000.0:
+                entry['over_budget'] += 1
+            for name, ms in metrics.stages.items():
+                entry['stages_ms'][name] = entry['stages_ms'].get(name, 0.0) + ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return counts, average/max latency and average stage time per path."""
+        with self._lock:
+            out = {}
+            for path, entry in self._paths.items():
+                count = entry['count']
+                out[path] = {
+                    'count': count,
+                    'avg_ms': round(entry['total_ms'] / count, 3),
+                    'max_ms': round(entry['max_ms'], 3),
+                    'over_budget': entry['over_budget'],
+                    'avg_stage_ms': {k: round(v / count, 3) for k, v in entry['stages_ms'].items()},
+                }
+            return out
+
+
+# Aggregates for /api/log requests in this worker
+log_metrics = MetricsRegistry()
@@ -2,14 +2,12 @@
 Enhanced activity parser with AI integration.
 """
 
-import re
-
-DIST_RE = r'(?P<qty>\d+(?:\.\d+)?)\s*(?:km|kilometers?)'
-COUNT_RE = r'(?P<qty>\d+)'
+from .router import parse_hybrid
+from .rules import RULE_SETS, DIST_RE, COUNT_RE, split_activities
 
 def parse_entry(text: str):
     """
-    Parse activity entry using AI first, then fallback to regex patterns.
+    Parse activity entry with the rules, calling the AI only when they are unsure.
     
     Args:
         text: Natural language description of environmental activity
@@ -20,55 +18,28 @@ def parse_entry(text: str):
     if not text:
         return None
     
-    # Try AI parsing first (with safe imports)
-    try:
-        from .ai_parser_fixed import parse_with_ai
-        ai_result = parse_with_ai(text)
-        if ai_result is not None:
-            return ai_result
-    except Exception as e:
-        print(f"AI parsing not available: {e}")
+    # Confident rule matches skip the AI call entirely
+    parsed = parse_hybrid(text)
+    if parsed is not None:
+        return parsed
     
     # Fallback to legacy regex parsing
     return _legacy_parse_entry(text)
 
+def parse_entries(text: str):
+    """
+    Parse an entry that may describe several activities.
+    
+    Args:
+        text: Natural language description of one or more activities
+        
+    Returns:
+        List of parsed activity dictionaries in entry order (empty if none matched)
+    """
+    return [parsed for parsed in map(parse_entry, split_activities(text)) if parsed]
+
 def _legacy_parse_entry(text: str):
     """
     Legacy regex-based parsing for backward compatibility.
     """
-    if not text:
-        return None
-    t = text.lower().strip()
-
-    if 'walk' in t:
-        m = re.search(DIST_RE, t)
-        qty = float(m.group('qty')) if m else 1.0
-        instead = 'car' if ('instead of car' in t or 'instead of driving' in t or 'drive' in t) else None
-        return {'action': 'walk', 'quantity': qty, 'unit': 'km', 'instead_of': instead}
-
-    if 'cycle' in t or 'cycled' in t or 'bicycle' in t or 'bike' in t:
-        m = re.search(DIST_RE, t)
-        qty = float(m.group('qty')) if m else 1.0
-        instead = 'car' if 'instead of car' in t else ('bus' if 'instead of bus' in t else None)
-        return {'action': 'cycle', 'quantity': qty, 'unit': 'km', 'instead_of': instead}
-
-    if 'bus' in t and ('took' in t or 'ride' in t or 'rode' in t):
-        m = re.search(DIST_RE, t)
-        qty = float(m.group('qty')) if m else 1.0
-        instead = 'car' if 'instead of car' in t else None
-        return {'action': 'bus', 'quantity': qty, 'unit': 'km', 'instead_of': instead}
-
-    if ('vegetarian' in t or 'veg' in t) and 'beef' in t:
-        return {'action': 'meal_swap', 'from': 'beef', 'to': 'veg', 'quantity': 1, 'unit': 'meal'}
-    if ('vegetarian' in t or 'veg' in t) and 'chicken' in t:
-        return {'action': 'meal_swap', 'from': 'chicken', 'to': 'veg', 'quantity': 1, 'unit': 'meal'}
-    if ('meatless' in t or 'veg' in t or 'vegetarian' in t) and ('meal' in t or 'lunch' in t or 'dinner' in t):
-        return {'action': 'meal_swap', 'from': 'chicken', 'to': 'veg', 'quantity': 1, 'unit': 'meal'}
-
-    if 'bottle' in t or 'plastic bottle' in t:
-        m = re.search(COUNT_RE, t)
-        qty = int(m.group('qty')) if m else 1
-        if 'avoid' in t or 'skipped' in t or 'reused' in t or 'refill' in t or 'refilled' in t:
-            return {'action': 'plastic_bottle', 'quantity': qty, 'unit': 'count'}
-
-    return None
+    return RULE_SETS['legacy_entry'].parse(text)
@@ -0,0 +1,158 @@
+"""
+Recalculate stored Activity savings after the emission factors change.
+
+Rows whose ``factor_version`` differs from factor_set_version() are streamed
+in primary key order (keyset pagination: ``id > last id``, never OFFSET),
+recomputed with compute_savings_batch and written back with one bulk UPDATE
+per chunk, together with the change to the daily rollups. The last id of
+every chunk is committed with the chunk in FactorRecalcProgress, so an
+interrupted run resumes where it stopped. Each run covers a user_id range;
+ranges from user_id_ranges() can run in separate processes:
+    flask --app app recalc-factors [--workers 4] [--chunk-size 1000] [--users LO:HI]
+"""
+
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_, select, update
+
+from src.models.db import db, Activity, FactorRecalcProgress
+from .calculator import ActivityColumns, compute_savings_batch
+from .factors import factor_set_version
+from .rollups import apply_activity_rollups
+
+RECALC_CHUNK_SIZE = int(os.getenv('RECALC_CHUNK_SIZE', 1000))
+
+# Inclusive user_id bounds of a run over every user
+ALL_USERS = (0, 2 ** 31 - 1)
+
+
+def user_id_ranges(parts: int) -> List[Tuple[int, int]]:
+    """
+    Split the users that have activities into contiguous user_id ranges.
+
+    Ranges hold roughly equal numbers of activities, so parallel runs finish
+    at about the same time.
+
+    Args:
+        parts: Number of ranges wanted
+
+    Returns:
+        list: Inclusive (user_id_min, user_id_max) pairs covering every user
+    """
+    counts = db.session.execute(
+        select(Activity.user_id, func.count()).group_by(Activity.user_id).order_by(Activity.user_id)
+    ).all()
+    if not counts or parts <= 1:
+        return [ALL_USERS]
+    per_part = sum(n for _, n in counts) / parts
+    ranges, start, filled = [], ALL_USERS[0], 0
+    for user_id, n in counts:
+        filled += n
+        if filled >= per_part * (len(ranges) + 1) and len(ranges) < parts - 1:
+            ranges.append((start, user_id))
+            start = user_id + 1
+    ranges.append((start, ALL_USERS[1]))
+    return ranges
+
+
+def _progress(version: str, user_id_min: int, user_id_max: int) -> FactorRecalcProgress:
+    progress = FactorRecalcProgress.query.filter_by(
+        factor_version=version, user_id_min=user_id_min, user_id_max=user_id_max,
+    ).first()
+    if progress is None:
+        progress = FactorRecalcProgress(factor_version=version, user_id_min=user_id_min,
+                                        user_id_max=user_id_max, last_activity_id=0, updated=0)
+        db.session.add(progress)
+        db.session.commit()
+    return progress
+
+
+def recalculate_factors(user_id_min: int = ALL_USERS[0], user_id_max: int = ALL_USERS[1],
+                        chunk_size: int = RECALC_CHUNK_SIZE, max_chunks: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Bring the savings of one user_id range up to the current factor set.
+
+    Must run inside an application context. Rows stored before activities
+    recorded their parsed action are left alone: there is nothing to
+    recompute them from.
+
+    Args:
+        user_id_min: Lowest user_id covered (inclusive)
+        user_id_max: Highest user_id covered (inclusive)
+        chunk_size: Rows read, recomputed and updated per transaction
+        max_chunks: Stop after this many chunks (the run can be resumed)
+
+    Returns:
+        dict: factor version, range, rows updated (including earlier runs),
+              chunks processed now and whether the range is finished
+    """
+    version = factor_set_version()
+    progress = _progress(version, user_id_min, user_id_max)
+    resumed_from = progress.last_activity_id
+    chunks = 0
+    while progress.finished_at is None and (max_chunks is None or chunks < max_chunks):
+        rows = db.session.execute(
+            select(
+                Activity.id,
+                Activity.user_id,
+                Activity.day,
+                Activity.co2_saved_kg,
+                Activity.action,
+                Activity.action_category.label('category'),
+                Activity.instead_of,
+                Activity.quantity,
+                Activity.unit,
+                Activity.category.label('subcategory'),
+            )
+            .where(
+                Activity.id > progress.last_activity_id,
+                Activity.user_id.between(user_id_min, user_id_max),
+                Activity.action.is_not(None),
+                or_(Activity.factor_version.is_(None), Activity.factor_version != version),
+            )
+            .order_by(Activity.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            progress.finished_at = datetime.utcnow()
+            db.session.commit()
+            break
+        result = compute_savings_batch(ActivityColumns.from_parsed(
+            {k: v for k, v in row._mapping.items() if v is not None} for row in rows
+        ))
+        saved = result['co2_saved_kg'].tolist()
+        db.session.execute(update(Activity), [
+            {'id': row.id, 'co2_saved_kg': new, 'factor_version': version}
+            for row, new in zip(rows, saved)
+        ])
+        apply_activity_rollups(db.session, [
+            (row.user_id, row.day, new - (row.co2_saved_kg or 0.0), 0)
+            for row, new in zip(rows, saved) if row.day is not None
+        ])
+        progress.last_activity_id = rows[-1].id
+        progress.updated += len(rows)
+        db.session.commit()
+        chunks += 1
+    return {
+        'factor_version': version,
+        'user_id_min': user_id_min,
+        'user_id_max': user_id_max,
+        'resumed_from': resumed_from,
+        'updated': progress.updated,
+        'chunks': chunks,
+        'finished': progress.finished_at is not None,
+    }
+
+
+def run_range(database_uri: str, user_id_min: int, user_id_max: int, chunk_size: int) -> Dict[str, Any]:
+    """Process entry point: recalculate one user_id range against database_uri."""
+    from app import create_app
+    from config import Config
+
+    config = type('RecalcConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': database_uri,
+                                              'AUTO_CREATE_SCHEMA': False})
+    app = create_app(config)
+    with app.app_context():
+        return recalculate_factors(user_id_min, user_id_max, chunk_size)
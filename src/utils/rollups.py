@@ -0,0 +1,450 @@
+"""
+Per-user rollups of Activity, maintained on write.
+
+DailyRollup holds one (user_id, day) row with the CO2 saved and the number
+of activities logged that day; PeriodTotal holds the same per calendar week
+and month; UserStats holds each user's running totals, first and last
+active day and streaks. All are updated in the transaction that writes the
+activities:
+
+- ORM writes (``db.session.add(Activity(...))``, deletes, edits of
+  co2_saved_kg) are picked up by session flush hooks;
+- bulk Core statements bypass the ORM, so their callers pass the rows to
+  apply_activity_rollups() before committing (see api._save_activities and
+  recalc.recalculate_factors).
+
+Writes use INSERT ... ON CONFLICT DO UPDATE, which SQLite and PostgreSQL
+both provide; week and month buckets are computed in Python (see
+period_start()), and UserStats revisions come from a RevisionCounter row.
+
+Rebuild or verify the tables from raw activities with:
+    flask --app app rebuild-rollups [--check]
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from sqlalchemy import and_, delete, distinct, event, func, inspect, or_, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from src.models.db import db, Activity, DailyRollup, PeriodTotal, RevisionCounter, UserStats
+
+# Rollup totals are float sums; differences below this are rounding, not drift
+ROLLUP_TOLERANCE_KG = 1e-6
+
+# Calendar periods with per-user buckets in PeriodTotal
+PERIODS = ('week', 'month')
+
+# INSERT constructs with on_conflict_do_update(), by dialect name
+UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+# RevisionCounter row of UserStats.revision
+USER_STATS_REVISION = 'user_stats'
+
+# UserStats and PeriodTotal rows inserted per statement by rebuild_rollups()
+REBUILD_BATCH_SIZE = 5000
+
+# session.info key of the user ids whose totals the current transaction changed
+CHANGED_USERS_KEY = 'rollup_changed_users'
+
+# (user_id, day, co2 delta, activity count delta)
+RollupDelta = Tuple[int, date, float, int]
+
+
+def _day_of(activity: Activity) -> date:
+    return activity.day or (activity.created_at or datetime.utcnow()).date()
+
+
+def period_start(period: str, day: date) -> date:
+    """First day of the calendar week (Monday) or month containing day."""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown period {period!r}")
+
+
+def streak_lengths(days: Iterable[date]) -> Tuple[int, int]:
+    """
+    Streaks of a set of active days.
+
+    Returns:
+        tuple: (consecutive days ending at the latest day, longest run)
+    """
+    current = longest = 0
+    previous = None
+    for day in sorted(days):
+        current = current + 1 if previous is not None and (day - previous).days == 1 else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest
+
+
+def _insert(session, table):
+    """INSERT for table supporting on_conflict_do_update() on the session's database."""
+    dialect = session.get_bind().dialect.name
+    if dialect not in UPSERT_INSERTS:
+        raise RuntimeError(f"Unsupported database {dialect!r}: the activity rollups need "
+                           f"INSERT ... ON CONFLICT (SQLite or PostgreSQL)")
+    return UPSERT_INSERTS[dialect](table)
+
+
+def _upsert(session, table, conflict_columns, values: List[Dict[str, Any]], increment=(), replace=()):
+    stmt = _insert(session, table)
+    set_ = {name: table.c[name] + stmt.excluded[name] for name in increment}
+    set_.update({name: stmt.excluded[name] for name in replace})
+    return stmt.on_conflict_do_update(index_elements=conflict_columns, set_=set_), values
+
+
+def reserve_revisions(session, count: int) -> int:
+    """
+    Reserve `count` consecutive UserStats revisions.
+
+    The counter row stays locked until the transaction ends, so concurrent
+    writers get disjoint ranges and commit them in increasing order. A
+    missing row starts after the highest revision already stored.
+
+    Returns:
+        int: The last reserved revision; the range is (last - count, last]
+    """
+    table = RevisionCounter.__table__
+    stmt = _insert(session, table).values(
+        name=USER_STATS_REVISION,
+        value=select(func.coalesce(func.max(UserStats.revision), 0) + count).scalar_subquery(),
+    )
+    stmt = stmt.on_conflict_do_update(index_elements=['name'], set_={'value': table.c.value + count})
+    return session.execute(stmt.returning(table.c.value)).scalar_one()
+
+
+def _active_days(session, user_id: int) -> List[date]:
+    return list(session.execute(
+        select(DailyRollup.day).where(DailyRollup.user_id == user_id, DailyRollup.activity_count > 0)
+    ).scalars())
+
+
+def _next_user_stats(session, user_id: int, stats, added: List[date], removed: bool) -> Dict[str, Any]:
+    """New first/last day and streaks of a user after some days became active or inactive."""
+    first, last, current, longest = ((stats.first_day, stats.last_day, stats.current_streak, stats.longest_streak)
+                                     if stats is not None else (None, None, 0, 0))
+    if not removed:
+        for day in sorted(added):
+            if last is not None and day <= last:
+                break
+            first = first or day
+            current = current + 1 if last is not None and (day - last).days == 1 else 1
+            longest = max(longest, current)
+            last = day
+        else:
+            return {'first_day': first, 'last_day': last, 'current_streak': current, 'longest_streak': longest}
+    # A backdated or removed day can split or join runs anywhere: recount this user's days
+    days = _active_days(session, user_id)
+    current, longest = streak_lengths(days)
+    return {'first_day': min(days, default=None), 'last_day': max(days, default=None),
+            'current_streak': current, 'longest_streak': longest}
+
+
+def apply_activity_rollups(session, deltas: Iterable[RollupDelta]) -> int:
+    """
+    Add activity changes to the daily rollups, the week and month buckets
+    and the users' running stats.
+
+    Runs in the caller's session, so the rollups commit or roll back with
+    the activity rows themselves. Totals are incremented in place; streaks
+    are extended in O(1) when a write makes a later day active, and
+    recounted from the user's active days only when a backdated or removed
+    day may split or join runs.
+
+    Args:
+        session: Session of the transaction writing the activities
+        deltas: (user_id, day, co2 delta, activity count delta) per changed row;
+                a new activity is (user_id, day, co2_saved_kg, 1)
+
+    Returns:
+        int: Number of (user_id, day) rollup rows touched
+    """
+    merged: Dict[Tuple[int, date], List[float]] = defaultdict(lambda: [0.0, 0])
+    for user_id, day, co2, count in deltas:
+        totals = merged[(user_id, day)]
+        totals[0] += float(co2 or 0.0)
+        totals[1] += count
+    if not merged:
+        return 0
+
+    # Which days start or stop having activities decides how streaks change
+    before = {(user_id, day): count for user_id, day, count in session.execute(
+        select(DailyRollup.user_id, DailyRollup.day, DailyRollup.activity_count)
+        .where(tuple_(DailyRollup.user_id, DailyRollup.day).in_(list(merged)))
+    )}
+    added, removed = defaultdict(list), set()
+    for key, (_, count) in merged.items():
+        old = before.get(key, 0)
+        if old <= 0 < old + count:
+            added[key[0]].append(key[1])
+        elif old + count <= 0 < old:
+            removed.add(key[0])
+
+    session.execute(*_upsert(session, DailyRollup.__table__, ['user_id', 'day'], [
+        {'user_id': user_id, 'day': day, 'co2_sum': co2, 'activity_count': count}
+        for (user_id, day), (co2, count) in merged.items()
+    ], increment=('co2_sum', 'activity_count')))
+
+    # A new week or month simply starts a new bucket; nothing is recomputed
+    buckets: Dict[Tuple[str, date, int], List[float]] = defaultdict(lambda: [0.0, 0])
+    for (user_id, day), (co2, count) in merged.items():
+        for period in PERIODS:
+            totals = buckets[(period, period_start(period, day), user_id)]
+            totals[0] += co2
+            totals[1] += count
+    session.execute(*_upsert(session, PeriodTotal.__table__, ['period', 'period_start', 'user_id'], [
+        {'period': period, 'period_start': start, 'user_id': user_id, 'total_kg': co2, 'activity_count': count}
+        for (period, start, user_id), (co2, count) in buckets.items()
+    ], increment=('total_kg', 'activity_count')))
+
+    per_user: Dict[int, List[float]] = defaultdict(lambda: [0.0, 0])
+    for (user_id, _), (co2, count) in merged.items():
+        per_user[user_id][0] += co2
+        per_user[user_id][1] += count
+    stats = {row.user_id: row for row in session.execute(
+        select(*UserStats.__table__.c).where(UserStats.user_id.in_(list(per_user)))
+    ).all()}
+    revision = reserve_revisions(session, len(per_user)) - len(per_user)
+    rows = []
+    for user_id, (co2, count) in per_user.items():
+        revision += 1
+        row = {'user_id': user_id, 'total_kg': co2, 'activity_count': count, 'revision': revision}
+        current = stats.get(user_id)
+        if current is None or added.get(user_id) or user_id in removed:
+            row.update(_next_user_stats(session, user_id, current, added.get(user_id, []), user_id in removed))
+        else:
+            row.update(first_day=current.first_day, last_day=current.last_day,
+                       current_streak=current.current_streak, longest_streak=current.longest_streak)
+        rows.append(row)
+    session.execute(*_upsert(session, UserStats.__table__, ['user_id'], rows, increment=('total_kg', 'activity_count'),
+                             replace=('first_day', 'last_day', 'current_streak', 'longest_streak', 'revision')))
+    # Users whose totals this transaction changed, for caches refreshed after commit
+    session.info.setdefault(CHANGED_USERS_KEY, set()).update(per_user)
+    return len(merged)
+
+
+_ROLLUP_ATTRS = ('user_id', 'day', 'co2_saved_kg')
+
+
+def _stored_values(session, activity: Activity) -> Tuple[int, date, float]:
+    """(user_id, day, co2_saved_kg) of an Activity as it is in the database before this flush."""
+    attrs = inspect(activity).attrs
+    history = [attrs[name].history for name in _ROLLUP_ATTRS]
+    if all(h.deleted or h.unchanged for h in history):
+        return tuple(h.deleted[0] if h.deleted else h.unchanged[0] for h in history)
+    # An expired attribute was assigned without loading the old value
+    return session.connection().execute(
+        select(Activity.user_id, Activity.day, Activity.co2_saved_kg).where(Activity.id == activity.id)
+    ).one()
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_changed_activities(session, flush_context, instances):
+    # Old values of edited and deleted rows must be read before the flush writes them
+    deltas = []
+    for obj in session.deleted:
+        if isinstance(obj, Activity):
+            user_id, day, co2 = _stored_values(session, obj)
+            deltas.append((user_id, day, -(co2 or 0.0), -1))
+    for obj in session.dirty:
+        if not isinstance(obj, Activity) or obj in session.deleted:
+            continue
+        attrs = inspect(obj).attrs
+        if not any(attrs[name].history.has_changes() for name in _ROLLUP_ATTRS):
+            continue
+        user_id, day, co2 = _stored_values(session, obj)
+        deltas.append((user_id, day, -(co2 or 0.0), -1))
+        deltas.append((obj.user_id, _day_of(obj), obj.co2_saved_kg, 1))
+    session.info['activity_rollup_deltas'] = deltas
+
+
+@event.listens_for(Session, 'after_flush')
+def _rollup_orm_activities(session, flush_context):
+    # New rows are handled here, once the flush has filled in user_id and day
+    deltas = session.info.pop('activity_rollup_deltas', [])
+    deltas += [(obj.user_id, _day_of(obj), obj.co2_saved_kg, 1)
+               for obj in session.new if isinstance(obj, Activity)]
+    if deltas:
+        apply_activity_rollups(session, deltas)
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_changed_users(session, *args):
+    session.info.pop(CHANGED_USERS_KEY, None)
+
+
+def _raw_daily_totals():
+    day = func.coalesce(Activity.day, func.date(Activity.created_at))
+    return (select(Activity.user_id.label('user_id'), day.label('day'),
+                   func.coalesce(func.sum(Activity.co2_saved_kg), 0.0).label('co2_sum'),
+                   func.count().label('activity_count'))
+            .group_by(Activity.user_id, day))
+
+
+def _rollups_from_days(rows) -> Iterator[Tuple[Dict[str, Any], Dict[Tuple[str, date], List[float]]]]:
+    """
+    UserStats row and week/month totals of each user, from (user_id, day,
+    co2_sum, activity_count) rows sorted by user_id.
+
+    Yields:
+        tuple: (UserStats values, {(period, period_start): [total_kg, activity_count]})
+    """
+    for user_id, days in groupby(rows, key=lambda row: row[0]):
+        days = [(date.fromisoformat(str(day)), co2, count) for _, day, co2, count in days]
+        active = [day for day, _, count in days if count > 0]
+        current, longest = streak_lengths(active)
+        periods: Dict[Tuple[str, date], List[float]] = defaultdict(lambda: [0.0, 0])
+        for day, co2, count in days:
+            for period in PERIODS:
+                totals = periods[(period, period_start(period, day))]
+                totals[0] += co2
+                totals[1] += count
+        yield {
+            'user_id': user_id,
+            'total_kg': sum(co2 for _, co2, _ in days),
+            'activity_count': sum(count for _, _, count in days),
+            'first_day': min(active, default=None),
+            'last_day': max(active, default=None),
+            'current_streak': current,
+            'longest_streak': longest,
+        }, periods
+
+
+def _stored_periods() -> Iterator[Tuple[int, Dict[Tuple[str, date], Tuple[float, int]]]]:
+    """PeriodTotal rows grouped by user, in user_id order."""
+    rows = db.session.execute(
+        select(PeriodTotal.user_id, PeriodTotal.period, PeriodTotal.period_start,
+               PeriodTotal.total_kg, PeriodTotal.activity_count).order_by(PeriodTotal.user_id)
+    )
+    for user_id, group in groupby(rows, key=lambda row: row[0]):
+        yield user_id, {(period, start): (total, count) for _, period, start, total, count in group}
+
+
+def _period_mismatches(user_id: int, have: Dict[tuple, tuple], want: Dict[tuple, List[float]]) -> List[tuple]:
+    """(key, stored, expected) of one user's week and month totals that differ."""
+    mismatches = []
+    for period, start in sorted(have.keys() | want.keys()):
+        stored, expected = have.get((period, start)), want.get((period, start))
+        expected = tuple(expected) if expected is not None else (0.0, 0)
+        # A stored bucket left at zero where nothing is expected is fine
+        if (stored is None and (period, start) in want) or (stored is not None and (
+                stored[1] != expected[1] or abs(stored[0] - expected[0]) > ROLLUP_TOLERANCE_KG)):
+            mismatches.append(((period, str(start), str(user_id)), stored, expected))
+    return mismatches
+
+
+def _table_mismatches(table, expected, keys: Tuple[str, ...], total: str) -> List[tuple]:
+    """Rows of a rollup table that differ from `expected`, a subquery with the same columns."""
+    joined = and_(*[table.c[key] == expected.c[key] for key in keys])
+    differs = or_(table.c.activity_count != expected.c.activity_count,
+                  func.abs(table.c[total] - expected.c[total]) > ROLLUP_TOLERANCE_KG)
+    # Expected rows that are missing or wrong, then stored rows left where nothing is expected
+    missing_or_wrong = db.session.execute(
+        select(*[expected.c[key] for key in keys], table.c[total], table.c.activity_count,
+               expected.c[total], expected.c.activity_count)
+        .select_from(expected.outerjoin(table, joined))
+        .where(or_(table.c[keys[0]].is_(None), differs))
+    ).all()
+    leftover = db.session.execute(
+        select(*[table.c[key] for key in keys], table.c[total], table.c.activity_count)
+        .select_from(table.outerjoin(expected, joined))
+        .where(expected.c[keys[0]].is_(None),
+               or_(table.c.activity_count != 0, func.abs(table.c[total]) > ROLLUP_TOLERANCE_KG))
+    ).all()
+    n = len(keys)
+    return ([(tuple(str(v) for v in row[:n]), None if row[n + 1] is None else tuple(row[n:n + 2]),
+              tuple(row[n + 2:])) for row in missing_or_wrong]
+            + [(tuple(str(v) for v in row[:n]), tuple(row[n:]), (0.0, 0)) for row in leftover])
+
+
+def check_rollups() -> Dict[str, Any]:
+    """
+    Compare DailyRollup, PeriodTotal and UserStats with figures recomputed
+    from raw activities.
+
+    Returns:
+        dict: ``rows`` (daily rollups expected), ``mismatches`` count and the
+              first few mismatching (key, stored, expected) in ``examples``
+    """
+    raw = _raw_daily_totals().subquery()
+    expected_rows = db.session.execute(select(func.count()).select_from(raw)).scalar()
+    mismatches = _table_mismatches(DailyRollup.__table__, raw, ('user_id', 'day'), 'co2_sum')
+
+    stored = {row.user_id: dict(row._mapping) for row in db.session.execute(select(*UserStats.__table__.c))}
+    # Both streams are in user_id order, so stored week and month totals are
+    # compared one user at a time
+    stored_periods = _stored_periods()
+    next_periods = next(stored_periods, None)
+    expected = _rollups_from_days(db.session.execute(select(raw).order_by(raw.c.user_id, raw.c.day)))
+    for want, periods in expected:
+        user_id = want['user_id']
+        while next_periods is not None and next_periods[0] < user_id:
+            mismatches += _period_mismatches(*next_periods, {})
+            next_periods = next(stored_periods, None)
+        have_periods = {}
+        if next_periods is not None and next_periods[0] == user_id:
+            have_periods = next_periods[1]
+            next_periods = next(stored_periods, None)
+        mismatches += _period_mismatches(user_id, have_periods, periods)
+
+        have = stored.pop(user_id, None)
+        if have is None or abs(have['total_kg'] - want['total_kg']) > ROLLUP_TOLERANCE_KG or any(
+                have[name] != want[name] for name in want if name != 'total_kg'):
+            mismatches.append((('user', user_id), have, want))
+    while next_periods is not None:
+        mismatches += _period_mismatches(*next_periods, {})
+        next_periods = next(stored_periods, None)
+    # Stats of users without activities must be empty
+    for user_id, have in stored.items():
+        if have['activity_count'] or abs(have['total_kg']) > ROLLUP_TOLERANCE_KG or have['last_day']:
+            mismatches.append((('user', user_id), have, None))
+    return {'rows': expected_rows, 'mismatches': len(mismatches), 'examples': mismatches[:10]}
+
+
+def rebuild_rollups() -> int:
+    """
+    Regenerate DailyRollup, PeriodTotal and UserStats from raw activities in
+    one transaction.
+
+    The daily rollups are aggregated by the database; the week and month
+    totals and the streaks are computed here, streaming over the rollups in
+    (user_id, day) order.
+
+    Returns:
+        int: Number of daily rollup rows written
+    """
+    for model in (DailyRollup, PeriodTotal, UserStats):
+        db.session.execute(delete(model))
+    written = db.session.execute(DailyRollup.__table__.insert().from_select(
+        ['user_id', 'day', 'co2_sum', 'activity_count'], _raw_daily_totals())).rowcount
+    daily = DailyRollup.__table__
+    # New revisions, so leaderboard indexes pick up every rebuilt row
+    users = db.session.execute(select(func.count(distinct(daily.c.user_id)))).scalar()
+    revision = reserve_revisions(db.session, users) - users if users else 0
+    rows = db.session.execute(
+        select(daily.c.user_id, daily.c.day, daily.c.co2_sum, daily.c.activity_count)
+        .order_by(daily.c.user_id, daily.c.day)
+    )
+    stats_batch, period_batch = [], []
+    for stats, periods in _rollups_from_days(rows):
+        revision += 1
+        stats_batch.append(dict(stats, revision=revision))
+        period_batch += [{'period': period, 'period_start': start, 'user_id': stats['user_id'],
+                          'total_kg': co2, 'activity_count': count}
+                         for (period, start), (co2, count) in periods.items()]
+        if len(stats_batch) >= REBUILD_BATCH_SIZE or len(period_batch) >= REBUILD_BATCH_SIZE:
+            db.session.execute(UserStats.__table__.insert(), stats_batch)
+            db.session.execute(PeriodTotal.__table__.insert(), period_batch)
+            stats_batch, period_batch = [], []
+    if stats_batch:
+        db.session.execute(UserStats.__table__.insert(), stats_batch)
+        db.session.execute(PeriodTotal.__table__.insert(), period_batch)
+    db.session.commit()
+    return written
@@ -0,0 +1,172 @@
+"""
+Confidence-routed hybrid parsing: rules first, then the trained classifier,
+the LLM only when neither is confident.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .cache import normalize_entry
+from .classifier import classify
+from .rules import RULE_SETS
+
+# Rule answers at or above this confidence are used without calling the LLM
+HYBRID_CONFIDENCE_THRESHOLD = float(os.getenv('HYBRID_CONFIDENCE_THRESHOLD', 0.75))
+# Confidence lost per additional action whose rules also match the entry
+AMBIGUITY_PENALTY = 0.15
+# Confidence of rule answers that do not carry one (the legacy rule set)
+DEFAULT_RULE_CONFIDENCE = 0.7
+
+
+def rule_parse(text: str):
+    """
+    Parse with the rule engine and score the answer.
+
+    Args:
+        text: Natural language description of environmental activity
+
+    Returns:
+        tuple: (parsed dictionary or None, confidence between 0 and 1)
+    """
+    entry = normalize_entry(text)
+    if not entry:
+        return None, 0.0
+    parsed, actions = RULE_SETS['simple'].evaluate(entry)
+    if parsed is None:
+        parsed = RULE_SETS['legacy'].match(entry)
+        actions = frozenset([parsed['action']]) if parsed else frozenset()
+    if parsed is None:
+        return None, 0.0
+    confidence = parsed.get('confidence', DEFAULT_RULE_CONFIDENCE)
+    confidence -= AMBIGUITY_PENALTY * max(0, len(actions) - 1)
+    return parsed, max(0.0, confidence)
+
+
+def default_llm_parse(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse with Gemini if it is configured and its circuit breaker is closed.
+
+    Goes through the shared (micro-batching) AI parser with its fallback
+    guesses turned off, so a failed LLM call gives None and the router keeps
+    the rule answer.
+
+    Args:
+        text: Natural language description of environmental activity
+
+    Returns:
+        Parsed activity dictionary, or None when the LLM is unavailable or failed
+    """
+    if not os.getenv('GOOGLE_API_KEY'):
+        return None
+    try:
+        from .ai_parser import gemini_breaker, parse_with_ai
+    except Exception as e:
+        print(f"AI parser not available: {e}")
+        return None
+    if gemini_breaker.is_open():
+        return None
+    return parse_with_ai(text, fallback=False)
+
+
+class HybridRouter:
+    """
+    Answer from the rule parser when it is confident, from the LLM otherwise.
+
+    The rule engine runs first. Its answer is used when its confidence is at
+    least ``threshold``; entries with no rule match or a low-confidence match
+    go to the nearest-centroid classifier, then to the LLM parser if the
+    classifier is missing or unsure. The rule answer (if any) stands in when
+    no LLM is available or it returns nothing.
+
+    Args:
+        threshold: Lowest rule confidence accepted without the LLM
+        classify: Callable returning a confident classifier parse or None
+        llm_parse: Callable parsing one entry with the LLM; returns None when
+                   the LLM is unavailable (no API key, circuit open) or failed
+    """
+
+    def __init__(self, threshold: float = HYBRID_CONFIDENCE_THRESHOLD,
+                 llm_parse: Callable[[str], Optional[Dict[str, Any]]] = default_llm_parse,
+                 classify: Callable[[str], Optional[Dict[str, Any]]] = classify):
+        self.threshold = threshold
+        self.classify = classify
+        self.llm_parse = llm_parse
+        self._lock = threading.Lock()
+        self._counts = {'entries': 0, 'rules': 0, 'classifier': 0, 'llm': 0, 'rules_no_llm': 0,
+                        'unresolved': 0}
+
+    def parse(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse an activity entry, calling the LLM only when the rules fall short.
+
+        Args:
+            text: Natural language description of environmental activity
+
+        Returns:
+            Dictionary with parsed activity data or None
+        """
+        return self.route(text)[0]
+
+    def route(self, text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Like parse, also naming the path that produced the answer.
+
+        Args:
+            text: Natural language description of environmental activity
+
+        Returns:
+            tuple: (parsed dictionary or None, outcome), the outcome being one
+            of 'rules', 'classifier', 'llm', 'rules_no_llm' or 'unresolved'
+        """
+        parsed, confidence = rule_parse(text)
+        if parsed is not None and confidence >= self.threshold:
+            return parsed, self._count('rules')
+
+        predicted = self.classify(text) if self.classify is not None else None
+        if predicted is not None:
+            return predicted, self._count('classifier')
+
+        try:
+            result = self.llm_parse(text)
+        except Exception as e:
+            print(f"LLM parsing failed, using rule answer: {e}")
+            result = None
+        if result is not None:
+            return result, self._count('llm')
+        return parsed, self._count('rules_no_llm' if parsed is not None else 'unresolved')
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self._counts['entries'] += 1
+            self._counts[outcome] += 1
+        return outcome
+
+    def stats(self) -> Dict[str, Any]:
+        """Outcome counts and the fraction of entries resolved without the LLM."""
+        with self._lock:
+            counts = dict(self._counts)
+        entries = counts['entries']
+        resolved = counts['rules'] + counts['classifier'] + counts['rules_no_llm']
+        counts['without_llm'] = round(resolved / entries, 4) if entries else 0.0
+        counts['threshold'] = self.threshold
+        return counts
+
+    def reset(self):
+        with self._lock:
+            for key in self._counts:
+                self._counts[key] = 0
+
+
+# Shared by the calculator and parse_entry
+hybrid_router = HybridRouter()
+
+
+def parse_hybrid(text: str) -> Optional[Dict[str, Any]]:
+    """Parse with the process-wide HybridRouter."""
+    return hybrid_router.parse(text)
+
+
+def route_hybrid(text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """Parse with the process-wide HybridRouter, returning (parsed, outcome)."""
+    return hybrid_router.route(text)
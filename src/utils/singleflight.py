@@ -0,0 +1,80 @@
+"""
+Single-flight coalescing: concurrent calls for the same key share one execution.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent work by key within one process.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is still running wait for and receive the same result or
+    exception. Once the call finishes the key is forgotten, so later calls run
+    again (caching results is the job of the caller).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) unless a call for key is already in flight."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                future.set_running_or_notify_cancel()
+                self._calls[key] = future
+                self.leaders += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._forget(key, future)
+
+    def submit(self, key: Hashable, executor, fn: Callable, *args, **kwargs) -> Tuple[Future, bool]:
+        """
+        Submit fn to an executor unless a call for key is already in flight.
+
+        Returns:
+            tuple: (future shared by every caller for key, True if this call
+                    created it)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = executor.submit(fn, *args, **kwargs)
+            self._calls[key] = future
+            self.leaders += 1
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return future, True
+
+    def _forget(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        return {'in_flight': self.in_flight(), 'leaders': self.leaders, 'shared': self.shared}
@@ -0,0 +1,88 @@
+"""
+Tests for the Activity day column and the per-user aggregate reads.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+
+from src.models.db import db, User, Activity
+from src.utils.activity_stats import active_days, daily_series, total_saved, user_stats
+from src.utils.badges import evaluate_badges
+
+
+def _query_plans(fn):
+    """EXPLAIN QUERY PLAN for every statement fn runs."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    cursor = db.session.connection().connection.cursor()
+    return [' | '.join(row[-1] for row in cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters))
+            for statement, parameters in statements]
+
+
+def _user(name='indexed'):
+    user = User(username=name)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_day_is_filled_on_insert(app):
+    with app.app_context():
+        user = _user()
+        created = datetime(2026, 3, 4, 23, 30)
+        db.session.add(Activity(user_id=user.id, raw_entry='a', co2_saved_kg=1.0, created_at=created))
+        db.session.add(Activity(user_id=user.id, raw_entry='b', co2_saved_kg=2.0))
+        db.session.execute(insert(Activity), [{'user_id': user.id, 'raw_entry': 'c', 'co2_saved_kg': 3.0}])
+        db.session.commit()
+
+        days = {a.raw_entry: a.day for a in Activity.query.all()}
+        assert days['a'] == created.date()
+        assert days['b'] == days['c'] == datetime.utcnow().date()
+
+
+def test_aggregates_search_the_rollup_keys(app):
+    with app.app_context():
+        start = datetime.utcnow().date() - timedelta(days=6)
+        reads = {'daily_rollup': (lambda: daily_series(1, start, 7), lambda: active_days(1)),
+                 'user_stats': (lambda: user_stats(1), lambda: total_saved(1))}
+        for table, fns in reads.items():
+            for fn in fns:
+                plans = _query_plans(fn)
+                assert plans
+                for plan in plans:
+                    assert f'SEARCH {table} USING' in plan, plan
+                    assert 'SCAN' not in plan, plan
+
+
+def test_aggregates_match_stored_rows(app):
+    with app.app_context():
+        user, other = _user('a'), _user('b')
+        today = datetime.utcnow().replace(hour=12)
+        for days_ago, saved in ((0, 1.5), (0, 0.5), (2, 3.0), (10, 4.0)):
+            db.session.add(Activity(user_id=user.id, raw_entry='x', co2_saved_kg=saved,
+                                    created_at=today - timedelta(days=days_ago)))
+        db.session.add(Activity(user_id=other.id, raw_entry='y', co2_saved_kg=100.0, created_at=today))
+        db.session.commit()
+
+        start = today.date() - timedelta(days=6)
+        series = daily_series(user.id, start, 7)
+        assert list(series) == [str(start + timedelta(days=i)) for i in range(7)]
+        assert series[str(today.date())] == 2.0
+        assert series[str(today.date() - timedelta(days=2))] == 3.0
+        assert sum(series.values()) == 5.0
+
+        assert total_saved(user.id) == 9.0
+        assert total_saved(12345) == 0.0
+        assert active_days(user.id) == {today.date() - timedelta(days=d) for d in (0, 2, 10)}
+
+        names = {b['name'] for b in evaluate_badges(user.id)}
+        assert 'Getting Started 🟢' in names
@@ -0,0 +1,129 @@
+"""
+Tests for micro-batched AI parsing.
+"""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import pytest
+
+from src.utils.ai_parser import AIActivityParser
+from src.utils.batch_parser import BatchingParser
+
+
+class RecordingParser:
+    def __init__(self):
+        self.batches = []
+        self.singles = []
+
+    def parse_activity(self, text):
+        self.singles.append(text)
+        return {'action': text}
+
+    def parse_batch(self, texts):
+        self.batches.append(list(texts))
+        return [{'action': t} for t in texts]
+
+
+class StubChain:
+    def __init__(self, respond):
+        self.respond = respond
+        self.calls = 0
+
+    def run(self, **kwargs):
+        self.calls += 1
+        return self.respond(**kwargs)
+
+
+def test_concurrent_entries_share_one_batch():
+    inner = RecordingParser()
+    batcher = BatchingParser(inner, max_batch_size=8, max_wait=0.2)
+    start = threading.Barrier(8)
+
+    def log(i):
+        start.wait()
+        return batcher.parse_activity(f'entry {i}', timeout=5)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(log, range(8)))
+
+    assert results == [{'action': f'entry {i}'} for i in range(8)]
+    assert sum(len(b) for b in inner.batches) + len(inner.singles) == 8
+    assert batcher.stats()['largest_batch'] > 1
+
+
+def test_batch_failure_falls_back_to_single_parses():
+    inner = RecordingParser()
+    inner.parse_batch = lambda texts: 1 / 0
+    batcher = BatchingParser(inner, max_batch_size=4, max_wait=0.2)
+    futures = [batcher.submit(f'entry {i}') for i in range(3)]
+    assert [f.result(timeout=5) for f in futures] == [{'action': f'entry {i}'} for i in range(3)]
+
+
+def test_batches_are_parsed_while_earlier_ones_are_in_flight():
+    inner = RecordingParser()
+    release = threading.Event()
+    both_running = threading.Barrier(2, timeout=5)
+
+    def slow_batch(texts):
+        both_running.wait()
+        release.wait(5)
+        return [{'action': t} for t in texts]
+
+    inner.parse_batch = slow_batch
+    batcher = BatchingParser(inner, max_batch_size=2, max_wait=0.2, max_in_flight=2)
+    futures = [batcher.submit(f'entry {i}') for i in range(4)]
+    # Both two-entry batches reach the barrier, so neither waits for the other
+    release.set()
+    assert [f.result(timeout=5) for f in futures] == [{'action': f'entry {i}'} for i in range(4)]
+    assert batcher.stats()['batches'] == 2 and inner.singles == []
+
+
+def test_single_parse_retries_run_concurrently():
+    inner = RecordingParser()
+    inner.parse_batch = lambda texts: 1 / 0
+    all_retrying = threading.Barrier(3, timeout=5)
+
+    def parse_activity(text):
+        all_retrying.wait()
+        return {'action': text}
+
+    inner.parse_activity = parse_activity
+    batcher = BatchingParser(inner, max_batch_size=3, max_wait=0.2, max_in_flight=3)
+    futures = [batcher.submit(f'entry {i}') for i in range(3)]
+    assert [f.result(timeout=5) for f in futures] == [{'action': f'entry {i}'} for i in range(3)]
+
+
+def test_timed_out_entries_are_not_parsed():
+    inner = RecordingParser()
+    release = threading.Event()
+    parse_activity = inner.parse_activity
+    inner.parse_activity = lambda text: release.wait(5) and parse_activity(text)
+    batcher = BatchingParser(inner, max_batch_size=1, max_wait=0, max_in_flight=1)
+
+    first = batcher.submit('first')
+    with pytest.raises(FutureTimeout):
+        batcher.parse_activity('abandoned', timeout=0.05)
+    release.set()
+    assert first.result(timeout=5) == {'action': 'first'}
+    assert batcher.parse_activity('next', timeout=5) == {'action': 'next'}
+    assert inner.singles == ['first', 'next']
+
+
+def test_parse_batch_sends_one_prompt_and_aligns_results():
+    def respond(activity_list):
+        texts = json.loads(activity_list)
+        return '```json\n' + json.dumps([
+            {'action': 'walk', 'category': 'transportation', 'quantity': i + 1, 'unit': 'km'}
+            for i, _ in enumerate(texts)
+        ]) + '\n```'
+
+    parser = AIActivityParser.__new__(AIActivityParser)
+    parser.batch_chain = StubChain(respond)
+    parser.cache = None
+
+    results = parser.parse_batch(['Walked 1 km', 'walked 2 km', 'walked  1 KM', ''])
+    assert parser.batch_chain.calls == 1
+    assert [r['quantity'] for r in results[:3]] == [1.0, 2.0, 1.0]
+    assert results[3] is None
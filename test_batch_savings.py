@@ -0,0 +1,33 @@
+"""
+Tests for the vectorized compute_savings_batch.
+"""
+
+from benchmarks.bench_batch_savings import generate_parsed, mismatches
+from src.utils.calculator import ActivityColumns, compute_savings, compute_savings_batch
+
+
+def test_batch_matches_compute_savings_exactly():
+    parsed = generate_parsed(5000, seed=3)
+    assert mismatches(parsed, compute_savings_batch(ActivityColumns.from_parsed(parsed))) == []
+
+
+def test_rounding_ties_match_builtin_round():
+    # Savings that land next to a rounding tie, where np.round alone can disagree with round()
+    parsed = [{'action': 'recycle', 'category': 'waste', 'quantity': q, 'unit': 'items'}
+              for q in (2.675 / 1.1, 1.0005 / 1.1, 0.0015 / 1.1)]
+    result = compute_savings_batch(ActivityColumns.from_parsed(parsed))
+    assert list(result['co2_saved_kg']) == [compute_savings(p)[0] for p in parsed]
+
+
+def test_columns_share_codes_and_handle_missing_fields():
+    columns = ActivityColumns.from_parsed([
+        {'action': 'walk', 'category': 'transportation', 'quantity': 2, 'unit': 'mi', 'instead_of': 'car'},
+        {'action': 'walk', 'category': 'transportation', 'quantity': 3, 'unit': 'km', 'instead_of': 'car'},
+        {'action': 'recycle'},
+    ])
+    assert columns.values['action'] == ['walk', 'recycle']
+    assert columns.values['instead_of'] == ['car', None]
+    result = compute_savings_batch(columns)
+    assert list(result['unit']) == ['km', 'km', '']
+    assert result['quantity'][2] == 1.0
+    assert len(compute_savings_batch(ActivityColumns.from_parsed([]))['co2_saved_kg']) == 0
@@ -0,0 +1,37 @@
+"""
+Tests for the labelled parser corpus and benchmark runner.
+"""
+
+import json
+
+from benchmarks.bench_parsers import run_benchmark, score
+from benchmarks.parser_corpus import build_corpus, corpus_digest
+
+
+def test_corpus_is_reproducible_and_labelled():
+    corpus = build_corpus(500, seed=3)
+    assert corpus_digest(corpus) == corpus_digest(build_corpus(500, seed=3))
+    assert corpus_digest(corpus) != corpus_digest(build_corpus(500, seed=4))
+    assert any(item['label'] is None for item in corpus)
+    assert all(isinstance(item['label']['quantity'], float) for item in corpus if item['label'])
+
+
+def test_scoring_accepts_legacy_action_names():
+    label = {'action': 'vegetarian_meal', 'quantity': 1.0}
+    assert score({'action': 'meal_swap', 'quantity': 1}, label) == (True, True)
+    assert score({'action': 'vegetarian_meal', 'quantity': 2.0}, label) == (True, False)
+    assert score(None, None) == (True, True)
+
+
+def test_run_benchmark_reports_every_parser():
+    doc = run_benchmark(build_corpus(300, seed=5))
+    json.dumps(doc)
+    assert set(doc['parsers']) == {'parser._legacy_parse_entry', 'calculator._legacy_parse',
+                                   'SimpleActivityParser', 'ActivityClassifier', 'AIActivityParser[stub]',
+                                   'HybridRouter[stub]', 'HybridRouter+classifier[stub]'}
+    for result in doc['parsers'].values():
+        assert result['entries'] == 300
+        assert result['p50_us'] <= result['p99_us']
+    # The stub model answers with the labels, so only the negatives can go wrong
+    assert doc['parsers']['AIActivityParser[stub]']['accuracy'] > 0.9
+    assert 0 < doc['parsers']['HybridRouter[stub]']['without_llm'] < 1
@@ -0,0 +1,85 @@
+"""
+Tests for the Gemini circuit breaker.
+"""
+
+import pytest
+
+from src.utils.ai_parser import AIActivityParser, gemini_breaker
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+
+def make_breaker(now):
+    return CircuitBreaker('test', failure_rate_threshold=0.5, min_calls=4, window_size=10,
+                          cooldown=30, clock=lambda: now[0])
+
+
+def test_opens_on_failure_rate_and_recovers_after_cooldown():
+    now = [0.0]
+    breaker = make_breaker(now)
+    for ok in (True, False, True, False):
+        breaker.record_success() if ok else breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'never')
+
+    now[0] = 31.0
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()      # only one trial call at a time
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_failed_trial_reopens_and_slow_calls_count_as_failures():
+    now = [0.0]
+    breaker = make_breaker(now)
+    breaker.slow_call_seconds = 1.0
+    for _ in range(4):
+        breaker.record_success(duration=2.0)
+    assert breaker.state == OPEN
+
+    now[0] = 31.0
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.snapshot()['times_opened'] == 2
+
+
+def test_late_success_while_open_is_not_recorded():
+    now = [0.0]
+    breaker = make_breaker(now)
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    breaker.record_success()                # call started before the breaker opened
+    assert breaker.snapshot()['recent_calls'] == 0
+
+
+class FailingChain:
+    calls = 0
+
+    def run(self, **kwargs):
+        FailingChain.calls += 1
+        raise RuntimeError('gemini unavailable')
+
+
+def test_open_breaker_skips_llm_and_uses_rule_parser(client):
+    parser = AIActivityParser.__new__(AIActivityParser)
+    parser.chain = FailingChain()
+    parser.cache = None
+    gemini_breaker.reset()
+    try:
+        for _ in range(gemini_breaker.min_calls):
+            parser.parse_activity('walked 2 km instead of driving')
+        assert gemini_breaker.state == OPEN
+        calls = FailingChain.calls
+
+        parsed = parser.parse_activity('had a veggie lunch instead of beef')
+        assert FailingChain.calls == calls
+        assert (parsed['action'], parsed['instead_of']) == ('vegetarian_meal', 'beef')
+
+        status = client.get('/api/status').get_json()
+        assert status['breakers']['gemini']['state'] == OPEN
+    finally:
+        gemini_breaker.reset()
@@ -0,0 +1,62 @@
+"""
+Tests for the nearest-centroid activity classifier.
+"""
+
+import numpy as np
+
+from benchmarks.parser_corpus import build_corpus
+from src.utils.classifier import ActivityClassifier, examples_from_llm_cache, train
+from src.utils.llm_cache import LLMResponseCache
+from src.utils.router import HybridRouter
+
+
+def _classifier():
+    corpus = build_corpus(600, seed=11)
+    return train((item['entry'], item['label']) for item in corpus if item['label'])
+
+
+def test_predicts_action_category_and_instead_of():
+    parsed = _classifier().predict('Cycled 7 km to work instead of taking the bus')
+    assert (parsed['action'], parsed['category'], parsed['instead_of']) == ('cycle', 'transportation', 'bus')
+    assert (parsed['quantity'], parsed['unit']) == (7.0, 'km')
+
+
+def test_unrelated_entries_have_low_confidence():
+    classifier = _classifier()
+    assert classifier.predict('went to a concert')['confidence'] < 0.3
+    assert classifier.classify('went to a concert', min_confidence=0.6) is None
+    assert classifier.predict('   ') is None
+
+
+def test_saved_model_is_memory_mapped(tmp_path):
+    path = str(tmp_path / 'model.npy')
+    classifier = _classifier()
+    classifier.save(path)
+    loaded = ActivityClassifier.load(path)
+    assert isinstance(loaded.model, np.memmap)
+    entry = 'did not use my phone for 3 hours'
+    assert loaded.predict(entry) == classifier.predict(entry)
+
+
+def test_trains_from_llm_cache(tmp_path):
+    path = str(tmp_path / 'llm.sqlite3')
+    cache = LLMResponseCache(path)
+    for n in range(1, 5):
+        cache.set('t', 'gemini', f'recycled {n} cans', {'action': 'recycle', 'category': 'waste',
+                                                        'quantity': n, 'unit': 'items', 'instead_of': 'throw_away'})
+        cache.set('t', 'gemini', f'walked {n} km', {'action': 'walk', 'category': 'transportation',
+                                                    'quantity': n, 'unit': 'km', 'instead_of': 'car'})
+    cache.set('t', 'gemini', 'slept in', {})
+    examples = examples_from_llm_cache(path)
+    assert len(examples) == 8
+    assert train(examples).predict('walked 9 km')['action'] == 'walk'
+
+
+def test_router_uses_classifier_before_llm():
+    calls = []
+    router = HybridRouter(threshold=0.75, llm_parse=calls.append, classify=_classifier().classify)
+    # Only the legacy rules match this, below the rule threshold
+    parsed = router.parse('skipped 6 plastic bottles')
+    assert (parsed['action'], parsed['quantity']) == ('avoid_plastic', 6.0)
+    assert calls == []
+    assert router.stats()['classifier'] == 1
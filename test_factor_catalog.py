@@ -0,0 +1,82 @@
+"""
+Tests for the hot-reloadable factor catalog.
+"""
+
+import json
+import os
+
+import pytest
+
+from src.utils import calculator
+from src.utils.factor_catalog import FactorCatalogError, FactorCatalogWatcher, init_factor_catalog, parse_catalog
+from src.utils.factors import DEFAULT_FACTORS, FACTORS, factor_set_version, get_co2_factor, replace_factors
+
+
+@pytest.fixture
+def restore_factors():
+    factors, defaults = dict(FACTORS), dict(DEFAULT_FACTORS)
+    yield
+    replace_factors(factors, defaults)
+
+
+def _write(path, version, **changes):
+    factors = dict(FACTORS, **changes)
+    path.write_text(json.dumps({'version': version, 'factors': factors, 'default_factors': dict(DEFAULT_FACTORS)}))
+    # Make sure the change is visible even on filesystems with coarse mtimes
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+@pytest.mark.parametrize('doc, message', [
+    ('{not json', 'invalid JSON'),
+    ({'factors': {'car_kg_per_km': 0.1}, 'default_factors': {'other': 1}}, 'missing'),
+    ({'factors': dict(FACTORS, car_kg_per_km=-1), 'default_factors': {'other': 1}}, 'non-negative'),
+    ({'factors': dict(FACTORS, car_kg_per_km=True), 'default_factors': {'other': 1}}, 'must be a number'),
+    ({'factors': dict(FACTORS), 'default_factors': {}}, 'non-empty'),
+])
+def test_invalid_catalogs_are_rejected(doc, message):
+    with pytest.raises(FactorCatalogError, match=message):
+        parse_catalog(doc if isinstance(doc, str) else json.dumps(doc))
+
+
+def test_changed_file_is_applied_and_caches_invalidated(tmp_path, restore_factors):
+    path = tmp_path / 'factors.json'
+    _write(path, 'v1')
+    watcher = FactorCatalogWatcher(str(path), check_seconds=0)
+    assert watcher.check() is False  # same values as the built-in factors
+    before = get_co2_factor('walk', 'transportation', 'car')
+    version = factor_set_version()
+    calculator.compute_savings_within('walked 2 km instead of driving', 5.0)
+    assert calculator.parse_cache_stats()['size'] > 0
+
+    _write(path, 'v2', car_kg_per_km=FACTORS['car_kg_per_km'] * 2)
+    assert watcher.check() is True
+    assert watcher.version == 'v2'
+    assert get_co2_factor('walk', 'transportation', 'car') == before * 2
+    assert factor_set_version() != version
+    calculator._sync_parse_cache()
+    assert calculator.parse_cache_stats()['size'] == 0
+
+    # A broken edit is reported and the loaded factors stay
+    path.write_text('{"factors": ')
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 2 * 10 ** 9))
+    assert watcher.check() is False
+    assert 'invalid JSON' in watcher.status()['error']
+    assert get_co2_factor('walk', 'transportation', 'car') == before * 2
+
+
+def test_checks_are_throttled(tmp_path, restore_factors):
+    path = tmp_path / 'factors.json'
+    _write(path, 'v1')
+    watcher = FactorCatalogWatcher(str(path), check_seconds=3600)
+    watcher.check()
+    _write(path, 'v2', bus_kg_per_km=0.5)
+    assert watcher.check() is False
+    assert watcher.check(force=True) is True
+    assert FACTORS['bus_kg_per_km'] == 0.5
+
+
+def test_startup_requires_a_valid_catalog(tmp_path):
+    with pytest.raises(FactorCatalogError):
+        init_factor_catalog(str(tmp_path / 'missing.json'))
+    assert init_factor_catalog('') is None
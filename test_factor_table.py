@@ -0,0 +1,32 @@
+"""
+Tests for the precomputed get_co2_factor lookup table.
+"""
+
+from benchmarks.bench_co2_factor import activities, mismatches
+from src.utils import factors
+from src.utils.factors import FACTORS, get_co2_factor
+
+
+def test_table_matches_direct_resolution():
+    assert mismatches(activities()) == []
+
+
+def test_known_activities_are_precomputed_and_unseen_memoized():
+    get_co2_factor('walk', 'transportation', 'car')
+    assert ('walk', 'transportation', 'car') in factors._factor_table
+    assert ('compost', 'waste', 'landfill') not in factors._factor_table
+    assert get_co2_factor('compost', 'waste', 'landfill') == factors._resolve_co2_factor('compost', 'waste', 'landfill')
+    assert ('compost', 'waste', 'landfill') in factors._factor_table
+    # Malformed parses still resolve
+    assert get_co2_factor(['walk'], 'transportation') == factors._resolve_co2_factor(['walk'], 'transportation')
+
+
+def test_factor_change_rebuilds_table():
+    before = get_co2_factor('walk', 'transportation', 'car')
+    original = FACTORS['car_kg_per_km']
+    try:
+        FACTORS['car_kg_per_km'] = original * 2
+        assert get_co2_factor('walk', 'transportation', 'car') == before * 2
+    finally:
+        FACTORS['car_kg_per_km'] = original
+    assert get_co2_factor('walk', 'transportation', 'car') == before
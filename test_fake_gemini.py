@@ -0,0 +1,80 @@
+"""
+Tests for the local fake Gemini server used for load and latency testing.
+"""
+
+import json
+import time
+
+import pytest
+import requests
+
+from benchmarks.fake_gemini import CHAT_REPLIES, FaultConfig
+from src.utils.ai_parser import BATCH_PARSE_TEMPLATE, SINGLE_PARSE_TEMPLATE
+from src.utils.gemini import gemini_client_kwargs
+
+
+def generate(server, prompt, model='gemini-2.0-flash-exp'):
+    return requests.post(
+        f"{server.url}/v1beta/models/{model}:generateContent?key=fake",
+        json={'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]},
+        timeout=5,
+    )
+
+
+def reply_text(resp):
+    return resp.json()['candidates'][0]['content']['parts'][0]['text']
+
+
+def test_app_points_at_configured_endpoint(fake_gemini):
+    assert gemini_client_kwargs() == {'transport': 'rest', 'client_options': {'api_endpoint': fake_gemini.url}}
+
+
+def test_chat_client_accepts_endpoint_settings(fake_gemini):
+    # Needs the pinned langchain-google-genai; skipped where it is not installed
+    chat_models = pytest.importorskip('langchain_google_genai')
+
+    model = chat_models.ChatGoogleGenerativeAI(model='gemini-2.0-flash-exp', google_api_key='fake',
+                                               temperature=0.1, **gemini_client_kwargs())
+    assert (model.transport, model.client_options) == ('rest', {'api_endpoint': fake_gemini.url})
+    # The model re-runs genai.configure with its own settings, so the request
+    # only reaches the fake server because they were passed to it too
+    assert model.invoke('User message: how do I save energy?\nRespond').content in CHAT_REPLIES
+
+
+def test_parse_prompts_get_rule_derived_json(fake_gemini):
+    single = SINGLE_PARSE_TEMPLATE.format(activity_text='cycled 5 km instead of bus')
+    parsed = json.loads(reply_text(generate(fake_gemini, single)))
+    assert (parsed['action'], parsed['quantity'], parsed['instead_of']) == ('cycle', 5.0, 'bus')
+
+    batch = BATCH_PARSE_TEMPLATE.format(activity_list=json.dumps(['walked 2 km', 'went to a [concert]']))
+    items = json.loads(reply_text(generate(fake_gemini, batch)))
+    assert [item['action'] for item in items] == ['walk', 'eco_product']
+
+    assert reply_text(generate(fake_gemini, 'User message: how do I save energy?\nRespond')) in CHAT_REPLIES
+
+
+def test_injected_latency_and_errors(fake_gemini):
+    fake_gemini.faults.update(latency_ms=150)
+    t0 = time.perf_counter()
+    assert generate(fake_gemini, 'hi').status_code == 200
+    assert time.perf_counter() - t0 >= 0.15
+
+    resp = requests.post(f"{fake_gemini.url}/_fake/config", json={'latency_ms': 0, 'error_rate': 1.0,
+                                                                  'error_status': 429}, timeout=5)
+    assert resp.json()['error_rate'] == 1.0
+    failed = generate(fake_gemini, 'hi')
+    assert failed.status_code == 429
+    assert failed.json()['error']['status'] == 'RESOURCE_EXHAUSTED'
+    assert requests.get(f"{fake_gemini.url}/_fake/stats", timeout=5).json() == {
+        'requests': 2, 'responses': 1, 'errors': 1}
+
+    bad = requests.post(f"{fake_gemini.url}/_fake/config", json={'error_rate': 2}, timeout=5)
+    assert bad.status_code == 400
+
+
+def test_fault_config_distributions():
+    faults = FaultConfig(latency_ms=100, latency_dist='uniform', jitter_ms=50, seed=1)
+    delays = [faults.sample()[0] for _ in range(200)]
+    assert all(0.05 <= d <= 0.15 for d in delays)
+    faults.update(latency_dist='exponential', hang_rate=1.0, hang_seconds=5)
+    assert all(d >= 5 for d, _ in (faults.sample() for _ in range(10)))
@@ -0,0 +1,136 @@
+"""
+Tests for the incrementally maintained leaderboard index and its windows.
+"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event
+
+from benchmarks.bench_leaderboard import mismatches, scan_top_users
+from src.models.db import db, User, Activity
+from src.utils.leaderboard import (
+    LeaderboardIndex, get_leaderboard_index, seconds_left, top_users, user_rank, window_start,
+)
+from src.utils.rollups import check_rollups, period_start
+
+
+def _users(*totals):
+    users = []
+    for n, total in enumerate(totals):
+        user = User(username=f'player{n}')
+        db.session.add(user)
+        db.session.flush()
+        if total is not None:
+            db.session.add(Activity(user_id=user.id, raw_entry='x', co2_saved_kg=total))
+        users.append(user)
+    db.session.commit()
+    return users
+
+
+def test_top_users_and_rank(app):
+    a, b, c, idle = _users(3.0, 7.5, 3.0, None)
+    assert [u['username'] for u in top_users(2)] == ['player1', 'player0']
+    assert [u['total_saved_kg'] for u in top_users(10)] == [u['total_saved_kg'] for u in scan_top_users(10)]
+
+    assert user_rank(b.id) == {'rank': 1, 'total_saved_kg': 7.5, 'users': 3}
+    # Equal totals share a rank
+    assert user_rank(a.id)['rank'] == user_rank(c.id)['rank'] == 2
+    assert user_rank(idle.id) is None
+    assert mismatches(get_leaderboard_index(), 10) == []
+
+
+def test_index_follows_writes_without_reading_activities(app):
+    a, b = _users(1.0, 2.0)
+    assert user_rank(a.id)['rank'] == 2
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.session.add(Activity(user_id=a.id, raw_entry='x', co2_saved_kg=5.0))
+    db.session.commit()
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        leaders = top_users(5)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert leaders[0] == {'username': 'player0', 'total_saved_kg': 6.0}
+    assert len(statements) == 1 and 'FROM activity' not in statements[0]
+
+    # Deleting a user's only activity drops them from the board
+    db.session.delete(Activity.query.filter_by(user_id=b.id).one())
+    db.session.commit()
+    assert top_users(5) == [{'username': 'player0', 'total_saved_kg': 6.0}]
+
+
+def test_separate_indexes_stay_in_step(app):
+    # Two workers: each index only sees the other's writes through UserStats
+    first, second = LeaderboardIndex(), LeaderboardIndex()
+    (a,) = _users(1.0)
+    first.sync()
+    second.sync()
+    db.session.add(Activity(user_id=a.id, raw_entry='x', co2_saved_kg=2.0))
+    db.session.commit()
+    assert first.top(1)[0]['total_saved_kg'] == 1.0
+    assert first.sync() == second.sync() == 1
+    assert first.top(1) == second.top(1) == [{'username': 'player0', 'total_saved_kg': 3.0}]
+
+
+def test_api_leaderboard_reports_my_rank(client):
+    _users(10.0)
+    client.post('/auth/signup', data={'username': 'me', 'password': 'pw'})
+    client.post('/api/log', json={'entry': 'walked 2 km instead of driving'})
+    body = client.get('/api/leaderboard?limit=5').get_json()
+    assert [leader['username'] for leader in body['leaders']] == ['player0', 'me']
+    assert body['me']['rank'] == 2 and body['me']['users'] == 2
+
+
+def test_period_start():
+    day = date(2026, 2, 20)
+    for n in range(60):
+        week = period_start('week', day)
+        assert week.weekday() == 0 and 0 <= (day - week).days < 7
+        assert period_start('month', day) == date(day.year, day.month, 1)
+        day += timedelta(days=1)
+    assert window_start('week', date(2026, 10, 18)) == date(2026, 10, 12)
+    assert window_start('month', date(2026, 10, 18)) == date(2026, 10, 1)
+    assert seconds_left('week', datetime(2026, 10, 18, 23, 0)) == 3600
+
+
+def test_windows_only_count_the_current_period(app):
+    today = datetime.utcnow()
+    old, new = _users(None, None)
+    db.session.add_all([
+        Activity(user_id=old.id, raw_entry='x', co2_saved_kg=50.0, created_at=today - timedelta(days=40)),
+        Activity(user_id=new.id, raw_entry='x', co2_saved_kg=2.0, created_at=today),
+        Activity(user_id=new.id, raw_entry='x', co2_saved_kg=1.0, created_at=today),
+    ])
+    db.session.commit()
+
+    assert [u['username'] for u in top_users(5, window='all')] == ['player0', 'player1']
+    for window in ('week', 'month'):
+        assert top_users(5, window=window) == [{'username': 'player1', 'total_saved_kg': 3.0}]
+        assert user_rank(new.id, window) == {'rank': 1, 'total_saved_kg': 3.0, 'users': 1}
+        assert user_rank(old.id, window) is None
+    assert check_rollups()['mismatches'] == 0
+
+
+def test_api_leaderboard_windows_are_cacheable(client):
+    _users(4.0)
+    assert client.get('/api/leaderboard?window=year').status_code == 400
+
+    resp = client.get('/api/leaderboard?window=week')
+    body = resp.get_json()
+    assert (body['window'], body['period_start']) == ('week', str(window_start('week')))
+    assert body['leaders'] == [{'username': 'player0', 'total_saved_kg': 4.0}]
+    assert 'public' in resp.headers['Cache-Control'] and resp.cache_control.max_age <= 30
+    etag = resp.headers['ETag']
+    assert client.get('/api/leaderboard?window=week', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/leaderboard?window=month').headers['ETag'] != etag
+
+    # A new activity changes the totals, so the old response is no longer valid
+    client.post('/api/log', json={'entry': 'walked 2 km instead of driving'})
+    assert client.get('/api/leaderboard?window=week', headers={'If-None-Match': etag}).status_code == 200
+
+    page = client.get('/leaderboard?window=month')
+    assert page.status_code == 200 and b'This Month' in page.data
@@ -0,0 +1,146 @@
+"""
+Tests for the shared top-N leaderboard cache and its write-driven patches.
+"""
+
+import multiprocessing
+
+from sqlalchemy import event
+
+from src.models.db import db, User, Activity
+from src.utils.leaderboard import get_leaderboard_cache, top_users
+from src.utils.leaderboard_cache import LEADERBOARD_CACHE_SIZE, LeaderboardCache, patch_entries
+
+
+def _user(name, *savings):
+    user = User(username=name)
+    db.session.add(user)
+    db.session.flush()
+    db.session.add_all(Activity(user_id=user.id, raw_entry='x', co2_saved_kg=s) for s in savings)
+    db.session.commit()
+    return user
+
+
+def _statements(fn):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return result, statements
+
+
+def test_patch_entries():
+    entries = [(1, 'a', 9.0, 1), (2, 'b', 5.0, 1), (3, 'c', 2.0, 1)]
+    # A rise reorders; an unlisted user beating the last entry enters
+    assert patch_entries(entries, [(3, 'c', 7.0, True, 2)], 3) == [(1, 'a', 9.0, 1), (3, 'c', 7.0, 2), (2, 'b', 5.0, 1)]
+    assert patch_entries(entries, [(4, 'd', 3.0, True, 2)], 3) == [(1, 'a', 9.0, 1), (2, 'b', 5.0, 1), (4, 'd', 3.0, 2)]
+    # Users below a full list's cut-off change nothing
+    assert patch_entries(entries, [(4, 'd', 1.0, True, 2)], 3) == entries
+    # A listed user falling could let an unlisted one in: recompute
+    assert patch_entries(entries, [(1, 'a', 1.0, True, 2)], 3) is None
+    assert patch_entries(entries, [(2, 'b', 0.0, False, 2)], 3) is None
+    # ...unless the list holds every ranked user
+    assert patch_entries(entries, [(2, 'b', 0.0, False, 2)], 5) == [(1, 'a', 9.0, 1), (3, 'c', 2.0, 1)]
+    # Changes older than the entry are ignored
+    assert patch_entries(entries, [(1, 'a', 1.0, True, 1)], 3) == entries
+
+
+def test_smaller_limits_are_slices_of_one_fill(app):
+    for n in range(5):
+        _user(f'player{n}', n + 1.0)
+    leaders, statements = _statements(lambda: top_users(5, window='week'))
+    assert [u['total_saved_kg'] for u in leaders] == [5.0, 4.0, 3.0, 2.0, 1.0]
+    assert len(statements) == 1
+
+    for limit in (1, 3, 10):
+        leaders, statements = _statements(lambda: top_users(limit, window='week'))
+        assert len(leaders) == min(limit, 5) and statements == []
+    assert get_leaderboard_cache().stats()['misses'] == 1
+
+
+def test_writes_patch_the_cache(app):
+    a = _user('alice', 3.0)
+    b = _user('bob', 1.0)
+    for window in ('week', 'month', 'all'):
+        top_users(10, window=window)
+
+    db.session.add(Activity(user_id=b.id, raw_entry='x', co2_saved_kg=4.0))
+    db.session.commit()
+    for window in ('week', 'month', 'all'):
+        leaders, statements = _statements(lambda: top_users(10, window=window))
+        assert leaders == [{'username': 'bob', 'total_saved_kg': 5.0}, {'username': 'alice', 'total_saved_kg': 3.0}]
+        assert statements == []
+
+    # Removing an activity lowers a total; the list holds every user, so it is still patched
+    db.session.delete(Activity.query.filter_by(user_id=a.id).one())
+    db.session.commit()
+    assert top_users(10) == [{'username': 'bob', 'total_saved_kg': 5.0}]
+    assert get_leaderboard_cache().stats()['invalidations'] == 0
+
+
+def test_a_falling_leader_invalidates_a_full_list(app):
+    cache = get_leaderboard_cache()
+    cache.size = 2
+    a = _user('alice', 3.0, 6.0)
+    _user('bob', 5.0)
+    _user('carol', 4.0)
+    assert [u['username'] for u in top_users(2)] == ['alice', 'bob']
+
+    db.session.delete(Activity.query.filter_by(user_id=a.id, co2_saved_kg=6.0).one())
+    db.session.commit()
+    assert cache.stats()['invalidations'] == 1
+    assert [u['username'] for u in top_users(2)] == ['bob', 'carol']
+
+
+def test_fills_older_than_a_patch_are_dropped(tmp_path):
+    path = str(tmp_path / 'leaderboard.sqlite3')
+    # Two workers sharing one file
+    first, second = LeaderboardCache(path, size=3), LeaderboardCache(path, size=3)
+    assert first.get('all', '') == (None, 0)
+    entries = [(1, 'a', 2.0, 1)]
+    _, generation = second.get('all', '')
+    # A write lands between second's read and its fill
+    first.patch('all', '', [(2, 'b', 1.0, True, 2)])
+    assert not second.fill('all', '', entries, generation)
+    assert first.get('all', '')[0] is None
+
+    _, generation = second.get('all', '')
+    assert second.fill('all', '', entries, generation)
+    first.patch('all', '', [(2, 'b', 1.0, True, 2)])
+    assert second.get('all', '')[0] == [(1, 'a', 2.0, 1), (2, 'b', 1.0, 2)]
+    # A new period starts from scratch
+    assert second.get('week', '2026-10-12')[0] is None
+
+
+def test_patches_and_invalidations_reach_other_workers(tmp_path):
+    path = str(tmp_path / 'leaderboard.sqlite3')
+    first, second = LeaderboardCache(path, size=2), LeaderboardCache(path, size=2)
+    _, generation = first.get('all', '')
+    assert first.fill('all', '', [(1, 'a', 5.0, 1), (2, 'b', 3.0, 1)], generation)
+    assert second.get('all', '')[0] == [(1, 'a', 5.0, 1), (2, 'b', 3.0, 1)]
+
+    # A rise patched through one instance is read by the other without a refill
+    second.patch('all', '', [(2, 'b', 6.0, True, 2)])
+    assert first.get('all', '')[0] == [(2, 'b', 6.0, 2), (1, 'a', 5.0, 1)]
+
+    # A forked worker (reopening its connection) drops the list for everyone
+    worker = multiprocessing.get_context('fork').Process(
+        target=first.patch, args=('all', '', [(2, 'b', 0.5, True, 3)]))
+    worker.start()
+    worker.join(10)
+    assert worker.exitcode == 0
+    assert first.get('all', '')[0] is None and second.get('all', '')[0] is None
+
+
+def test_api_clamps_limit(client):
+    for n in range(3):
+        _user(f'player{n}', 1.0)
+    assert client.get('/api/leaderboard?limit=ten').status_code == 400
+    assert len(client.get('/api/leaderboard?limit=0').get_json()['leaders']) == 1
+    assert len(client.get(f'/api/leaderboard?limit={LEADERBOARD_CACHE_SIZE * 100}').get_json()['leaders']) == 3
+    assert 'leaderboard_cache' in client.get('/api/metrics').get_json()
@@ -0,0 +1,91 @@
+"""
+Tests for the persistent SQLite LLM response cache.
+"""
+
+from src.utils.ai_parser import BATCH_PARSE_TEMPLATE, AIActivityParser
+from src.utils.llm_cache import LLMResponseCache, template_hash
+
+
+class StubChain:
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def run(self, activity_text):
+        self.calls.append(activity_text)
+        return self.response
+
+
+class StubBatchChain:
+    def __init__(self, response):
+        self.response = response
+
+    def run(self, activity_list):
+        return self.response
+
+
+def test_cache_survives_reopen_and_normalizes_text(tmp_path):
+    path = str(tmp_path / 'llm.sqlite3')
+    parsed = {'action': 'walk', 'category': 'transportation', 'quantity': 2.0, 'unit': 'km'}
+
+    LLMResponseCache(path).set('t1', 'gemini', 'Walked 2 km', parsed)
+    reopened = LLMResponseCache(path)
+    assert reopened.get('t1', 'gemini', '  walked   2 KM ') == parsed
+    assert reopened.get('t2', 'gemini', 'walked 2 km') is None
+    assert reopened.get('t1', 'other-model', 'walked 2 km') is None
+
+
+def test_eviction_keeps_most_recently_used(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / 'llm.sqlite3'), max_entries=3, touch_interval=0)
+    for i in range(5):
+        cache.set('t', 'm', f'entry {i}', {'i': i})
+    cache.get('t', 'm', 'entry 0')
+    assert cache.evict() == 2
+    assert len(cache) == 3
+    assert cache.get('t', 'm', 'entry 0') == {'i': 0}
+
+
+def test_ai_parser_only_calls_llm_for_new_phrasings(tmp_path):
+    parser = AIActivityParser.__new__(AIActivityParser)
+    parser.chain = StubChain('{"action": "cycle", "category": "transportation", "quantity": 5, "unit": "km"}')
+    parser.model_name = 'stub-model'
+    parser.template_digest = template_hash('stub template')
+    parser.cache = LLMResponseCache(str(tmp_path / 'llm.sqlite3'))
+
+    first = parser.parse_activity('Cycled 5 km')
+    second = parser.parse_activity('cycled  5 km')
+    assert first == second
+    assert first['quantity'] == 5.0
+    assert parser.chain.calls == ['cycled 5 km']
+
+
+def test_hits_only_refresh_stale_rows(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / 'llm.sqlite3'), touch_interval=60)
+    cache.set('t', 'm', 'entry', {'i': 0})
+    conn = cache._connect()
+    writes = conn.total_changes
+    for _ in range(3):
+        assert cache.get('t', 'm', 'entry') == {'i': 0}
+    assert conn.total_changes == writes
+
+    conn.execute('UPDATE llm_cache SET last_used = last_used - 120')
+    writes = conn.total_changes
+    cache.get('t', 'm', 'entry')
+    assert conn.total_changes == writes + 1
+
+
+def test_batch_answers_are_keyed_on_the_batch_template(tmp_path):
+    parser = AIActivityParser.__new__(AIActivityParser)
+    parser.batch_chain = StubBatchChain('[{"action": "walk", "category": "transportation", "quantity": 1, "unit": "km"},'
+                                        ' {"action": "cycle", "category": "transportation", "quantity": 2, "unit": "km"}]')
+    parser.model_name = 'stub-model'
+    parser.template_digest = template_hash('stub template')
+    parser.cache = LLMResponseCache(str(tmp_path / 'llm.sqlite3'))
+
+    parser.parse_batch(['walked 1 km', 'cycled 2 km'])
+    assert parser.cache.get(template_hash(BATCH_PARSE_TEMPLATE), 'stub-model', 'walked 1 km')['action'] == 'walk'
+    assert parser.cache.get(parser.template_digest, 'stub-model', 'walked 1 km') is None
+    # Either prompt's answer serves later parses
+    parser.chain = StubChain('{}')
+    assert parser.parse_activity('cycled 2 km')['action'] == 'cycle'
+    assert parser.chain.calls == []
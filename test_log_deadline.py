@@ -0,0 +1,67 @@
+"""
+Tests for the latency budget on /api/log.
+"""
+
+import threading
+import time
+
+from src.utils import calculator
+from src.utils.metrics import RequestMetrics, log_metrics
+from src.utils.router import hybrid_router
+
+
+def test_slow_ai_parse_falls_back_to_rules_within_budget(app, client, monkeypatch):
+    release = threading.Event()
+
+    def slow_parse(key):
+        release.wait(5)
+        return calculator.compute_savings_rule_based(key), 'rules'
+
+    monkeypatch.setattr(calculator, '_compute_savings_uncached', slow_parse)
+    calculator.clear_parse_cache()
+    log_metrics.reset()
+    app.config['LOG_LATENCY_BUDGET_MS'] = 50
+
+    t0 = time.perf_counter()
+    resp = client.post('/api/log', json={'entry': 'cycled 5 km instead of bus'})
+    elapsed = time.perf_counter() - t0
+    release.set()
+
+    assert resp.status_code == 200
+    assert resp.get_json()['ok'] is True
+    assert elapsed < 1.0
+    assert 'path;desc="budget_fallback"' in resp.headers['Server-Timing']
+
+    snapshot = client.get('/api/metrics').get_json()['log']
+    assert snapshot['budget_fallback']['count'] == 1
+    assert 'rules' in snapshot['budget_fallback']['avg_stage_ms']
+
+
+def test_fast_parse_answers_from_router_then_cache():
+    calculator.clear_parse_cache()
+    first = RequestMetrics(budget=5.0)
+    saved, _, parsed = calculator.compute_savings_within('walked 3 km instead of driving', first.remaining(), first)
+    assert first.path == 'rules'
+    assert parsed['action'] == 'walk'
+
+    second = RequestMetrics(budget=5.0)
+    assert calculator.compute_savings_within('Walked 3 km instead of driving', second.remaining(), second)[0] == saved
+    assert second.path == 'cache'
+
+
+def test_path_names_the_router_decision(monkeypatch):
+    monkeypatch.setattr(hybrid_router, 'threshold', 1.01)
+    monkeypatch.setattr(hybrid_router, 'classify', None)
+    monkeypatch.setattr(hybrid_router, 'llm_parse',
+                        lambda text: {'action': 'walk', 'category': 'transport', 'quantity': 3, 'unit': 'km'})
+    calculator.clear_parse_cache()
+    metrics = RequestMetrics(budget=5.0)
+    calculator.compute_savings_within('walked 3 km instead of driving', metrics.remaining(), metrics)
+    assert metrics.path == 'llm'
+
+    monkeypatch.setattr(hybrid_router, 'llm_parse', lambda text: None)
+    calculator.clear_parse_cache()
+    metrics = RequestMetrics(budget=5.0)
+    calculator.compute_savings_all_within('walked 3 km to work and recycled 4 cans', metrics.remaining(), metrics)
+    assert metrics.path == 'rules_no_llm'
+    calculator.clear_parse_cache()
@@ -0,0 +1,41 @@
+"""
+Tests for the compiled keyword matcher behind SimpleActivityParser.
+"""
+
+import random
+
+from src.utils.matcher import KeywordMatcher
+from src.utils.ai_parser_simple import SimpleActivityParser
+
+
+def test_matcher_agrees_with_substring_checks():
+    keywords = ['no phone', 'phone free', 'phone', 'smartphone', 'instead of car',
+                'carpool', 'car', 'recycle', 'cycle', 'led', 'led bulb', 'bus']
+    matcher = KeywordMatcher(keywords)
+    rng = random.Random(7)
+    fragments = keywords + [' ', 'x', 'd', 'e', 'ool', 'ree']
+    for _ in range(2000):
+        text = ''.join(rng.choice(fragments) for _ in range(rng.randint(0, 8)))
+        assert matcher.scan(text) == {k for k in keywords if k in text}, text
+
+
+def test_overlapping_keywords_are_all_reported():
+    matcher = KeywordMatcher(['no phone', 'phone free', 'instead of car', 'carpool'])
+    assert matcher.scan('went no phone free today') == {'no phone', 'phone free'}
+    assert matcher.scan('instead of carpool') == {'instead of car', 'carpool'}
+
+
+def test_simple_parser_results():
+    parser = SimpleActivityParser()
+
+    walk = parser.parse_activity('Walked 2 km instead of driving')
+    assert (walk['action'], walk['quantity'], walk['unit'], walk['instead_of']) == ('walk', 2.0, 'km', 'car')
+
+    meal = parser.parse_activity('had a veggie lunch instead of chicken')
+    assert (meal['action'], meal['instead_of']) == ('vegetarian_meal', 'chicken')
+
+    detox = parser.parse_activity('avoided using phone for 6 hours')
+    assert (detox['action'], detox['quantity']) == ('digital_detox', 6.0)
+
+    assert parser.parse_activity('recycled 3 bottles')['action'] == 'recycle'
+    assert parser.parse_activity('went to a concert') is None
@@ -0,0 +1,82 @@
+"""
+Tests for entries that describe several activities at once.
+"""
+
+import threading
+
+from sqlalchemy import event
+
+from src.models.db import db, Activity
+from src.utils import calculator
+from src.utils.parser import parse_entries
+from src.utils.rules import split_activities
+
+COMPOUND = 'Walked 2 km to work, recycled 4 cans and had a veggie lunch'
+
+
+def test_split_activities():
+    assert split_activities(COMPOUND) == ['Walked 2 km to work', 'recycled 4 cans', 'had a veggie lunch']
+    # Clauses that name no activity stay with the one before them
+    assert split_activities('took the bus, 10 km instead of car') == ['took the bus, 10 km instead of car']
+    assert split_activities('did not use phone and laptop for 5 hours') == ['did not use phone and laptop for 5 hours']
+    assert split_activities('cycled 2.5 km. then walked') == ['cycled 2.5 km', 'walked']
+    assert split_activities('   ') == []
+
+
+def test_triggers_inside_other_words_do_not_split():
+    for entry in ['finished the business plan and walked home', 'hiked the trail, then walked 2 km',
+                  'bought a cardigan and took the bus', 'ledger review, then cycled 4 km']:
+        assert split_activities(entry) == [entry]
+    # Plurals and other inflections still count
+    assert split_activities('took two buses and recycled bottles') == ['took two buses', 'recycled bottles']
+
+
+def test_clauses_restating_one_activity_are_merged():
+    for entry in ['did not use my phone for 5 hours and went screen free',
+                  'skipped 3 plastic bottles and refilled my water bottle']:
+        assert split_activities(entry) == [entry]
+        # Stored once, not once per clause
+        assert len(parse_entries(entry)) == 1
+    # Different actions still split, even when a trigger of the next one appears
+    assert split_activities('walked to the bus stop and took the bus') == ['walked to the bus stop', 'took the bus']
+
+
+def test_clauses_parse_concurrently(monkeypatch):
+    # Each parse blocks until all three are running, so serial parsing would time out
+    barrier = threading.Barrier(3, timeout=2)
+    real = calculator._compute_savings_uncached
+
+    def together(key):
+        barrier.wait()
+        return real(key)
+
+    monkeypatch.setattr(calculator, '_compute_savings_uncached', together)
+    calculator.clear_parse_cache()
+
+    activities = calculator.compute_savings_all_within(COMPOUND, 5.0)
+    assert [parsed['action'] for _, _, parsed, _ in activities] == ['walk', 'recycle', 'vegetarian_meal']
+    assert activities[0][3] == 'Walked 2 km to work'
+
+
+def test_log_stores_every_activity_with_one_insert(app, client):
+    calculator.clear_parse_cache()
+    inserts = []
+
+    def count_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT INTO activity'):
+            inserts.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count_inserts)
+    try:
+        resp = client.post('/api/log', json={'entry': COMPOUND})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_inserts)
+
+    body = resp.get_json()
+    assert body['ok'] is True
+    assert len(body['activities']) == 3
+    assert body['co2_saved_kg'] == round(sum(a['co2_saved_kg'] for a in body['activities']), 3)
+    assert len(inserts) == 1
+    # Rows keep the whole entry; the clauses are in the response
+    assert [a.raw_entry for a in Activity.query.order_by(Activity.id)] == [COMPOUND] * 3
+    assert [a['entry'] for a in body['activities']] == ['Walked 2 km to work', 'recycled 4 cans', 'had a veggie lunch']
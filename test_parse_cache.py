@@ -0,0 +1,53 @@
+"""
+Tests for the normalized-text parse cache in front of compute_savings_with_ai.
+"""
+
+from src.utils import calculator
+from src.utils.cache import TTLCache
+from src.utils.factors import FACTORS
+
+
+def test_ttl_cache_evicts_lru_and_expires():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1          # 'b' is now least recently used
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.evictions == 1
+
+    now[0] = 11.0
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations']) == (1, 2, 1)
+
+
+def test_normalized_entries_share_a_cache_slot():
+    calculator.clear_parse_cache()
+    before = calculator.parse_cache_stats()
+    first = calculator.compute_savings_with_ai('Walked 2 km   instead of driving')
+    second = calculator.compute_savings_with_ai('  walked 2 KM instead of driving ')
+    after = calculator.parse_cache_stats()
+
+    assert first == second
+    assert after['misses'] - before['misses'] == 1
+    assert after['hits'] - before['hits'] == 1
+
+    # Returned dicts are copies, so callers cannot corrupt the cache
+    second[1]['category'] = 'tampered'
+    assert calculator.compute_savings_with_ai('walked 2 km instead of driving')[1]['category'] != 'tampered'
+
+
+def test_factor_change_invalidates_cache():
+    entry = 'walked 2 km instead of driving'
+    calculator.clear_parse_cache()
+    saved, _, _ = calculator.compute_savings_with_ai(entry)
+    original = FACTORS['car_kg_per_km']
+    try:
+        FACTORS['car_kg_per_km'] = original * 2
+        doubled, _, _ = calculator.compute_savings_with_ai(entry)
+        assert doubled == round(saved * 2, 3)
+    finally:
+        FACTORS['car_kg_per_km'] = original
+    assert calculator.compute_savings_with_ai(entry)[0] == saved
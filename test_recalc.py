@@ -0,0 +1,97 @@
+"""
+Tests for versioned factors and the chunked savings recalculation.
+"""
+
+from src.models.db import db, User, Activity, FactorRecalcProgress
+from src.utils.calculator import compute_savings
+from src.utils.factors import FACTORS, factor_set_version
+from src.utils.recalc import recalculate_factors, user_id_ranges
+
+PARSED = [
+    {'action': 'walk', 'category': 'transportation', 'quantity': 3.0, 'unit': 'mi', 'instead_of': 'car'},
+    {'action': 'bus', 'category': 'transportation', 'quantity': 10.0, 'unit': 'km', 'instead_of': 'car'},
+    {'action': 'recycle', 'category': 'waste', 'quantity': 4.0, 'unit': 'items', 'instead_of': 'throw_away'},
+]
+
+
+def _store(users=3, per_user=3):
+    version = factor_set_version()
+    for n in range(users):
+        user = User(username=f'u{n}')
+        db.session.add(user)
+        db.session.flush()
+        for parsed in PARSED[:per_user]:
+            saved, meta = compute_savings(parsed)
+            db.session.add(Activity(
+                user_id=user.id, raw_entry='x', category=meta['category'], quantity=meta['quantity'],
+                unit=meta['unit'], co2_saved_kg=saved, action=parsed['action'],
+                action_category=parsed['category'], instead_of=parsed['instead_of'], factor_version=version,
+            ))
+    db.session.commit()
+
+
+def _expected():
+    return sorted(compute_savings(parsed)[0] for parsed in PARSED)
+
+
+def _changed_factors(test):
+    original = FACTORS['car_kg_per_km']
+    FACTORS['car_kg_per_km'] = original * 2
+    try:
+        test()
+    finally:
+        FACTORS['car_kg_per_km'] = original
+
+
+def test_api_log_records_factor_version(client):
+    client.post('/api/log', json={'entry': 'walked 2 km instead of driving'})
+    activity = Activity.query.one()
+    assert (activity.action, activity.action_category, activity.instead_of) == ('walk', 'transportation', 'car')
+    assert activity.factor_version == factor_set_version()
+
+
+def test_recalculation_updates_stale_rows_only(app):
+    _store(users=1)
+    db.session.add(Activity(user_id=1, raw_entry='legacy row', co2_saved_kg=9.0))
+    db.session.commit()
+    old_version = factor_set_version()
+
+    def check():
+        assert factor_set_version() != old_version
+        result = recalculate_factors()
+        assert (result['updated'], result['finished']) == (3, True)
+        stored = Activity.query.filter(Activity.action.isnot(None)).all()
+        assert sorted(a.co2_saved_kg for a in stored) == _expected()
+        assert {a.factor_version for a in stored} == {factor_set_version()}
+        # Nothing left to do for this factor set
+        assert recalculate_factors()['chunks'] == 0
+
+    _changed_factors(check)
+    assert Activity.query.filter_by(raw_entry='legacy row').one().co2_saved_kg == 9.0
+
+
+def test_recalculation_resumes_after_interruption(app):
+    _store(users=2)
+
+    def check():
+        first = recalculate_factors(chunk_size=2, max_chunks=2)
+        assert (first['updated'], first['finished']) == (4, False)
+        second = recalculate_factors(chunk_size=2)
+        assert second['resumed_from'] == 4
+        assert (second['updated'], second['finished']) == (6, True)
+
+    _changed_factors(check)
+
+
+def test_user_ranges_cover_every_user(app):
+    _store(users=4)
+    ranges = user_id_ranges(2)
+    assert len(ranges) == 2 and ranges[0][1] + 1 == ranges[1][0]
+
+    def check():
+        for lo, hi in ranges:
+            recalculate_factors(lo, hi, chunk_size=2)
+        assert Activity.query.filter(Activity.factor_version != factor_set_version()).count() == 0
+        assert FactorRecalcProgress.query.count() == 2
+
+    _changed_factors(check)
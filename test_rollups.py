@@ -0,0 +1,139 @@
+"""
+Tests for the per-user daily rollups maintained on write.
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import mysql, postgresql
+
+from src.models.db import db, User, Activity, DailyRollup, UserStats
+from src.utils.factors import FACTORS, factor_set_version
+from src.utils.recalc import recalculate_factors
+from src.utils.rollups import _upsert, check_rollups, rebuild_rollups, reserve_revisions
+
+
+def _rollups():
+    return {(r.user_id, str(r.day)): (round(r.co2_sum, 6), r.activity_count)
+            for r in DailyRollup.query.all() if r.activity_count}
+
+
+def test_orm_writes_update_rollups(app):
+    user = User(username='rolled')
+    db.session.add(user)
+    db.session.commit()
+    today = datetime.utcnow().replace(hour=12)
+    yesterday = today - timedelta(days=1)
+    a = Activity(user_id=user.id, raw_entry='a', co2_saved_kg=1.5, created_at=today)
+    b = Activity(user_id=user.id, raw_entry='b', co2_saved_kg=0.5, created_at=today)
+    db.session.add_all([a, b, Activity(user_id=user.id, raw_entry='c', co2_saved_kg=2.0, created_at=yesterday)])
+    db.session.commit()
+    assert _rollups() == {(user.id, str(today.date())): (2.0, 2), (user.id, str(yesterday.date())): (2.0, 1)}
+
+    a.co2_saved_kg = 3.0
+    db.session.delete(b)
+    db.session.commit()
+    assert _rollups()[(user.id, str(today.date()))] == (3.0, 1)
+    assert check_rollups()['mismatches'] == 0
+
+
+def test_rollups_roll_back_with_the_activity(app):
+    user = User(username='rollback')
+    db.session.add(user)
+    db.session.commit()
+    db.session.add(Activity(user_id=user.id, raw_entry='a', co2_saved_kg=1.0))
+    db.session.flush()
+    db.session.rollback()
+    assert DailyRollup.query.count() == 0
+
+
+def test_api_log_and_stats_use_rollups(client):
+    client.post('/auth/signup', data={'username': 'stats', 'password': 'pw'})
+    client.post('/api/log', json={'entry': 'walked 2 km instead of driving'})
+    client.post('/api/log', json={'entry': 'took bus 10 km instead of car'})
+    saved = sum(a.co2_saved_kg for a in Activity.query.all())
+
+    (user_id, day), (co2, count) = next(iter(_rollups().items()))
+    assert count == 2 and co2 == round(saved, 6)
+
+    stats = client.get('/api/stats?days=7').get_json()
+    assert stats['series'][day] == saved
+    assert client.get('/').status_code == 200
+    assert check_rollups()['mismatches'] == 0
+
+
+def test_recalculation_keeps_rollups_consistent(app):
+    user = User(username='recalc')
+    db.session.add(user)
+    db.session.commit()
+    db.session.add(Activity(user_id=user.id, raw_entry='walk', co2_saved_kg=0.24, action='walk',
+                            action_category='transportation', instead_of='car', quantity=2.0, unit='km',
+                            factor_version=factor_set_version()))
+    db.session.commit()
+
+    original = FACTORS['car_kg_per_km']
+    FACTORS['car_kg_per_km'] = original * 2
+    try:
+        assert recalculate_factors()['updated'] == 1
+    finally:
+        FACTORS['car_kg_per_km'] = original
+    assert check_rollups()['mismatches'] == 0
+
+
+def test_rebuild_repairs_drift(app):
+    user = User(username='drift')
+    db.session.add(user)
+    db.session.commit()
+    db.session.add(Activity(user_id=user.id, raw_entry='a', co2_saved_kg=1.0))
+    db.session.commit()
+    DailyRollup.query.update({'co2_sum': 5.0})
+    db.session.add(DailyRollup(user_id=user.id, day=datetime(2020, 1, 1).date(), co2_sum=1.0, activity_count=1))
+    db.session.commit()
+
+    report = check_rollups()
+    assert (report['rows'], report['mismatches']) == (1, 2)
+    assert rebuild_rollups() == 1
+    assert check_rollups()['mismatches'] == 0
+    assert list(_rollups().values()) == [(1.0, 1)]
+
+
+def test_rebuild_rollups_command(app):
+    user = User(username='cli')
+    db.session.add(user)
+    db.session.commit()
+    db.session.add(Activity(user_id=user.id, raw_entry='a', co2_saved_kg=1.0))
+    db.session.commit()
+    DailyRollup.query.delete()
+    db.session.commit()
+
+    runner = app.test_cli_runner()
+    assert runner.invoke(args=['rebuild-rollups', '--check']).exit_code == 1
+    result = runner.invoke(args=['rebuild-rollups'])
+    assert result.exit_code == 0, result.output
+    assert '1 daily rollups match' in result.output
+
+
+def test_revisions_continue_from_stored_stats(app):
+    user = User(username='revised')
+    db.session.add(user)
+    db.session.commit()
+    # A database from before the counter existed
+    db.session.add(UserStats(user_id=user.id, revision=41))
+    db.session.commit()
+    assert reserve_revisions(db.session, 3) == 44
+    assert reserve_revisions(db.session, 2) == 46
+    db.session.add(Activity(user_id=user.id, raw_entry='a', co2_saved_kg=1.0))
+    db.session.commit()
+    assert db.session.get(UserStats, user.id).revision == 47
+
+
+def test_upserts_compile_for_postgresql():
+    session = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=postgresql.dialect()))
+    stmt, _ = _upsert(session, DailyRollup.__table__, ['user_id', 'day'], [], increment=('co2_sum',))
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert 'ON CONFLICT (user_id, day) DO UPDATE SET co2_sum = (daily_rollup.co2_sum + excluded.co2_sum)' in sql
+
+    session.get_bind = lambda: SimpleNamespace(dialect=mysql.dialect())
+    with pytest.raises(RuntimeError, match='ON CONFLICT'):
+        _upsert(session, DailyRollup.__table__, ['user_id', 'day'], [])
@@ -0,0 +1,126 @@
+"""
+Tests for confidence-routed hybrid parsing.
+"""
+
+import json
+
+from src.utils import ai_parser
+from src.utils.ai_parser import AIActivityParser, gemini_breaker
+from src.utils.batch_parser import BatchingParser
+from src.utils.calculator import clear_parse_cache, compute_savings_all_within
+from src.utils.router import HybridRouter, default_llm_parse, hybrid_router, rule_parse
+
+
+class StubLLM:
+    def __init__(self, answer=None):
+        self.answer = answer
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return self.answer
+
+
+def test_rule_confidence_drops_when_several_actions_match():
+    clear, clear_confidence = rule_parse('Walked 3 km to work')
+    assert clear['action'] == 'walk'
+    ambiguous, confidence = rule_parse('walked to the bus stop')
+    assert ambiguous['action'] == 'walk'
+    assert confidence < clear_confidence
+    assert rule_parse('went to a concert') == (None, 0.0)
+
+
+def test_confident_rule_match_skips_llm():
+    llm = StubLLM({'action': 'cycle'})
+    router = HybridRouter(threshold=0.75, llm_parse=llm, classify=None)
+    assert router.parse('recycled 4 cans')['action'] == 'recycle'
+    assert llm.calls == []
+
+
+def test_unmatched_and_ambiguous_entries_go_to_llm():
+    llm = StubLLM({'action': 'bus', 'quantity': 2})
+    router = HybridRouter(threshold=0.75, llm_parse=llm, classify=None)
+    assert router.parse('went to a concert') == {'action': 'bus', 'quantity': 2}
+    assert router.parse('walked to the bus stop')['action'] == 'bus'
+    assert llm.calls == ['went to a concert', 'walked to the bus stop']
+
+
+def test_rule_answer_stands_in_when_llm_unavailable():
+    def broken(text):
+        raise RuntimeError('quota exceeded')
+
+    router = HybridRouter(threshold=0.75, llm_parse=broken, classify=None)
+    assert router.parse('walked to the bus stop')['action'] == 'walk'
+    assert router.parse('went to a concert') is None
+    stats = router.stats()
+    assert (stats['rules_no_llm'], stats['unresolved']) == (1, 1)
+
+
+def test_stats_report_fraction_without_llm():
+    router = HybridRouter(threshold=0.75, llm_parse=StubLLM({'action': 'walk'}), classify=None)
+    for entry in ['recycled 4 cans', 'Walked 3 km to work', 'installed 2 LED bulbs', 'went to a concert']:
+        router.parse(entry)
+    stats = router.stats()
+    assert (stats['entries'], stats['rules'], stats['llm']) == (4, 3, 1)
+    assert stats['without_llm'] == 0.75
+    router.reset()
+    assert router.stats()['entries'] == 0
+
+
+class StubChain:
+    def __init__(self, respond):
+        self.respond = respond
+        self.calls = 0
+
+    def run(self, **kwargs):
+        self.calls += 1
+        return self.respond(**kwargs)
+
+
+def _install_llm(monkeypatch, single, batch=None):
+    """Put a stub-chained, batching AI parser behind default_llm_parse."""
+    parser = AIActivityParser.__new__(AIActivityParser)
+    parser.fallback = False
+    parser.chain = StubChain(single)
+    parser.batch_chain = StubChain(batch or single)
+    parser.cache = None
+    monkeypatch.setenv('GOOGLE_API_KEY', 'test')
+    monkeypatch.setitem(ai_parser._ai_parsers, False, BatchingParser(parser, max_batch_size=8, max_wait=0.2))
+    gemini_breaker.reset()
+    return parser
+
+
+def test_llm_error_keeps_rule_answer(monkeypatch):
+    def fail(**kwargs):
+        raise RuntimeError('gemini unavailable')
+
+    parser = _install_llm(monkeypatch, fail)
+    try:
+        # The LLM hook reports the failure instead of a regex fallback guess
+        assert default_llm_parse('walked 2 km instead of driving') is None
+        assert parser.chain.calls == 1
+        router = HybridRouter(threshold=0.75, classify=None)
+        assert router.parse('walked to the bus stop')['action'] == 'walk'
+        stats = router.stats()
+        assert (stats['llm'], stats['rules_no_llm']) == (0, 1)
+    finally:
+        gemini_breaker.reset()
+
+
+def test_compound_entry_clauses_share_one_llm_call(monkeypatch):
+    def answer(activity_list):
+        return json.dumps([{'action': 'llm', 'category': 'other', 'quantity': 1, 'unit': 'items'}
+                           for _ in json.loads(activity_list)])
+
+    parser = _install_llm(monkeypatch, lambda **kwargs: 1 / 0, answer)
+    # Send every clause to the LLM
+    monkeypatch.setattr(hybrid_router, 'threshold', 1.01)
+    monkeypatch.setattr(hybrid_router, 'classify', None)
+    clear_parse_cache()
+    try:
+        activities = compute_savings_all_within('walked 2 km to work, recycled 4 cans and had a veggie lunch', 5)
+    finally:
+        clear_parse_cache()
+        gemini_breaker.reset()
+    assert [parsed['action'] for _, _, parsed, _ in activities] == ['llm'] * 3
+    assert (parser.batch_chain.calls, parser.chain.calls) == (1, 0)
@@ -0,0 +1,53 @@
+"""
+Tests for the declarative rule engine behind the rule-based parsers.
+"""
+
+import operator
+
+import pytest
+
+from benchmarks.bench_rule_engine import PARSERS, generate_entries, mismatches
+from src.utils.rules import RULE_SETS, Choice, Quantity, RuleSet, rule
+
+
+@pytest.mark.parametrize('name,reference,engine', PARSERS, ids=[p[0] for p in PARSERS])
+def test_entry_points_match_original_parsers(name, reference, engine):
+    assert mismatches(reference, engine, generate_entries(3000, seed=11)) == []
+
+
+def test_first_matching_rule_wins_and_fields_keep_order():
+    rules = RuleSet('demo', [
+        rule([['bus'], ['took', 'rode']], action='bus', quantity=Quantity('distance_km', 1.0)),
+        rule([['bus', 'train']], action='transit',
+             via=Choice([(['instead of car'], 'car')], default='walk'),
+             quantity=Quantity('number', 2.0, zero_is_missing=True,
+                               scale=[('minute', operator.truediv, 60.0)])),
+    ])
+
+    assert rules.parse('Took the BUS 12 km') == {'action': 'bus', 'quantity': 12.0}
+    assert rules.parse('bus instead of car') == {'action': 'transit', 'via': 'car', 'quantity': 2.0}
+    assert list(rules.parse('train 0 minutes')) == ['action', 'via', 'quantity']
+    assert rules.parse('train 30 minutes')['quantity'] == 0.5
+    assert rules.parse('walked home') is None
+    assert rules.parse('   ') is None
+
+
+def test_sequential_and_indexed_matching_agree():
+    entries = [e.lower().strip() for e in generate_entries(3000, seed=5)]
+    for rule_set in RULE_SETS.values():
+        sequential = rule_set.sequential
+        try:
+            rule_set.sequential = True
+            first = [rule_set.match(e) for e in entries]
+            rule_set.sequential = False
+            second = [rule_set.match(e) for e in entries]
+        finally:
+            rule_set.sequential = sequential
+        assert first == second, rule_set.name
+    # Small sets take the sequential path
+    assert RULE_SETS['legacy_entry'].sequential and RULE_SETS['legacy'].sequential
+
+
+def test_rules_need_keyword_groups():
+    with pytest.raises(ValueError):
+        RuleSet('broken', [rule([[]], action='x')])
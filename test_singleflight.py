@@ -0,0 +1,76 @@
+"""
+Tests for single-flight coalescing of identical in-flight parses.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.utils import calculator
+from src.utils.singleflight import SingleFlight
+
+
+def run_together(n, fn):
+    barrier = threading.Barrier(n)
+
+    def task(i):
+        barrier.wait()
+        return fn(i)
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(task, range(n)))
+
+
+def test_identical_keys_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def slow(key):
+        calls.append(key)
+        time.sleep(0.2)
+        return key.upper()
+
+    results = run_together(16, lambda i: flight.do('same', slow, 'same'))
+    assert results == ['SAME'] * 16
+    assert calls == ['same']
+    assert flight.stats() == {'in_flight': 0, 'leaders': 1, 'shared': 15}
+
+
+def test_distinct_keys_run_separately_and_errors_reach_every_caller():
+    flight = SingleFlight()
+    assert run_together(4, lambda i: flight.do(i % 2, lambda k: (time.sleep(0.05), k)[1], i % 2)) == [0, 1, 0, 1]
+    assert flight.leaders >= 2
+
+    def boom():
+        time.sleep(0.2)
+        raise ValueError('parse failed')
+
+    def call(i):
+        with pytest.raises(ValueError):
+            flight.do('bad', boom)
+        return True
+
+    assert all(run_together(8, call))
+    assert flight.in_flight() == 0
+
+
+def test_concurrent_log_entries_parse_once(monkeypatch):
+    calls = []
+    real = calculator._compute_savings_uncached
+
+    def counting(key):
+        calls.append(key)
+        time.sleep(0.2)
+        return real(key)
+
+    monkeypatch.setattr(calculator, '_compute_savings_uncached', counting)
+    calculator.clear_parse_cache()
+
+    entries = ['Skipped 3 plastic bottles', 'skipped 3  plastic bottles'] * 6
+    results = run_together(len(entries), lambda i: calculator.compute_savings_with_ai(entries[i]))
+
+    assert calls == ['skipped 3 plastic bottles']
+    assert len({r[0] for r in results}) == 1
+    assert all(r[2]['quantity'] == 3.0 for r in results)
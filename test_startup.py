@@ -0,0 +1,17 @@
+"""
+Startup budget: importing the app must stay cheap and free of heavy dependencies.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from bench_startup import check_startup
+
+
+def test_cold_start_within_budget():
+    # Generous default so slow CI machines pass; tighten with STARTUP_BUDGET_MS
+    budget_ms = float(os.getenv('STARTUP_BUDGET_MS', 3000))
+    median, problems = check_startup(budget_ms, runs=3)
+    assert not problems, problems
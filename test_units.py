@@ -0,0 +1,38 @@
+"""
+Tests for unit normalization ahead of the CO2 factors.
+"""
+
+import pytest
+
+from src.utils.calculator import compute_savings
+from src.utils.factors import normalize_quantities, normalize_quantity
+
+
+def test_quantities_convert_to_the_family_unit():
+    assert normalize_quantity(10, 'miles', 'transportation') == pytest.approx((16.09344, 'km'))
+    assert normalize_quantity(90, 'Minutes', 'digital') == (1.5, 'hours')
+    assert normalize_quantity(2, 'days', 'digital') == (48.0, 'hours')
+    assert normalize_quantity(500, 'g', 'waste') == (0.5, 'kg')
+    # Count units and dimensions a family has no factors for stay as they are
+    assert normalize_quantity(3, 'trips', 'transportation') == (3, 'trips')
+    assert normalize_quantity(2, 'hours', 'transportation') == (2, 'hours')
+    assert normalize_quantity(1, 'km', None) == (1, 'km')
+
+
+def test_compute_savings_uses_converted_quantity():
+    miles, meta = compute_savings({'action': 'train', 'category': 'transportation',
+                                   'quantity': 10, 'unit': 'miles', 'instead_of': 'car'})
+    km, _ = compute_savings({'action': 'train', 'category': 'transportation',
+                             'quantity': 16.09344, 'unit': 'km', 'instead_of': 'car'})
+    assert miles == km
+    assert meta['unit'] == 'km'
+
+
+def test_batch_matches_scalar():
+    rows = [(10, 'miles', 'transportation'), (90, 'min', 'digital'), (3, 'trips', 'transportation'),
+            (2, None, 'food'), (7, 'gallons', 'water'), (10, 'miles', 'transportation')]
+    quantities, units = normalize_quantities(*zip(*rows))
+    for (q, u, c), got_q, got_u in zip(rows, quantities, units):
+        expected_q, expected_u = normalize_quantity(q, u, c)
+        assert got_q == pytest.approx(expected_q)
+        assert got_u == expected_u
@@ -0,0 +1,102 @@
+"""
+Tests for the per-user running totals and streaks maintained on write.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from src.models.db import db, User, Activity
+from src.utils.activity_stats import user_stats
+from src.utils.badges import evaluate_badges
+from src.utils.rollups import check_rollups, streak_lengths
+
+TODAY = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+def _user(name='streaker'):
+    user = User(username=name)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _log(user, days_ago, saved=1.0):
+    activity = Activity(user_id=user.id, raw_entry='x', co2_saved_kg=saved,
+                        created_at=TODAY - timedelta(days=days_ago))
+    db.session.add(activity)
+    db.session.commit()
+    return activity
+
+
+def _streaks(user):
+    stats = user_stats(user.id)
+    return stats.current_streak, stats.longest_streak
+
+
+def test_streak_lengths():
+    day = TODAY.date()
+    assert streak_lengths([]) == (0, 0)
+    assert streak_lengths([day]) == (1, 1)
+    assert streak_lengths([day - timedelta(days=d) for d in (0, 1, 2, 5, 6)]) == (3, 3)
+    assert streak_lengths([day - timedelta(days=d) for d in (0, 3, 4, 5, 6)]) == (1, 4)
+
+
+def test_stats_follow_inserts_and_deletes(app):
+    user = _user()
+    for days_ago in (5, 4, 4, 2):
+        _log(user, days_ago, saved=2.0)
+    stats = user_stats(user.id)
+    assert (stats.total_kg, stats.activity_count) == (8.0, 4)
+    assert (stats.first_day, stats.last_day) == ((TODAY - timedelta(days=5)).date(), (TODAY - timedelta(days=2)).date())
+    assert _streaks(user) == (1, 2)
+
+    # A backdated entry joins the two runs
+    gap = _log(user, 3)
+    assert _streaks(user) == (4, 4)
+    _log(user, 1)
+    _log(user, 0)
+    assert _streaks(user) == (6, 6)
+
+    # Removing the only activity of a day splits the run again
+    db.session.delete(gap)
+    db.session.commit()
+    assert _streaks(user) == (3, 3)
+    assert user_stats(user.id).total_kg == 10.0
+    assert check_rollups()['mismatches'] == 0
+
+
+def test_week_streak_badge(app):
+    user = _user()
+    for days_ago in range(6, -1, -1):
+        _log(user, days_ago)
+    names = {b['name'] for b in evaluate_badges(user.id)}
+    assert {'Getting Started 🟢', 'One Week Streak 🔥', 'Kilo Saver 🥉'} <= names
+
+    # The streak only counts while it reaches today
+    other = _user('lapsed')
+    for days_ago in range(8, 1, -1):
+        _log(other, days_ago)
+    assert user_stats(other.id).current_streak == 7
+    assert 'One Week Streak 🔥' not in {b['name'] for b in evaluate_badges(other.id)}
+
+
+def test_badges_take_one_query(app):
+    user = _user()
+    db.session.add_all(Activity(user_id=user.id, raw_entry='x', co2_saved_kg=0.5,
+                                created_at=TODAY - timedelta(days=d % 40)) for d in range(400))
+    db.session.commit()
+    user_id = user.id
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        badges = evaluate_badges(user_id)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    assert len(statements) == 1
+    assert 'Quarter Hundred 🥇' in {b['name'] for b in badges}
+    assert evaluate_badges(12345) == []